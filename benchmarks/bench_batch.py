@@ -0,0 +1,47 @@
+"""
+Measures applying many independent rules to one document with batch, compared with applying them one after another
+with then(). Run from the repository root with python -m benchmarks.bench_batch
+"""
+import argparse
+import time
+from benchmarks.bench_lexer import build_document
+from yaml_surgeon.yaml_operation import YamlOperation
+
+
+def build_rules(count):
+    # Renames and deletes which each touch a single resource
+    rules = []
+    for index in range(count):
+        if index % 2:
+            rules.append(lambda operation, index=index: operation.named(f"web-{index}").rename(f"api-{index}"))
+        else:
+            rules.append(lambda operation, index=index: operation.named(f"nginx:1.{index}").delete())
+    return rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batch execution of many rules')
+    parser.add_argument('--resources', type=int, default=5000, help='Number of resources in the document')
+    parser.add_argument('--rules', type=int, default=200, help='Number of rules to apply')
+    args = parser.parse_args()
+
+    text = build_document(args.resources)
+    rules = build_rules(args.rules)
+
+    start = time.perf_counter()
+    batch_lines = YamlOperation(text).batch(rules)
+    batch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    operation = YamlOperation(text)
+    for rule in rules:
+        rule(operation).then()
+    then_lines = operation.named('').rename('').execute()
+    then_time = time.perf_counter() - start
+
+    assert batch_lines == then_lines
+    print(f"{args.rules} rules on {text.count(chr(10))} lines: batch {batch_time:.3f}s, then {then_time:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
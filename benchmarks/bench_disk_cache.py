@@ -0,0 +1,43 @@
+"""
+Measures command line runs on a large file without the on disk cache, with an empty cache, and with the file already
+cached. Run from the repository root with python -m benchmarks.bench_disk_cache
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.bench_lexer import build_document
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark command line runs with the on disk parse cache')
+    parser.add_argument('--resources', type=int, default=5000, help='Number of resources in the document')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs, the best is reported')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'manifest.yaml')
+        with open(path, 'w') as file:
+            file.write(build_document(args.resources))
+        cache_dir = os.path.join(directory, 'cache')
+        command = [sys.executable, 'yaml_surgeon.py', '--filePath', path, '--named', 'image', '--rename', 'img']
+        print(f"{os.path.getsize(path) / 1e6:.1f}MB file")
+        uncached = min(_run(command) for _ in range(args.repeat))
+        cold = min(_run(command + ['--cacheDir', cache_dir], clear=cache_dir) for _ in range(args.repeat))
+        warm = min(_run(command + ['--cacheDir', cache_dir]) for _ in range(args.repeat))
+        print(f"no cache {uncached:.3f}s, cold cache {cold:.3f}s, warm cache {warm:.3f}s ({uncached / warm:.1f}x)")
+
+
+def _run(command, clear=None):
+    if clear is not None:
+        subprocess.run([sys.executable, 'yaml_surgeon.py', 'cache', 'prune', '--cacheDir', clear], check=True,
+                       stdout=subprocess.DEVNULL)
+    start = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Measures the time and memory taken to duplicate large blocks. Run from the repository root with
+python -m benchmarks.bench_duplicate, which duplicates 500 blocks of 5000 lines by default
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from yaml_surgeon.yaml_operation import YamlOperation
+
+
+def build_document(blocks, block_lines):
+    # Each block is a deployment spec with block_lines lines, under a top level item of its own
+    spec = ''.join(f"        - env{line}: value{line}\n" for line in range(block_lines - 1))
+    return ''.join(f"- deployment{block}:\n    - spec:\n{spec}" for block in range(blocks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark duplicating large blocks')
+    parser.add_argument('--blocks', type=int, default=500, help='Number of blocks to duplicate')
+    parser.add_argument('--blockLines', type=int, default=5000, help='Number of lines in each block')
+    args = parser.parse_args()
+
+    operation = YamlOperation(build_document(args.blocks, args.blockLines))
+    operation.named('spec').get_selected_nodes()
+    operation.duplicate_as('canary')
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    lines = operation.execute()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"duplicated {args.blocks} blocks of {args.blockLines} lines into {len(lines)} lines in {seconds:.2f}s, "
+          f"peak {peak / 1e6:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Measures the throughput of each lexer engine in lines per second. Run from the repository root with
+python -m benchmarks.bench_lexer
+"""
+import argparse
+import time
+from yaml_surgeon.yaml_lexer import engines, scan_text
+
+# A Kubernetes style resource, repeated to build a document of the requested size
+RESOURCE = """- apiVersion: apps/v1
+  kind: Deployment
+  metadata:
+    name: web-{index}
+    labels: {{app: web, tier: "frontend"}}
+  spec:
+    replicas: {index}
+    template:
+      spec:
+        # Containers for the web tier, don't reorder these
+        containers:
+          - name: nginx
+            image: "nginx:1.{index}"
+            ports: [80, 443, {index}]
+            args: ['--port', '8080', --verbose]
+"""
+
+
+def build_document(resources):
+    return ''.join(RESOURCE.format(index=index) for index in range(resources))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the lexer engines')
+    parser.add_argument('--resources', type=int, default=5000, help='Number of resources in the document')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs, the best is reported')
+    args = parser.parse_args()
+
+    text = build_document(args.resources)
+    line_count = text.count('\n')
+    for engine in engines:
+        best = min(_time(scan_text, text, engine) for _ in range(args.repeat))
+        print(f"{engine:>15}: {line_count / best:12,.0f} lines/s ({line_count} lines in {best:.3f}s)")
+
+
+def _time(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
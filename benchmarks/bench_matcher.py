@@ -0,0 +1,64 @@
+"""
+Measures selecting with many names at once, matching node names against every substring in turn compared with the
+NameMatcher, and prefiltering a document for many names. Run from the repository root with
+python -m benchmarks.bench_matcher
+"""
+import argparse
+import time
+from benchmarks.bench_lexer import build_document
+from yaml_surgeon.yaml_index import DocumentIndex
+from yaml_surgeon.yaml_lexer import scan_text
+from yaml_surgeon.yaml_matcher import NameMatcher
+from yaml_surgeon.yaml_parser import parse_line_tokens
+
+
+def _best(repeat, function, *args):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        runs.append(time.perf_counter() - start)
+    return min(runs), result
+
+
+def _contains_in_turn(node_names, names):
+    return [node_name for node_name in node_names if any(name in node_name for name in names)]
+
+
+def _contains_matched(node_names, names):
+    matcher = NameMatcher(names, substrings=True)
+    return [node_name for node_name in node_names if matcher.matches(node_name)]
+
+
+def _search_in_turn(text, names):
+    return any(text.find(name) >= 0 for name in names)
+
+
+def _search_matched(text, names):
+    return NameMatcher(names).search(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark selecting with many names')
+    parser.add_argument('--resources', type=int, default=2000, help='Number of resources in the document')
+    parser.add_argument('--names', type=int, default=2000, help='Number of names to select with')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs, the best is reported')
+    args = parser.parse_args()
+
+    text = build_document(args.resources)
+    node_names = [node.name for node in DocumentIndex(parse_line_tokens(scan_text(text))).nodes]
+    # Names which are absent, so that every one of them has to be looked for
+    names = [f"absent-{number}" for number in range(args.names)]
+    print(f"{len(node_names)} node names, {len(text)} characters, {len(names)} names")
+    for case, in_turn, matched, subject in [('name_contains', _contains_in_turn, _contains_matched, node_names),
+                                            ('prefilter', _search_in_turn, _search_matched, text)]:
+        in_turn_time, expected = _best(args.repeat, in_turn, subject, names)
+        matched_time, result = _best(args.repeat, matched, subject, names)
+        if result != expected:
+            raise AssertionError(f"Matcher result differs for {case}")
+        print(f"{case:>14}: in turn {in_turn_time:.3f}s, matcher {matched_time:.3f}s "
+              f"({in_turn_time / matched_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
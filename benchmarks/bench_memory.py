@@ -0,0 +1,45 @@
+"""
+Measures the memory held by the lexed lines and parsed nodes of a document, in bytes per line. Run from the repository
+root with python -m benchmarks.bench_memory
+"""
+import argparse
+import gc
+import tracemalloc
+from benchmarks.bench_lexer import build_document
+from yaml_surgeon.yaml_lexer import scan_text
+from yaml_surgeon.yaml_parser import parse_line_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the memory used by lexed lines and parsed nodes')
+    parser.add_argument('--resources', type=int, default=5000, help='Number of resources in the document')
+    parser.add_argument('--engine', type=str, default='regex', help='Lexer engine to scan with')
+    args = parser.parse_args()
+
+    text = build_document(args.resources)
+    line_count = text.count('\n')
+    # Start with empty caches, so that the tokens cached by the lexer are counted
+    gc.collect()
+    tracemalloc.start()
+    lines_size = _allocated(lambda: scan_text(text, args.engine), lambda lines: lines)
+    lexed_lines = scan_text(text, args.engine)
+    nodes_size = _allocated(lambda: parse_line_tokens(lexed_lines), lambda nodes: nodes)
+    tracemalloc.stop()
+    print(f"{line_count} lines")
+    print(f"lexed lines: {lines_size / line_count:8.1f} bytes/line")
+    print(f"      nodes: {nodes_size / line_count:8.1f} bytes/line")
+    print(f"      total: {(lines_size + nodes_size) / line_count:8.1f} bytes/line")
+
+
+def _allocated(build, keep):
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    result = keep(build())
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    del result
+    return size
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Stress tests the tree algorithms on a deeply nested document and on a very wide one, reporting the time of each step or
+the error it fails with. Run from the repository root with python -m benchmarks.bench_nesting, which nests 10000 levels
+deep and puts 1000000 siblings under a single parent by default
+"""
+import argparse
+import time
+from yaml_surgeon.yaml_index import DocumentIndex
+from yaml_surgeon.yaml_lexer import scan_text
+from yaml_surgeon.yaml_operation import YamlOperation, find_nodes_called, find_nodes_containing, \
+    find_children_of_node_called, create_line_number_map
+from yaml_surgeon.yaml_parser import parse_line_tokens
+
+
+def build_deep_document(depth):
+    # A single space of indentation per level keeps the size of the document down, which still grows with the square
+    # of the depth
+    return "\n".join(" " * level + f"n{level}:" for level in range(depth)) + "\n" + " " * depth + "leaf\n"
+
+
+def build_wide_document(width):
+    return "root:\n" + "".join(f"  - n{sibling}\n" for sibling in range(width))
+
+
+def run(title, text, last_name):
+    print(f"{title}: {len(text) / 1e6:.1f}MB")
+    lexed_lines = _step('lex', scan_text, text)
+    nodes = _step('parse', parse_line_tokens, lexed_lines)
+    if nodes is None:
+        return
+    _step('index', DocumentIndex, nodes)
+    _step('find_nodes_called', find_nodes_called, nodes, last_name)
+    _step('find_nodes_containing', find_nodes_containing, nodes, last_name)
+    _step('find_children_of_node_called', find_children_of_node_called, nodes, 'root', 'n0')
+    _step('create_line_number_map', create_line_number_map, nodes)
+    copied_nodes = _step('deep_copy', lambda: [node.deep_copy(node.start_line_number) for node in nodes])
+    _step('__eq__', lambda: nodes == copied_nodes)
+    _step('__repr__', repr, nodes)
+    _step('rename', lambda: YamlOperation(nodes, lexed_lines).named(last_name).rename('spam').execute())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the tree algorithms on deep and wide documents')
+    parser.add_argument('--depth', type=int, default=10000, help='Number of levels in the deeply nested document')
+    parser.add_argument('--width', type=int, default=1000000, help='Number of siblings in the wide document')
+    args = parser.parse_args()
+
+    run(f"{args.depth} levels deep", build_deep_document(args.depth), 'leaf')
+    run(f"{args.width} siblings wide", build_wide_document(args.width), f"n{args.width - 1}")
+
+
+def _step(name, function, *args):
+    start = time.perf_counter()
+    try:
+        result = function(*args)
+    except RecursionError as error:
+        print(f"{name:>30}: failed, {type(error).__name__}")
+        return None
+    print(f"{name:>30}: {time.perf_counter() - start:.3f}s")
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Measures lexing and parsing a single large document with 1, 2, 4 and 8 worker processes, checking that every number of
+workers gives the same lines and nodes as lexing in one process. Run from the repository root with
+python -m benchmarks.bench_parallel --size 64M, or with --file to use a document written by benchmarks.corpus
+"""
+import argparse
+import mmap
+import os
+import time
+from benchmarks.corpus import shapes, generate
+from yaml_surgeon.cli import parse_size
+from yaml_surgeon.yaml_parallel import scan_and_parse
+
+
+def _time(source, jobs):
+    start = time.perf_counter()
+    lexed_lines, nodes = scan_and_parse(source, jobs)
+    return time.perf_counter() - start, lexed_lines, nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark lexing and parsing one document in parallel')
+    parser.add_argument('--shape', choices=sorted(shapes), default='kubernetes', help='Shape of the document')
+    parser.add_argument('--size', type=parse_size, default=parse_size('16M'), help='Size such as 1M or 64M')
+    parser.add_argument('--file', type=str, help='Yaml file to map and lex, rather than generating a document')
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 2, 4, 8], help='Numbers of worker processes')
+    parser.add_argument('--repeat', type=int, default=1, help='Number of timed runs, the best is reported')
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, 'rb') as file:
+            source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    else:
+        source = generate(args.shape, args.size).encode('utf-8')
+    print(f"{len(source) / 1e6:.1f}MB, {os.cpu_count()} CPUs")
+    expected = None
+    serial_time = None
+    for jobs in args.jobs:
+        runs = [_time(source, jobs) for _ in range(args.repeat)]
+        seconds = min(run[0] for run in runs)
+        _, lexed_lines, nodes = runs[0]
+        if expected is None:
+            expected = (lexed_lines, nodes)
+            serial_time = seconds
+        elif lexed_lines != expected[0] or nodes != expected[1]:
+            raise AssertionError(f"Lines or nodes with {jobs} workers differ from those with {args.jobs[0]}")
+        print(f"{jobs:>2} workers: {seconds:.3f}s ({serial_time / seconds:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
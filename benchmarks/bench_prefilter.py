@@ -0,0 +1,52 @@
+"""
+Measures renaming in documents where the name is absent, in only a few top level blocks, or in every block, with the
+prefilter skipping what cannot match compared with lexing the whole document first. Run from the repository root with
+python -m benchmarks.bench_prefilter
+"""
+import argparse
+import time
+from benchmarks.bench_lexer import build_document
+from yaml_surgeon.yaml_operation import YamlOperation
+
+CASES = {
+    'absent': 'yolk',
+    'few blocks': 'web-17',
+    'every block': 'image',
+}
+
+
+def _rename(text, name, lex_first):
+    operation = YamlOperation(text)
+    if lex_first:
+        # Reading the nodes lexes the whole document, as happened before the selections were known
+        operation.nodes
+    return operation.named(name).rename('renamed').execute()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark skipping lexing where the selections cannot match')
+    parser.add_argument('--resources', type=int, default=2000, help='Number of resources in the document')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs, the best is reported')
+    args = parser.parse_args()
+
+    text = build_document(args.resources)
+    print(f"{len(text.splitlines())} lines")
+    for case, name in CASES.items():
+        times = {}
+        for lex_first in (True, False):
+            runs = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                lines = _rename(text, name, lex_first)
+                runs.append(time.perf_counter() - start)
+            times[lex_first] = min(runs)
+            if lex_first:
+                expected = lines
+            elif lines != expected:
+                raise AssertionError(f"Prefiltered output differs for {case}")
+        print(f"{case:>12}: lexing everything {times[True]:.3f}s, prefiltered {times[False]:.3f}s "
+              f"({times[True] / times[False]:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
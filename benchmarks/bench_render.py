@@ -0,0 +1,48 @@
+"""
+Measures rendering the output of an operation which deletes about half of a large document, one which duplicates a
+block in every resource, and writing out a small rename of the document from its text and from a buffer. Run from the
+repository root with python -m benchmarks.bench_render
+"""
+import argparse
+import io
+import time
+from benchmarks.bench_lexer import build_document
+from yaml_surgeon.yaml_operation import YamlOperation
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rendering a large delete')
+    parser.add_argument('--lines', type=int, default=500000, help='Approximate number of lines in the document')
+    args = parser.parse_args()
+
+    text = build_document(args.lines // 15)
+    start = time.perf_counter()
+    operation = YamlOperation(text)
+    parse_time = time.perf_counter() - start
+    # The template block is 8 of the 15 lines of each resource
+    operation.named('template').get_selected_nodes()
+    start = time.perf_counter()
+    lines = operation.delete().execute()
+    render_time = time.perf_counter() - start
+    line_count = text.count('\n')
+    print(f"{line_count} lines parsed in {parse_time:.2f}s, deleted {line_count - len(lines)} lines "
+          f"and rendered {len(lines)} in {render_time:.2f}s")
+
+    # Copies of a block in every resource, which are each inserted into the document
+    operation = YamlOperation(text)
+    operation.named('containers').get_selected_nodes()
+    start = time.perf_counter()
+    lines = operation.duplicate_as('sidecars').execute()
+    print(f"duplicated {len(lines) - line_count} lines in {time.perf_counter() - start:.2f}s")
+
+    # A rename which only changes one line, written out from the lines read from the text and from the buffer
+    for source, operation in [('text', YamlOperation(text)), ('buffer', YamlOperation.from_buffer(text.encode()))]:
+        output = io.BytesIO() if source == 'buffer' else io.StringIO()
+        operation.named('web-7').rename('api-7').get_selected_nodes()
+        start = time.perf_counter()
+        operation.execute_to(output)
+        print(f"{source:>6}: wrote a rename in {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Measures how long chains of selections and paths take to resolve on a large document, comparing the selection plan
+against walking the tree once per selection. Run from the repository root with python -m benchmarks.bench_selections
+"""
+import argparse
+import time
+from benchmarks.bench_lexer import build_document
+from yaml_surgeon.yaml_index import DocumentIndex
+from yaml_surgeon.yaml_lexer import scan_text
+from yaml_surgeon.yaml_operation import YamlOperation, find_nodes_at_path
+from yaml_surgeon.yaml_parser import parse_line_tokens
+from yaml_surgeon.test.reference import select_in_loops
+
+# Chains of selections, from a single exact name through to chains mixing every kind of selection
+CHAINS = {
+    'named': [('named', 'image')],
+    'named twice': [('named', 'spec'), ('named', 'containers')],
+    'contains': [('name_contains', 'web-1')],
+    'parent and named': [('parent', 'metadata'), ('named', 'labels')],
+    'selective name last': [('name_contains', 'e'), ('parent', 'spec'), ('named', 'web-17')],
+    'every kind': [('parent', 'template'), ('parent_level', 'containers', 1), ('named_level', 'image', 1),
+                   ('named', 'image'), ('name_contains', 'nginx')],
+}
+
+# Paths to the image of every container, by exact names, through a wildcard, and from anywhere in the document, which
+# are compared with walking the tree for the path, and with the chain of selections which selected them before paths
+PATHS = {
+    'path': 'apiVersion.spec.template.spec.containers.name.image',
+    'path wildcard': 'apiVersion.spec.*.spec.containers.*.image',
+    'path descend': '**.containers.*.image',
+}
+PATH_CHAIN = [('parent', 'template'), ('parent', 'containers'), ('named_level', 'image', 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark resolving chains of selections')
+    parser.add_argument('--resources', type=int, default=5000, help='Number of resources in the document')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs, the best is reported')
+    args = parser.parse_args()
+
+    nodes = parse_line_tokens(scan_text(build_document(args.resources)))
+    index_time, index = _time(DocumentIndex, nodes)
+    print(f"{len(index.nodes)} nodes, index built in {index_time:.3f}s")
+    for chain_name, selections in CHAINS.items():
+        loops = min(_time(select_in_loops, nodes, selections)[0] for _ in range(args.repeat))
+        plan = min(_time(_select_with_plan, nodes, index, selections)[0] for _ in range(args.repeat))
+        selected = len(_select_with_plan(nodes, index, selections))
+        print(f"{chain_name:>20}: {selected:6} selected, loops {loops:.4f}s, plan {plan:.4f}s ({loops / plan:,.0f}x)")
+    loops = min(_time(select_in_loops, nodes, PATH_CHAIN)[0] for _ in range(args.repeat))
+    for path_name, path in PATHS.items():
+        walk = min(_time(find_nodes_at_path, nodes, path)[0] for _ in range(args.repeat))
+        plan = min(_time(_select_with_plan, nodes, index, [('path', path)])[0] for _ in range(args.repeat))
+        selected = len(_select_with_plan(nodes, index, [('path', path)]))
+        print(f"{path_name:>20}: {selected:6} selected, chain in loops {loops:.4f}s, walk {walk:.4f}s, "
+              f"plan {plan:.4f}s ({loops / plan:.1f}x)")
+
+
+def _select_with_plan(nodes, index, selections):
+    operation = YamlOperation(nodes, [], index)
+    operation.selections = selections
+    return operation.get_selected_nodes()
+
+
+def _time(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    main()
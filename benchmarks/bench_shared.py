@@ -0,0 +1,77 @@
+"""
+Measures applying many independent operations to one large document in a pool of processes, with the document sent to
+each worker in shared memory compared with pickling it, along with applying them one after another in this process.
+Workers are started with spawn by default, which pickles what is sent to them as on macOS and Windows, whereas forked
+workers are given the document directly both ways. Run from the repository root with python -m benchmarks.bench_shared
+"""
+import argparse
+import multiprocessing
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from benchmarks.bench_lexer import build_document
+from yaml_surgeon import yaml_shared
+from yaml_surgeon.yaml_operation import YamlOperation
+from yaml_surgeon.yaml_shared import SharedDocument, execute_shared
+
+
+def _tasks(count):
+    # Each task renames the name of a different resource
+    return [([('named', f"web-{number}")], ('rename', f"renamed-{number}")) for number in range(count)]
+
+
+def _execute_serial(operation, tasks):
+    results = []
+    for selections, operation_args in tasks:
+        task_operation = YamlOperation([node.copy_tree() for node in operation.nodes], list(operation.lexed_lines))
+        task_operation.selections = list(selections)
+        task_operation.operation = operation_args
+        results.append(task_operation.execute())
+    return results
+
+
+def _execute_pickled(operation, tasks, jobs, mp_context):
+    # The document is pickled and sent to each worker as it starts, unless the workers are forked
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context, initializer=yaml_shared._set_worker_document,
+                             initargs=(operation.lexed_lines, operation.nodes)) as executor:
+        return list(executor.map(yaml_shared._execute_task, *zip(*tasks)))
+
+
+def _time(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sending a document to worker processes')
+    parser.add_argument('--resources', type=int, default=2000, help='Number of resources in the document')
+    parser.add_argument('--tasks', type=int, default=16, help='Number of operations to apply')
+    parser.add_argument('--jobs', type=int, default=4, help='Number of worker processes')
+    parser.add_argument('--startMethod', choices=multiprocessing.get_all_start_methods(), default='spawn',
+                        help='How the worker processes are started')
+    args = parser.parse_args()
+
+    operation = YamlOperation(build_document(args.resources))
+    print(f"{len(operation.lexed_lines)} lines, {args.tasks} tasks, {args.jobs} {args.startMethod} workers")
+    pickle_time, pickled = _time(pickle.dumps, (operation.lexed_lines, operation.nodes), pickle.HIGHEST_PROTOCOL)
+    unpickle_time, _ = _time(pickle.loads, pickled)
+    share_time, document = _time(SharedDocument.from_operation, operation)
+    with document:
+        open_time, _ = _time(yaml_shared.open_shared_document, document.name, document.size)
+        print(f"pickled {len(pickled) / 1e6:.1f}MB in {pickle_time:.3f}s, loaded in {unpickle_time:.3f}s")
+        print(f" shared {document.size / 1e6:.1f}MB in {share_time:.3f}s, opened in {open_time:.3f}s")
+
+    tasks = _tasks(args.tasks)
+    mp_context = multiprocessing.get_context(args.startMethod)
+    serial_time, expected = _time(_execute_serial, operation, tasks)
+    pickled_time, pickled_results = _time(_execute_pickled, operation, tasks, args.jobs, mp_context)
+    shared_time, shared_results = _time(execute_shared, operation, tasks, args.jobs, mp_context)
+    if pickled_results != expected or shared_results != expected:
+        raise AssertionError("Results from the workers differ from those in this process")
+    print(f"in this process {serial_time:.3f}s, pickled to workers {pickled_time:.3f}s, "
+          f"shared with workers {shared_time:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Measures how long the command line takes to import, using python -X importtime in fresh interpreters, and fails if it
+is over a budget. Run from the repository root with python -m benchmarks.bench_startup, or with --verbose to list the
+slowest modules
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(module):
+    """
+    Imports the module in a fresh interpreter, and returns the cumulative import time in seconds of each module it
+    imported directly or indirectly, not including the modules imported by the interpreter as it starts
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"], capture_output=True,
+                            text=True, check=True, cwd=ROOT)
+    times = {}
+    started = False
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            # The header line
+            continue
+        if started:
+            # Names are indented by two spaces for each level of nesting, after a space separating them from the bar
+            times[name[1:].rstrip()] = int(cumulative) / 1e6
+        elif name.strip() == 'site':
+            # Everything imported after site is imported by the module
+            started = True
+    return times
+
+
+def import_time(module, repeat=5):
+    """
+    Returns the least time to import the module over repeat fresh interpreters, along with the import times from that
+    run. Modules indented in the times were imported by the module above them, and their time is included in its time
+    """
+    runs = []
+    for _ in range(repeat):
+        times = import_times(module)
+        runs.append((sum(seconds for name, seconds in times.items() if not name.startswith(' ')), times))
+    return min(runs, key=lambda run: run[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the import time of the command line')
+    parser.add_argument('--module', type=str, default='yaml_surgeon.cli', help='Module to import')
+    parser.add_argument('--repeat', type=int, default=10, help='Number of interpreters to start, the best is reported')
+    parser.add_argument('--budget', type=float, default=40.0, help='Milliseconds the import can take before failing')
+    parser.add_argument('--verbose', action='store_true', help='List the modules which took longest to import')
+    args = parser.parse_args()
+
+    seconds, times = import_time(args.module, args.repeat)
+    if args.verbose:
+        for name, module_seconds in sorted(times.items(), key=lambda item: item[1])[-20:]:
+            print(f"{module_seconds * 1000:8.2f}ms {name}")
+    print(f"import {args.module}: {seconds * 1000:.2f}ms (budget {args.budget:.0f}ms)")
+    if seconds * 1000 > args.budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Compares peak memory and throughput of the command line with and without --stream. Each run is a separate process so
+that its peak RSS can be measured. Run from the repository root with python -m benchmarks.bench_streaming
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.bench_lexer import build_document
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'yaml_surgeon.py')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streaming edits against in memory edits')
+    parser.add_argument('--resources', type=int, default=20000, help='Number of resources in the document')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'document.yaml')
+        with open(path, 'w') as file:
+            file.write(build_document(args.resources))
+        line_count = args.resources * build_document(1).count('\n')
+        size_mb = os.path.getsize(path) / 2 ** 20
+        print(f"Renaming in {line_count} lines ({size_mb:.1f} MB)")
+        for label, extra_args in [('in memory', []), ('streaming', ['--stream'])]:
+            elapsed, peak_rss_mb = _run([path, *extra_args])
+            print(f"{label:>10}: {line_count / elapsed:10,.0f} lines/s, peak RSS {peak_rss_mb:7.1f} MB")
+
+
+def _run(args):
+    command = [sys.executable, SCRIPT, '--named', 'image', '--withParents', 'nginx', '--rename', 'img', '--filePath']
+    start = time.perf_counter()
+    process = subprocess.Popen(command + args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    if status != 0:
+        raise RuntimeError(f"{' '.join(command + args)} failed with status {status}")
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    return elapsed, peak_rss / 2 ** 20
+
+
+if __name__ == "__main__":
+    main()
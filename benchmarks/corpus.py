@@ -0,0 +1,97 @@
+"""
+Generates deterministic synthetic yaml documents of a given shape and size, for benchmarking. Every shape repeats a
+block containing spec, metadata, name and image keys, so that the same selections and operations apply to all of them.
+Run from the repository root with python -m benchmarks.corpus --shape kubernetes --size 1G --output corpus.yaml to write a
+document to a file, which is generated a block at a time so any size can be written
+"""
+import argparse
+import random
+import sys
+from benchmarks.bench_lexer import RESOURCE
+from yaml_surgeon.cli import parse_size
+
+
+def _deep_mappings(index, rng):
+    # Block mappings nested a varying number of levels deep under the spec of each item
+    depth = rng.randint(4, 12)
+    lines = ["- spec:"]
+    for level in range(depth):
+        lines.append("  " * (level + 1) + f"level{level}:")
+    indent = "  " * (depth + 1)
+    lines += [f"{indent}metadata:", f"{indent}  name: deep-{index}", f"{indent}  image: registry/deep:{index}"]
+    return "\n".join(lines) + "\n"
+
+
+def _flow_sequences(index, rng):
+    items = ", ".join(f"item{index}-{item}" for item in range(rng.randint(10, 40)))
+    ports = ", ".join(str(rng.randint(1, 65535)) for _ in range(rng.randint(2, 8)))
+    return f"- spec:\n    metadata: [name, image, web-{index}]\n    name: [{items}]\n    image: [{ports}]\n"
+
+
+def _flow_mappings(index, rng):
+    labels = ", ".join(f"label{label}: value{rng.randint(0, 999)}" for label in range(rng.randint(3, 10)))
+    return f"- spec: {{name: web-{index}, image: \"nginx:1.{index}\", replicas: {rng.randint(1, 9)}}}\n" \
+           f"  metadata: {{{labels}}}\n"
+
+
+def _comments(index, rng):
+    # Comment lines are indented to match the lines around them, as the nesting levels only depend on indentation
+    def comment():
+        return "# " + " ".join(rng.choice(['spam', 'egg', 'ham', 'bacon', "don't", 'reorder']) for _ in range(8))
+
+    return f"{comment()}\n- spec:\n    {comment()}\n    metadata:\n      # {index}\n" \
+           f"      name: web-{index} {comment()}\n      {comment()}\n      image: \"nginx:1.{index}\" # pinned\n" \
+           f"    {comment()}\n"
+
+
+def _kubernetes(index, rng):
+    return RESOURCE.format(index=index)
+
+
+shapes = {
+    'deep_mappings': _deep_mappings,
+    'flow_sequences': _flow_sequences,
+    'flow_mappings': _flow_mappings,
+    'comments': _comments,
+    'kubernetes': _kubernetes,
+}
+
+def iter_blocks(shape, size, seed=0):
+    """
+    Yields the blocks of a document of the shape until they add up to at least size characters. The same shape, size
+    and seed always give the same document
+    """
+    block = shapes[shape]
+    rng = random.Random(seed)
+    total = 0
+    index = 0
+    while total < size:
+        text = block(index, rng)
+        total += len(text)
+        index += 1
+        yield text
+
+
+def generate(shape, size, seed=0):
+    return ''.join(iter_blocks(shape, size, seed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic yaml document')
+    parser.add_argument('--shape', choices=sorted(shapes), default='kubernetes', help='Shape of the document')
+    parser.add_argument('--size', type=parse_size, default=parse_size('1M'), help='Size such as 1K, 64M or 1G')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the random parts of the document')
+    parser.add_argument('--output', type=str, help='File to write the document to, rather than stdout')
+    args = parser.parse_args()
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for text in iter_blocks(args.shape, args.size, args.seed):
+            output.write(text)
+    finally:
+        if args.output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Runs every benchmark on every shape of generated document at each size, and writes the results as JSON so that they
+can be compared across commits. Run from the repository root with python -m benchmarks.suite --output results.json, then
+after a change python -m benchmarks.suite --compare results.json to report the benchmarks which have got slower.
+
+Each benchmark is timed on its own, with whatever it needs (such as the lexed lines, or an operation with its nodes
+already selected) set up fresh before each run and not included in the time. The time to import the command line is
+measured too, as it is paid by every run of it
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from benchmarks.bench_startup import import_time
+from benchmarks.corpus import shapes, generate
+from yaml_surgeon.cli import parse_size
+from yaml_surgeon.yaml_index import DocumentIndex
+from yaml_surgeon.yaml_lexer import scan_text, _regex_spans
+from yaml_surgeon.yaml_operation import YamlOperation, to_lines
+from yaml_surgeon.yaml_parser import parse_line_tokens
+
+# Substrings which are in none of the generated names, to select with many names at once
+ABSENT_NAMES = [f"absent-{number}" for number in range(2000)]
+
+# Each selection on its own, as they are set up on an operation
+SELECTIONS = {
+    'named': lambda operation: operation.named('name'),
+    'name_contains': lambda operation: operation.name_contains('ima'),
+    'name_contains_many': lambda operation: operation.name_contains(*ABSENT_NAMES, 'ima'),
+    'named_at_level': lambda operation: operation.named_at_level('metadata', 1),
+    'with_parents': lambda operation: operation.with_parents('metadata'),
+    'with_parent_at_level': lambda operation: operation.with_parent_at_level('spec', 0),
+}
+
+# The module the command line is run from
+startup_module = 'yaml_surgeon.cli'
+
+OPERATIONS = {
+    'rename': lambda operation: operation.named('name').rename('title'),
+    'delete': lambda operation: operation.named('image').delete(),
+    'duplicate_as': lambda operation: operation.named('metadata').duplicate_as('labels'),
+    'insert_sibling': lambda operation: operation.named('name').insert_sibling('title'),
+}
+
+
+def _then_chain(operation):
+    return operation.named('name').rename('title').then().named('image').delete().then() \
+        .named('metadata').duplicate_as('labels').then().named('title').rename('name').execute()
+
+
+class Document:
+    # The stages of processing a document, which benchmarks copy what they change from
+    def __init__(self, text):
+        self.text = text
+        self.lexed_lines = scan_text(text)
+        self.nodes = parse_line_tokens(self.lexed_lines)
+        self.index = DocumentIndex(self.nodes)
+
+    def operation(self):
+        # Operations replace lines in the list they are given and rename the selected nodes, so each gets its own
+        return YamlOperation([node.copy_tree() for node in self.nodes], list(self.lexed_lines))
+
+    def selected_operation(self, build):
+        operation = build(self.operation())
+        operation.get_selected_nodes()
+        return operation
+
+
+def _cold_lexer(text):
+    # The lexer caches the tokens of lines it has seen, which would otherwise make every run after the first faster
+    _regex_spans.cache_clear()
+    return text
+
+
+def benchmarks(document):
+    """
+    Returns the name, setup and timed function of each benchmark on the document, where the setup returns the argument
+    passed to the timed function
+    """
+    yield 'scan_text', lambda: _cold_lexer(document.text), scan_text
+    yield 'parse_line_tokens', lambda: document.lexed_lines, parse_line_tokens
+    yield 'DocumentIndex', lambda: document.nodes, DocumentIndex
+    for name, build in SELECTIONS.items():
+        yield f"select.{name}", \
+            lambda build=build: build(YamlOperation(document.nodes, document.lexed_lines, document.index)), \
+            lambda operation: operation.get_selected_nodes()
+    for name, build in OPERATIONS.items():
+        yield f"execute.{name}", lambda build=build: document.selected_operation(build), \
+            lambda operation: operation.execute()
+    yield 'then_chain', document.operation, _then_chain
+    yield 'prefilter.absent', lambda: document.text, \
+        lambda text: YamlOperation(text).named('absent').rename('title').execute()
+    yield 'to_lines', lambda: document.selected_operation(OPERATIONS['rename'])._apply_operation(), \
+        lambda applied: to_lines(*applied)
+
+
+def run(shape_names, sizes, repeat, seed=0, log=None):
+    results = []
+    for shape in shape_names:
+        for size in sizes:
+            document = Document(generate(shape, size, seed))
+            for name, setup, function in benchmarks(document):
+                result = {'benchmark': name, 'shape': shape, 'size': size, 'lines': len(document.lexed_lines)}
+                try:
+                    times = []
+                    for _ in range(repeat):
+                        argument = setup()
+                        start = time.perf_counter()
+                        function(argument)
+                        times.append(time.perf_counter() - start)
+                    result.update(seconds=min(times), mean=sum(times) / len(times))
+                except (SyntaxError, ValueError, IndexError, KeyError) as error:
+                    result['error'] = f"{type(error).__name__}: {error}"
+                results.append(result)
+                if log is not None:
+                    print(_format_result(result), file=log)
+    return results
+
+
+def run_startup(repeat, log=None):
+    # Import times vary a lot from one interpreter to the next, so there are always at least a few runs
+    seconds, _ = import_time(startup_module, max(repeat, 5))
+    result = {'benchmark': f"import {startup_module}", 'shape': 'startup', 'size': 0, 'lines': 0, 'seconds': seconds}
+    if log is not None:
+        print(_format_result(result), file=log)
+    return result
+
+
+def compare(results, baseline, threshold):
+    """
+    Returns a line for each benchmark which is in both sets of results, with how many times slower it now is, along
+    with whether any is slower than the baseline by more than the threshold
+    """
+    baseline_seconds = {_key(result): result['seconds'] for result in baseline if 'seconds' in result}
+    lines = []
+    regressed = False
+    for result in results:
+        previous = baseline_seconds.get(_key(result))
+        if previous is None or 'seconds' not in result or not previous:
+            continue
+        ratio = result['seconds'] / previous
+        slower = ratio > threshold
+        regressed = regressed or slower
+        lines.append(f"{'SLOWER' if slower else '':6} {ratio:6.2f}x {_format_result(result)}")
+    return lines, regressed
+
+
+def _key(result):
+    return result['benchmark'], result['shape'], result['size']
+
+
+def _format_result(result):
+    outcome = result['error'] if 'error' in result else f"{result['seconds'] * 1000:10.3f}ms"
+    return f"{result['shape']:>14} {result['size']:>10} {result['benchmark']:<28} {outcome}"
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the benchmark suite and write the results as JSON')
+    parser.add_argument('--shapes', nargs='+', choices=sorted(shapes), default=sorted(shapes),
+                        help='Shapes of document to benchmark')
+    parser.add_argument('--sizes', nargs='+', type=str, default=['1K', '64K', '1M'],
+                        help='Sizes of document from 1K up to 1G, which needs a lot of memory')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs, the best is reported')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the generated documents')
+    parser.add_argument('--output', type=str, help='File to write the JSON results to, rather than stdout')
+    parser.add_argument('--compare', type=str, help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='How many times slower than --compare a benchmark can be before it is a regression')
+    parser.add_argument('--startupBudget', type=float,
+                        help='Milliseconds importing the command line can take before it is a regression')
+    parser.add_argument('--noStartup', action='store_true', help='Do not measure importing the command line')
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes]
+    results = run(args.shapes, sizes, args.repeat, args.seed, log=sys.stderr)
+    over_budget = False
+    if not args.noStartup:
+        startup = run_startup(args.repeat, log=sys.stderr)
+        results.append(startup)
+        over_budget = args.startupBudget is not None and startup['seconds'] * 1000 > args.startupBudget
+        if over_budget:
+            print(f"Importing {startup_module} is over the budget of {args.startupBudget:.0f}ms", file=sys.stderr)
+    report = {
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    elif not args.compare:
+        json.dump(report, sys.stdout, indent=2)
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            lines, regressed = compare(results, json.load(file)['results'], args.threshold)
+        print("\n".join(lines))
+        over_budget = over_budget or regressed
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
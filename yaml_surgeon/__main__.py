@@ -0,0 +1,3 @@
+from yaml_surgeon.cli import main
+
+main()
@@ -0,0 +1,159 @@
+"""
+The command line, which is run with the yaml-surgeon command once installed, python -m yaml_surgeon or yaml_surgeon.py.
+Every run pays for importing what it uses, so modules which only some options need, such as the process pool for --files
+and the on disk cache, are imported by those options rather than here. The operation engine itself is only imported
+once the arguments are parsed, so that --help and the cache commands do not import it
+"""
+import argparse
+import mmap
+import os
+import sys
+
+
+def main():
+    if sys.argv[1:2] == ['cache']:
+        cache_main(sys.argv[2:])
+        return
+    parser = argparse.ArgumentParser(description='Process and modify a yaml file')
+
+    parser.add_argument('--filePath', type=str, help='Path to the yaml file')
+    parser.add_argument('--named', nargs='+', type=str, help='Name of the node to select')
+    parser.add_argument('--nameContains', nargs='+', type=str, help='Name of the node to select contains this')
+    parser.add_argument('--namedAtLevel', nargs=2, type=str, help='Name of the node to select and its level')
+    parser.add_argument('--withParents', nargs='+', type=str, help='Select only children of a node with this name')
+    parser.add_argument('--withParentAtLevel', nargs=2, type=str, help='Name of the node to select and its level')
+    parser.add_argument('--path', nargs='+', type=str,
+                        help='Path from the top level to the node to select, such as spec.*.image or spec.**.image')
+    parser.add_argument('--rename', type=str, help='What to rename the selected to')
+    parser.add_argument('--delete', action='store_true', help='Delete the selected nodes')
+    parser.add_argument('--duplicateAs', type=str, help='Copies the selected node and its children, giving it this name')
+    parser.add_argument('--insertSibling', type=str, help='Inserts a sibling node for the selected with this name')
+    parser.add_argument('--stream', action='store_true',
+                        help='Read, edit and write one top level block at a time (rename, delete and duplicate only)')
+    parser.add_argument('--files', nargs='+', type=str,
+                        help='Yaml files, directories or glob patterns to edit, instead of a single --filePath')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of processes to edit --files with, or to lex and parse a large --filePath with')
+    parser.add_argument('--inPlace', action='store_true', help='Write each of the --files back to itself')
+    parser.add_argument('--outputDir', type=str, help='Write the --files to this directory, keeping their layout')
+    parser.add_argument('--cache', action='store_true',
+                        help='Load the lexed and parsed --filePath from the on disk cache if it has not changed')
+    parser.add_argument('--cacheDir', type=str, help='Directory of the on disk cache, which implies --cache')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print the time taken by each phase of the edit, and what it processed, to stderr')
+    parser.add_argument('--profileAllocations', action='store_true',
+                        help='Also print the memory allocated by each phase, which makes everything much slower')
+
+    args = parser.parse_args()
+    if args.files:
+        if not args.inPlace and not args.outputDir:
+            parser.error('--files needs either --inPlace or --outputDir')
+        # Editing many files needs a process pool, which is slow to import, so it is only imported when needed
+        from yaml_surgeon.yaml_files import find_yaml_files, process_files, format_summary
+        from yaml_surgeon.yaml_operation import YamlOperation
+        template = build_operation(YamlOperation([], []), args)
+        if template.operation is None:
+            parser.error('--files needs an operation')
+        results = process_files(find_yaml_files(args.files), template.selections, template.operation, args.jobs,
+                                args.outputDir)
+        print("\n".join(format_summary(results)))
+        if any(result.error for result in results):
+            sys.exit(1)
+        return
+    print(f"Opening {args.filePath}", file=sys.stderr)
+    profile = None
+    if args.profile or args.profileAllocations:
+        from yaml_surgeon.yaml_profile import Profile
+        profile = Profile(trace_allocations=args.profileAllocations)
+    try:
+        edit_file(args, profile)
+    finally:
+        if profile is not None:
+            profile.close()
+            print("\n".join(profile.format()), file=sys.stderr)
+
+
+def edit_file(args, profile):
+    from yaml_surgeon.yaml_operation import YamlOperation
+    if args.stream:
+        with open(args.filePath, 'r') as file:
+            operation = YamlOperation.from_stream(file, profile=profile)
+            build_operation(operation, args)
+            operation.execute_to(sys.stdout)
+        return
+    with open(args.filePath, 'rb') as file:
+        # Map the file rather than reading it, so that unchanged lines are copied straight from it to the output
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(file.fileno()).st_size else b''
+        try:
+            if args.cache or args.cacheDir:
+                from yaml_surgeon.yaml_cache import DiskCache
+                operation = DiskCache(args.cacheDir).operation_for_buffer(buffer, profile=profile, jobs=args.jobs)
+            else:
+                operation = YamlOperation.from_buffer(buffer, profile=profile, jobs=args.jobs)
+            build_operation(operation, args)
+            sys.stdout.flush()
+            operation.execute_to(sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+        finally:
+            if isinstance(buffer, mmap.mmap):
+                buffer.close()
+
+
+def cache_main(argv):
+    from yaml_surgeon.yaml_cache import DiskCache
+    parser = argparse.ArgumentParser(prog=f"{os.path.basename(sys.argv[0])} cache",
+                                     description='Manage the on disk cache of parsed files')
+    parser.add_argument('action', choices=['stats', 'prune'],
+                        help='Show the size of the cache, or remove the least recently used files from it')
+    parser.add_argument('--cacheDir', type=str, help='Directory of the on disk cache')
+    parser.add_argument('--maxSize', type=parse_size, default=0,
+                        help='Size to prune the cache down to, in bytes or with a K, M or G suffix (default 0)')
+
+    args = parser.parse_args(argv)
+    cache = DiskCache(args.cacheDir)
+    if args.action == 'prune':
+        print(f"Removed {cache.prune(args.maxSize)} files")
+    stats = cache.stats()
+    print(f"{stats['directory']}: {stats['files']} files, {stats['size'] / 1e6:.1f}MB")
+
+
+def parse_size(size):
+    """
+    Converts a size such as 4096, 64K, 1M or 1G into bytes
+    """
+    multiplier = 1
+    suffix = size[-1:].upper()
+    if suffix in size_suffixes:
+        multiplier = size_suffixes[suffix]
+        size = size[:-1]
+    try:
+        return int(float(size) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {size}")
+
+
+size_suffixes = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+
+
+def build_operation(operation, args):
+    if args.named:
+        operation.named(*args.named)
+    if args.nameContains:
+        operation.name_contains(*args.nameContains)
+    if args.namedAtLevel:
+        operation.named_at_level(args.namedAtLevel[0], int(args.namedAtLevel[1]))
+    if args.withParents:
+        operation.with_parents(*args.withParents)
+    if args.withParentAtLevel:
+        operation.with_parent_at_level(args.withParentAtLevel[0], int(args.withParentAtLevel[1]))
+    if args.path:
+        operation.at_path(*args.path)
+    if args.rename:
+        operation.rename(args.rename)
+    if args.delete:
+        operation.delete()
+    if args.duplicateAs:
+        operation.duplicate_as(args.duplicateAs)
+    if args.insertSibling:
+        operation.insert_sibling(args.insertSibling)
+    return operation
@@ -1,28 +1,85 @@
+import threading
+
+# Bit flags for each type of token, so that a token can be checked for a type without searching its list of types
+COMMENT = 1
+SEQUENCE = 2
+MAPPING = 4
+SCALAR = 8
+type_flags = {'Comment': COMMENT, 'Sequence': SEQUENCE, 'Mapping': MAPPING, 'Scalar': SCALAR}
+
+# Each distinct sequence of types is stored once, and tokens refer to it by its position in these tables. There are only
+# a handful of distinct sequences in practice, so this replaces a list per token with a small int
+token_types = []
+token_type_flags = []
+_token_type_codes = {}
+_token_types_lock = threading.Lock()
+
+
+def type_code(types):
+    """
+    Returns the code of a sequence of types, such as ['Mapping', 'Sequence'] or a single type name, adding it to the
+    tables if it has not been seen before
+    """
+    types = (types,) if isinstance(types, str) else tuple(types)
+    code = _token_type_codes.get(types)
+    if code is None:
+        with _token_types_lock:
+            code = _token_type_codes.get(types)
+            if code is None:
+                code = len(token_types)
+                token_types.append(types)
+                flags = 0
+                for token_type in types:
+                    flags |= type_flags.get(token_type, 0)
+                token_type_flags.append(flags)
+                _token_type_codes[types] = code
+    return code
 
 
 class Token:
+    __slots__ = ('value', 'type_code')
+
     def __init__(self, value, types):
         self.value = value
-        # Types can be Comment, Sequence, Mapping, or Scalar
-        self.types = types
+        # Types can be Comment, Sequence, Mapping, or Scalar, stored as the code of the sequence of types
+        self.type_code = type_code(types)
+
+    @property
+    def types(self):
+        return list(token_types[self.type_code])
+
+    @property
+    def flags(self):
+        return token_type_flags[self.type_code]
 
     def __eq__(self, other):
         if isinstance(other, Token):
             return (self.value == other.value and
-                    self.types == other.types)
+                    self.type_code == other.type_code)
         return False
 
+    def __reduce__(self):
+        # Type codes depend on the order types were first seen, so are not the same in other processes
+        return Token, (self.value, token_types[self.type_code])
+
     def __repr__(self):
         return f"Token(value='{self.value}', " \
                f"types={self.types})"
 
 
 class Line:
-    def __init__(self, tokens, line_number, level):
+    __slots__ = ('tokens', 'line_number', 'level', 'text', 'start', 'end')
+
+    def __init__(self, tokens, line_number, level, text=None, start=None, end=None):
         # These are the Tokens from scanning the line
         self.tokens = tokens
         self.line_number = line_number
         self.level = level
+        # The text the tokens were scanned from if it is known, which is the same as joining the token values
+        self.text = text
+        # Where the line is in the buffer it was scanned from, if it was scanned from one, including its line ending
+        self.start = start
+        self.end = end
 
     def __eq__(self, other):
         if isinstance(other, Line):
@@ -38,6 +95,9 @@ class Line:
 
 
 class SyntaxNode:
+    __slots__ = ('name', 'renamed_to', 'start_line_number', 'end_line_number', 'children', 'flow_style',
+                 'is_block_sequence', 'is_map_value')
+
     def __init__(self, name, line_number, flow_style="", is_block_sequence=False, is_map_value=False):
         self.name = name
         self.renamed_to = None
@@ -60,33 +120,95 @@ class SyntaxNode:
         return self
 
     def deep_copy(self, insert_at_line):
-        # This copies the node to a position immediately under its last child
-        copied_node = SyntaxNode(self.name, insert_at_line, self.flow_style, self.is_block_sequence, self.is_map_value)
+        # This copies the node to a position immediately under its last child. The tree is walked with an explicit stack
+        # so that deeply nested documents do not hit the recursion limit
+        offset = insert_at_line - self.start_line_number
+        copied_node = self._copy_fields(offset)
+        copied_nodes = [copied_node]
+        stack = [(self, copied_node)]
+        while stack:
+            node, copy = stack.pop()
+            if node.children:
+                copy.children = [child._copy_fields(offset) for child in node.children]
+                copied_nodes.extend(copy.children)
+                stack.extend(zip(node.children, copy.children))
+        # Children are always copied after their parents, so going backwards each node is complete when its end is set
+        for copy in reversed(copied_nodes):
+            for child in copy.children:
+                copy.extend_end(child.end_line_number)
+        return copied_node
+
+    def copy_tree(self):
+        """
+        Returns an exact copy of the node and its descendants, which can be changed without affecting the original
+        """
+        copied_node = self._copy_node()
+        stack = [(self, copied_node)]
+        while stack:
+            node, copy = stack.pop()
+            if node.children:
+                copy.children = [child._copy_node() for child in node.children]
+                stack.extend(zip(node.children, copy.children))
+        return copied_node
+
+    def _copy_node(self):
+        copied_node = SyntaxNode(self.name, self.start_line_number, self.flow_style, self.is_block_sequence,
+                                 self.is_map_value)
+        copied_node.end_line_number = self.end_line_number
+        copied_node.renamed_to = self.renamed_to
+        return copied_node
+
+    def _copy_fields(self, offset):
+        copied_node = SyntaxNode(self.name, self.start_line_number + offset, self.flow_style, self.is_block_sequence,
+                                 self.is_map_value)
         copied_node.renamed_to = self.renamed_to
-        for child in self.children:
-            child_depth = child.start_line_number - self.start_line_number
-            copied_child = child.deep_copy(insert_at_line + child_depth)
-            copied_node.add_child(copied_child)
         return copied_node
 
     def shift(self, shift_amount):
-        self.start_line_number += shift_amount
-        self.end_line_number += shift_amount
-        for child in self.children:
-            child.shift(shift_amount)
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            node.start_line_number += shift_amount
+            node.end_line_number += shift_amount
+            stack.extend(node.children)
 
     def __eq__(self, other):
-        if isinstance(other, SyntaxNode):
-            return (self.name == other.name and
-                    self.start_line_number == other.start_line_number and
-                    self.end_line_number == other.end_line_number and
-                    self.renamed_to == other.renamed_to and
-                    self.flow_style == other.flow_style and
-                    self.is_block_sequence == other.is_block_sequence and
-                    self.children == other.children)
-        return False
+        # Compares the trees with an explicit stack of pairs of lists of children rather than recursing into each child
+        stack = [((self,), (other,))]
+        while stack:
+            nodes, other_nodes = stack.pop()
+            for node, other in zip(nodes, other_nodes):
+                if not (isinstance(other, SyntaxNode) and
+                        node.name == other.name and
+                        node.start_line_number == other.start_line_number and
+                        node.end_line_number == other.end_line_number and
+                        node.renamed_to == other.renamed_to and
+                        node.flow_style == other.flow_style and
+                        node.is_block_sequence == other.is_block_sequence and
+                        len(node.children) == len(other.children)):
+                    return False
+                if node.children:
+                    stack.append((node.children, other.children))
+        return True
 
     def __repr__(self):
+        # Nodes are written out in document order from a stack holding both nodes and the text which closes them
+        parts = []
+        stack = [self]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item)
+                continue
+            parts.append(item._repr_fields())
+            stack.append("])")
+            for i in range(len(item.children) - 1, -1, -1):
+                stack.append(item.children[i])
+                if i:
+                    stack.append(", ")
+        return "".join(parts)
+
+    def _repr_fields(self):
         return f"SyntaxNode(name='{self.name}', " \
                f"start_line_number='{self.start_line_number}', " \
                f"end_line_number='{self.end_line_number}', " \
@@ -94,4 +216,4 @@ class SyntaxNode:
                f"flow_style='{self.flow_style}', " \
                f"is_block_sequence='{self.is_block_sequence}', " \
                f"is_map_value='{self.is_map_value}', " \
-               f"children={self.children})"
+               f"children=["
@@ -0,0 +1,78 @@
+import unittest
+from yaml_surgeon.yaml_operation import YamlOperation
+
+
+class TestBatch(unittest.TestCase):
+
+    yaml_content = """
+        - spam:
+            - egg: true
+            - ham:
+                # Lovely
+                - spam
+            - bacon: [egg, spam]
+            - a: a
+        - sausage:
+            - bacon: [egg, spam] # Crispy
+            - beans: {spam: spam}
+            - toast"""
+
+    def assert_batch_matches_then(self, rules):
+        # Rules which do not overlap should give the same result as applying them one after another
+        operation = YamlOperation(self.yaml_content)
+        for rule in rules:
+            rule(operation).then()
+        expected = YamlOperation(operation.nodes, operation.lexed_lines).named('').rename('').execute()
+        self.assertEqual(expected, YamlOperation(self.yaml_content).batch(rules))
+
+    def test_batch_renames(self):
+        self.assert_batch_matches_then([
+            lambda operation: operation.named('bacon').rename('streaky'),
+            lambda operation: operation.named('toast').rename('bread'),
+            lambda operation: operation.named('a').with_parents('a').rename('b'),
+        ])
+
+    def test_batch_mixed_operations(self):
+        self.assert_batch_matches_then([
+            lambda operation: operation.named('ham').delete(),
+            lambda operation: operation.named('egg').with_parents('bacon').delete(),
+            lambda operation: operation.named('beans').duplicate_as('peas'),
+            lambda operation: operation.named('toast').insert_sibling('jam'),
+        ])
+
+    def test_batch_flow_deletes_do_not_affect_other_rules(self):
+        self.assert_batch_matches_then([
+            lambda operation: operation.named('egg').with_parents('sausage').delete(),
+            lambda operation: operation.named('egg').with_parents('spam').rename('yolk'),
+        ])
+
+    def test_batch_duplicates_flow_mapping_entries(self):
+        # Duplicating an entry of a flow mapping copies the value from its child
+        self.assert_batch_matches_then([
+            lambda operation: operation.named('spam').with_parents('beans').duplicate_as('peas'),
+            lambda operation: operation.named('toast').rename('bread'),
+        ])
+        self.assertEqual(['zed: {spam: a, dd: a}', 'x: 1'],
+                         YamlOperation('zed: {spam: a}\nx: 1').batch([
+                             lambda operation: operation.named('spam').duplicate_as('dd')]))
+
+    def test_batch_rule_without_matches(self):
+        self.assert_batch_matches_then([
+            lambda operation: operation.named('missing').delete(),
+            lambda operation: operation.named('toast').rename('bread'),
+        ])
+
+    def test_batch_conflicts(self):
+        with self.assertRaises(ValueError):
+            YamlOperation(self.yaml_content).batch([
+                lambda operation: operation.named('ham').delete(),
+                lambda operation: operation.named('spam').with_parents('ham').rename('eggs'),
+            ])
+
+    def test_batch_rule_without_operation(self):
+        with self.assertRaises(ValueError):
+            YamlOperation(self.yaml_content).batch([lambda operation: operation.named('ham')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import io
+import mmap
+import tempfile
+import unittest
+from yaml_surgeon.yaml_operation import YamlOperation
+
+
+class TestBuffer(unittest.TestCase):
+
+    yaml_content = """- spam:
+    - egg: true
+    - ham:
+        # Lovely
+        - spam
+    - bacon: [egg, spam]
+- sausage:
+    - bacon: [egg, spam]
+    - beans: {spam: spam}
+"""
+
+    def write_from_buffer(self, buffer, build, output):
+        build(YamlOperation.from_buffer(buffer)).execute_to(output)
+        return output.getvalue()
+
+    def assert_buffer_matches_execute(self, build):
+        expected = "\n".join(build(YamlOperation(self.yaml_content)).execute()) + "\n"
+        buffer = self.yaml_content.encode('utf-8')
+        self.assertEqual(expected.encode('utf-8'), self.write_from_buffer(buffer, build, io.BytesIO()))
+        self.assertEqual(expected, self.write_from_buffer(buffer, build, io.StringIO()))
+
+    def test_buffer_rename(self):
+        self.assert_buffer_matches_execute(lambda operation: operation.named('bacon').rename('streaky'))
+
+    def test_buffer_delete(self):
+        self.assert_buffer_matches_execute(lambda operation: operation.named('ham').delete())
+
+    def test_buffer_duplicate(self):
+        self.assert_buffer_matches_execute(lambda operation: operation.named('beans').duplicate_as('peas'))
+
+    def test_buffer_insert(self):
+        self.assert_buffer_matches_execute(lambda operation: operation.named('sausage').insert_sibling('toast'))
+
+    def test_buffer_without_final_newline(self):
+        buffer = b"- spam\n- egg"
+        output = self.write_from_buffer(buffer, lambda operation: operation.named('spam').rename('ham'), io.BytesIO())
+        self.assertEqual(b"- ham\n- egg\n", output)
+
+    def test_buffer_duplicate_last_line_without_final_newline(self):
+        buffer = b"- spam:\n    - egg"
+        output = self.write_from_buffer(buffer, lambda operation: operation.named('spam').duplicate_as('ham'),
+                                        io.BytesIO())
+        self.assertEqual(b"- spam:\n    - egg\n- ham:\n    - egg\n", output)
+
+    def test_buffer_keeps_line_endings(self):
+        buffer = b"- spam:\r\n    - egg\r\n- ham\r\n"
+        output = self.write_from_buffer(buffer, lambda operation: operation.named('ham').rename('bacon'), io.BytesIO())
+        self.assertEqual(b"- spam:\r\n    - egg\r\n- bacon\r\n", output)
+        output = self.write_from_buffer(buffer, lambda operation: operation.named('spam').duplicate_as('toast'),
+                                        io.BytesIO())
+        self.assertEqual(b"- spam:\r\n    - egg\r\n- toast:\r\n    - egg\r\n- ham\r\n", output)
+
+    def test_mmap(self):
+        with tempfile.TemporaryFile() as file:
+            file.write(self.yaml_content.encode('utf-8'))
+            file.flush()
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                output = self.write_from_buffer(buffer, lambda operation: operation.named('egg').delete(), io.BytesIO())
+        expected = "\n".join(YamlOperation(self.yaml_content).named('egg').delete().execute()) + "\n"
+        self.assertEqual(expected.encode('utf-8'), output)
+
+    def test_buffer_then(self):
+        operation = YamlOperation.from_buffer(self.yaml_content.encode('utf-8'))
+        operation.named('egg').delete().then()
+        operation.named('spam').with_parents('beans').rename('toast')
+        expected = YamlOperation(self.yaml_content).named('egg').delete().then()
+        expected = "\n".join(expected.named('spam').with_parents('beans').rename('toast').execute()) + "\n"
+        output = io.BytesIO()
+        operation.execute_to(output)
+        self.assertEqual(expected.encode('utf-8'), output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
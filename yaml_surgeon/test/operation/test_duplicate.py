@@ -117,6 +117,18 @@ class TestDuplicate(unittest.TestCase):
         self.assertEqual(expected_yaml_content, output_yaml_string,
                          "The output YAML should match the expected content including insertion")
 
+    def test_node_duplicate_many_blocks(self):
+        yaml_content = "\n".join(f"- item{index}:\n    - value: {index}" for index in range(50))
+        lexed_lines = scan_text(yaml_content)
+        parsed_yaml = parse_line_tokens(lexed_lines)
+        output_yaml = YamlOperation(parsed_yaml, lexed_lines).named('value').duplicate_as('copy').execute()
+        expected_yaml_content = "\n".join(f"- item{index}:\n    - value: {index}\n    - copy: {index}"
+                                           for index in range(50))
+        self.assertEqual(expected_yaml_content, "\n".join(output_yaml))
+        # The document which was operated on is left as it was
+        self.assertEqual(scan_text(yaml_content), lexed_lines)
+        self.assertEqual(parse_line_tokens(scan_text(yaml_content)), parsed_yaml)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
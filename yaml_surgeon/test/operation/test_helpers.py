@@ -1,7 +1,8 @@
 import unittest
 from yaml_surgeon.yaml_lexer import scan_text
 from yaml_surgeon.yaml_parser import parse_line_tokens
-from yaml_surgeon.yaml_operation import find_children_of_node_called,create_line_number_map
+from yaml_surgeon.yaml_operation import find_children_of_node_called,create_line_number_map, find_nodes_called, \
+    find_nodes_containing
 from yaml_surgeon.structures import SyntaxNode
 
 
@@ -96,6 +97,21 @@ class TestHelpers(unittest.TestCase):
         self.assertEqual(len(line_map['4']), 3, "There should be three nodes on line 4")
         self.assertEqual(len(line_map['5']), 2, "There should be two nodes on line 5")
 
+    def test_deeply_nested_document(self):
+        # Deeper than the recursion limit, which the searches must not depend on
+        depth = 2000
+        yaml_content = "\n".join(" " * i + f"n{i}:" for i in range(depth)) + "\n" + " " * depth + "leaf"
+        parsed_yaml = parse_line_tokens(scan_text(yaml_content))
+
+        assert_syntax_nodes_equal([SyntaxNode('leaf', depth)], find_nodes_called(parsed_yaml, 'leaf'))
+        assert_syntax_nodes_equal([SyntaxNode('n5', 5)], find_nodes_called(parsed_yaml, 'n5', at_level=5))
+        self.assertEqual([], find_nodes_called(parsed_yaml, 'n5', at_level=4))
+        result = find_nodes_containing(parsed_yaml, 'n199')
+        self.assertEqual(['n199'] + [f"n199{i}" for i in range(10)], [node.name for node in result])
+        assert_syntax_nodes_equal([SyntaxNode('leaf', depth)],
+                                  find_children_of_node_called(parsed_yaml, f"n{depth - 1}"))
+        self.assertEqual(list(range(depth + 1)), list(create_line_number_map(parsed_yaml)))
+
 
 def assert_syntax_nodes_equal(expected, actual):
     assert len(expected) == len(actual), f"Expected {len(expected)} nodes, found {len(actual)} nodes"
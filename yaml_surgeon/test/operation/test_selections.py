@@ -86,6 +86,21 @@ class TestYamlOperationSelections(unittest.TestCase):
         self.assertEqual(selected_nodes[1].name, 'srv-100', 'srv-100')
         self.assertEqual(selected_nodes[2].name, 'srv-300', 'srv-300')
 
+    def test_shared_index(self):
+        yaml_content = """
+        - parent1:
+            - srv-100:
+                fast: true
+        - parent2:
+            - srv-100:
+                secure: true"""
+        operation = YamlOperation(yaml_content)
+        index = operation.get_index()
+        for parent, child in [('parent1', 'fast'), ('parent2', 'secure')]:
+            selected_nodes = YamlOperation(operation.nodes, operation.lexed_lines, index)\
+                .named('srv-100').with_parents(parent).get_selected_nodes()
+            self.assertEqual([child], [node.name for node in selected_nodes[0].children])
+
     def test_node_select_level(self):
         yaml_content = """
             - spam:
@@ -125,6 +140,34 @@ class TestYamlOperationSelections(unittest.TestCase):
         self.assertEqual(expected_yaml_content, output_yaml_string,
                          "The output YAML should match the expected content with duplicates")
 
+    def test_at_path(self):
+        yaml_content = """spec:
+  containers:
+    - image: nginx
+    - image: redis
+  sidecar:
+    image: busybox
+metadata:
+  image: none
+"app.kubernetes.io":
+  image: quoted"""
+        output_yaml = YamlOperation(yaml_content).at_path('spec.containers.image').rename('img').execute()
+        self.assertEqual(yaml_content.replace('- image', '- img'), "\n".join(output_yaml))
+        output_yaml = YamlOperation(yaml_content).at_path('spec.*.image', '"app.kubernetes.io".image').delete()\
+                                                 .execute()
+        self.assertEqual("""spec:
+  containers:
+  sidecar:
+metadata:
+  image: none
+"app.kubernetes.io":""", "\n".join(output_yaml))
+        selected_nodes = YamlOperation(yaml_content).at_path('**.image').named('busybox').get_selected_nodes()
+        self.assertEqual(['busybox'], [node.name for node in selected_nodes])
+        selected_nodes = YamlOperation(yaml_content).at_path('*.*').at_path('metadata.image').get_selected_nodes()
+        self.assertEqual(['image'], [node.name for node in selected_nodes])
+        with self.assertRaises(ValueError):
+            YamlOperation(yaml_content).at_path('spec..image')
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
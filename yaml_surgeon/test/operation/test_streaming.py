@@ -0,0 +1,52 @@
+import io
+import unittest
+from yaml_surgeon.yaml_operation import YamlOperation
+
+
+class TestStreaming(unittest.TestCase):
+
+    yaml_content = """- spam:
+    - egg: true
+    - ham:
+        # Lovely
+        - spam
+    - bacon: [egg, spam]
+# Between the blocks
+- sausage:
+    - bacon: [egg, spam]
+    - beans: {spam: spam}
+- egg"""
+
+    def stream(self, build):
+        output = io.StringIO()
+        build(YamlOperation.from_stream(io.StringIO(self.yaml_content))).execute_to(output)
+        return output.getvalue()
+
+    def assert_stream_matches_execute(self, build):
+        expected = "\n".join(build(YamlOperation(self.yaml_content)).execute()) + "\n"
+        self.assertEqual(expected, self.stream(build))
+
+    def test_stream_rename(self):
+        self.assert_stream_matches_execute(lambda operation: operation.named('bacon').rename('ham'))
+
+    def test_stream_delete(self):
+        self.assert_stream_matches_execute(lambda operation: operation.named('egg').delete())
+
+    def test_stream_delete_with_parents(self):
+        self.assert_stream_matches_execute(lambda operation: operation.named('spam').with_parents('bacon').delete())
+
+    def test_stream_duplicate(self):
+        self.assert_stream_matches_execute(lambda operation: operation.named('bacon').duplicate_as('can'))
+
+    def test_stream_insert_sibling_not_supported(self):
+        with self.assertRaises(ValueError):
+            self.stream(lambda operation: operation.named('ham').insert_sibling('bacon'))
+
+    def test_execute_to_without_stream(self):
+        output = io.StringIO()
+        YamlOperation(self.yaml_content).named('beans').rename('peas').execute_to(output)
+        self.assertIn("    - peas: {spam: spam}\n", output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
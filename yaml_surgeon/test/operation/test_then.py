@@ -0,0 +1,73 @@
+import unittest
+from yaml_surgeon.yaml_lexer import scan_text
+from yaml_surgeon.yaml_parser import parse_line_tokens
+from yaml_surgeon.yaml_operation import YamlOperation
+
+
+class TestThen(unittest.TestCase):
+
+    yaml_content = """
+        - spam:
+            - egg: true
+            - ham:
+                # Lovely
+                - spam
+            - bacon: [egg, spam]
+            - a: a
+        - sausage:
+            - bacon: [egg, spam] # Crispy
+            - beans: {spam: spam}"""
+
+    def assert_matches_full_parse(self, operation):
+        # The lines and nodes kept by then() should be the same as lexing and parsing its output from scratch
+        output = "\n".join(YamlOperation(operation.nodes, operation.lexed_lines).named('').rename('').execute())
+        self.assertEqual(scan_text(output), operation.lexed_lines)
+        self.assertEqual(parse_line_tokens(scan_text(output)), operation.nodes)
+
+    def test_then_rename_patches_nodes(self):
+        operation = YamlOperation(self.yaml_content)
+        nodes = operation.nodes
+        operation.named('bacon').rename('streaky').then()
+        self.assertIs(nodes, operation.nodes, "Renames should patch the existing nodes")
+        self.assertEqual(['streaky', 'streaky'], [node.name for node in operation.named('streaky').get_selected_nodes()])
+        self.assert_matches_full_parse(operation)
+
+    def test_then_rename_value_matching_key(self):
+        operation = YamlOperation(self.yaml_content).named('a').with_parents('a').rename('b').then()
+        self.assert_matches_full_parse(operation)
+
+    def test_then_rename_changing_structure(self):
+        operation = YamlOperation(self.yaml_content).named('egg').rename('egg, toast').then()
+        self.assert_matches_full_parse(operation)
+
+    def test_then_chain(self):
+        operation = YamlOperation(self.yaml_content)
+        operation.named('egg').with_parents('bacon').delete().then()
+        self.assert_matches_full_parse(operation)
+        operation.named('bacon').with_parents('spam').duplicate_as('can').then()
+        self.assert_matches_full_parse(operation)
+        operation.named('spam').with_parents('beans').duplicate_as('ham').then()
+        self.assert_matches_full_parse(operation)
+        operation.named('ham').with_parents('spam').insert_sibling('toast').then()
+        self.assert_matches_full_parse(operation)
+        operation.named('true').rename('false').then()
+        self.assert_matches_full_parse(operation)
+        operation.named('sausage').delete().then()
+        self.assert_matches_full_parse(operation)
+
+    def test_then_duplicate_shares_tokens_until_modified(self):
+        operation = YamlOperation(self.yaml_content).named('sausage').duplicate_as('chips').then()
+        self.assert_matches_full_parse(operation)
+        bacon_lines = [line for line in operation.lexed_lines if 'bacon' in (line.text or '')]
+        self.assertIs(bacon_lines[1].tokens, bacon_lines[2].tokens, "The copied lines should share their tokens")
+        # Changing the copy must not change the original
+        operation.named('spam').with_parents('chips').with_parents('bacon').rename('ham').then()
+        self.assert_matches_full_parse(operation)
+        output = operation.named('').rename('').execute()
+        self.assertEqual(["            - bacon: [egg, spam] # Crispy", "            - beans: {spam: spam}",
+                          "        - chips:", "            - bacon: [egg, ham] # Crispy",
+                          "            - beans: {spam: spam}"], output[-5:])
+
+
+if __name__ == '__main__':
+    unittest.main()
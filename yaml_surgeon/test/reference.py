@@ -0,0 +1,42 @@
+"""
+Reference versions of what the document index and selection plan do, walking the whole tree for each step as the
+selections were originally applied, which the tests compare the index and plan against and the benchmarks time
+"""
+from yaml_surgeon.yaml_operation import find_nodes_called, find_nodes_containing, find_children_of_node_called, \
+    find_nodes_at_path
+from yaml_surgeon.yaml_query import SelectionPlan
+from yaml_surgeon.structures import SyntaxNode
+
+
+def select_in_loops(nodes, selections):
+    # Applies each kind of selection in turn by walking the tree, as the selections were originally applied
+    selected_nodes = nodes
+    # Paths are resolved first, keeping the nodes which match every path selection
+    path_matches = [{id(node): node for node in find_nodes_at_path(nodes, *args)}
+                    for op, *args in selections if op == 'path']
+    if path_matches:
+        selected_nodes = [node for node in path_matches[0].values() if all(id(node) in other for other in path_matches)]
+    for kind in SelectionPlan.stage_order:
+        for op, *args in selections:
+            if op != kind:
+                continue
+            if op == 'parent':
+                selected_nodes = find_children_of_node_called(selected_nodes, *args, level=None)
+            elif op == 'parent_level':
+                selected_nodes = find_children_of_node_called(selected_nodes, args[0], level=args[1])
+            elif op == 'named_level':
+                selected_nodes = find_nodes_called(selected_nodes, args[0], at_level=args[1])
+            elif op == 'named':
+                selected_nodes = find_nodes_called(selected_nodes, *args)
+            else:
+                selected_nodes = find_nodes_containing(selected_nodes, *args)
+    return selected_nodes
+
+
+def random_tree(generator, names, depth=0):
+    # A node named from names with up to three children at each level, down to five levels below it
+    node = SyntaxNode(generator.choice(names), 0)
+    if depth < 5:
+        for _ in range(generator.randint(0, 3)):
+            node.add_child(random_tree(generator, names, depth + 1))
+    return node
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_python(*args):
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True, cwd=ROOT)
+
+
+class TestCli(unittest.TestCase):
+
+    def test_optional_modules_are_not_imported(self):
+        result = run_python('-c', "import sys, yaml_surgeon.cli; print(' '.join(sys.modules))")
+        modules = result.stdout.split()
+        for module in ['yaml_surgeon.yaml_operation', 'yaml_surgeon.yaml_index', 'yaml_surgeon.yaml_query',
+                       'yaml_surgeon.yaml_files', 'yaml_surgeon.yaml_cache', 'concurrent.futures', 'tempfile',
+                       'tracemalloc']:
+            self.assertNotIn(module, modules)
+
+    def test_cache_command_does_not_import_operations(self):
+        with tempfile.TemporaryDirectory() as directory:
+            result = run_python('-c', "import sys; from yaml_surgeon.cli import main; main(); "
+                                      "print(' '.join(sys.modules), file=sys.stderr)",
+                                'cache', 'stats', '--cacheDir', directory)
+        self.assertEqual(f"{directory}: 0 files, 0.0MB\n", result.stdout)
+        self.assertNotIn('yaml_surgeon.yaml_operation', result.stderr.split())
+
+    def test_run_as_module(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'spam.yaml')
+            with open(path, 'w') as file:
+                file.write("- spam:\n    - egg: true\n")
+            for command in [['-m', 'yaml_surgeon'], ['yaml_surgeon.py']]:
+                result = run_python(*command, '--filePath', path, '--named', 'egg', '--rename', 'ham')
+                self.assertEqual("- spam:\n    - ham: true\n", result.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import random
+import unittest
+from yaml_surgeon.yaml_lexer import scan_text, engines, AlphaSpansStateMachine, RegexSpansLexer
+
+
+class TestLexerEngines(unittest.TestCase):
+    """
+    Differential tests which check every lexer engine produces exactly the same output as the reference state machine
+    """
+
+    corpus = [
+        """
+            - spam:
+                - egg: true
+                - ham:
+                    # Lovely
+                    - spam
+                - bacon: [egg, spam]
+            - sausage:
+                - bacon: [egg, spam]
+                - beans: {spam: spam}""",
+        "a: foo \nb: c",
+        "key: don't stop  # it's a comment\nother: 'quoted # not a comment' tail",
+        "name: Set up Python\nlist: [ 'a', \"b\" , c_d ]\nmap: {x: {y: [1, 2]}}",
+        "- srv_100 'quoted' \"unterminated\n- a''b\n- x -: [y\n-\n\n\t- tabbed:\tvalue",
+        "unicode: café²\nemoji: a🙂b\n...\n---\n# Document start",
+    ]
+
+    @staticmethod
+    def load_yaml_sample(file_name):
+        with open("../samples/" + file_name, 'r') as file:
+            text = file.read()
+        return text
+
+    def assert_engines_match(self, text):
+        expected = scan_text(text, engine='state_machine')
+        for engine in engines:
+            self.assertEqual(expected, scan_text(text, engine=engine), f"Engine {engine} differs for {text!r}")
+        # Unchanged lines are rendered from the text they were scanned from, so it must match the tokens exactly
+        for line in expected:
+            self.assertEqual(''.join(token.value for token in line.tokens), line.text)
+
+    def test_samples(self):
+        for file_name in ["valid1.yaml", "valid2.yaml", "valid3.yaml"]:
+            self.assert_engines_match(self.load_yaml_sample(file_name))
+
+    def test_corpus(self):
+        for text in self.corpus:
+            self.assert_engines_match(text)
+
+    def test_random_lines(self):
+        reference = AlphaSpansStateMachine()
+        lexer = RegexSpansLexer()
+        generator = random.Random(42)
+        alphabet = "ab1Z_ \t-:[]{},#'\".é²!/"
+        for _ in range(20000):
+            line = ''.join(generator.choice(alphabet) for _ in range(generator.randint(0, 16)))
+            self.assertEqual(reference.parse(line), lexer.parse(line), f"Spans differ for {line!r}")
+
+    def test_lookahead_does_not_leak_into_next_line(self):
+        lines = scan_text("a: foo \nb: c", engine='state_machine')
+        self.assertEqual(['b', ': ', 'c'], [token.value for token in lines[1].tokens])
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            scan_text("a: b", engine='missing')
+
+
+if __name__ == '__main__':
+    unittest.main()
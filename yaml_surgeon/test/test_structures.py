@@ -0,0 +1,82 @@
+import pickle
+import unittest
+from yaml_surgeon.structures import Token, SyntaxNode, COMMENT, MAPPING, SEQUENCE, SCALAR
+
+
+class TestStructures(unittest.TestCase):
+
+    def test_token_types(self):
+        token = Token(': [', ['Mapping', 'Sequence'])
+        self.assertEqual(['Mapping', 'Sequence'], token.types)
+        self.assertEqual(MAPPING | SEQUENCE, token.flags)
+        self.assertFalse(token.flags & (COMMENT | SCALAR))
+        self.assertEqual(Token(': [', ['Mapping', 'Sequence']), token)
+        self.assertNotEqual(Token(': [', ['Sequence', 'Mapping']), token)
+        self.assertEqual(['Mapping'], Token(', spam:', 'Mapping').types)
+
+    def test_token_pickle(self):
+        token = Token('"spam"', ['Scalar'])
+        self.assertEqual(token, pickle.loads(pickle.dumps(token)))
+
+    def test_node_children(self):
+        leaf = SyntaxNode('egg', 1)
+        self.assertEqual(0, len(leaf.children))
+        node = SyntaxNode('spam', 0)
+        node.add_child(leaf)
+        self.assertEqual([leaf], node.children)
+        self.assertEqual(1, node.end_line_number)
+        self.assertEqual(0, len(SyntaxNode('ham', 2).children), "Adding a child should not affect other nodes")
+        self.assertEqual(node, node.deep_copy(0))
+        # Leaves have their own list of children, which can be added to directly
+        leaf.children.append(SyntaxNode('ham', 2))
+        copied_node = node.copy_tree()
+        self.assertEqual(node, copied_node)
+        copied_node.children[0].children[0].children.append(SyntaxNode('bacon', 3))
+        self.assertEqual([], node.children[0].children[0].children)
+
+    def test_deeply_nested_nodes(self):
+        # Deeper than the recursion limit, which comparing, copying, shifting and printing must not depend on
+        depth = 5000
+        node = root = SyntaxNode(f"n{depth - 1}", depth - 1)
+        for i in range(depth - 2, -1, -1):
+            parent = SyntaxNode(f"n{i}", i)
+            parent.add_child(root)
+            root = parent
+
+        copy = root.deep_copy(10)
+        self.assertEqual(10, copy.start_line_number)
+        self.assertEqual(depth + 9, copy.end_line_number)
+        self.assertNotEqual(root, copy)
+        copy.shift(-10)
+        self.assertEqual(root, copy)
+        node.rename('spam')
+        self.assertNotEqual(root, copy)
+        text = repr(root)
+        self.assertTrue(text.startswith("SyntaxNode(name='n0', start_line_number='0', end_line_number='4999', "))
+        self.assertTrue(text.endswith("is_map_value='False', children=[])" + "])" * (depth - 1)))
+
+    def test_copy_tree(self):
+        node = SyntaxNode('spam', 0)
+        node.add_child(SyntaxNode('egg', 1))
+        node.extend_end(2)
+        copy = node.copy_tree()
+        self.assertEqual(node, copy)
+        copy.children[0].rename('ham')
+        copy.add_child(SyntaxNode('bacon', 3))
+        self.assertEqual(None, node.children[0].renamed_to)
+        self.assertEqual((1, 2), (len(node.children), node.end_line_number))
+
+    def test_node_repr(self):
+        node = SyntaxNode('spam', 0)
+        node.add_child(SyntaxNode('egg', 0))
+        node.add_child(SyntaxNode('ham', 1))
+        self.assertEqual("SyntaxNode(name='spam', start_line_number='0', end_line_number='1', renamed_to='None', "
+                         "flow_style='', is_block_sequence='False', is_map_value='False', children=["
+                         "SyntaxNode(name='egg', start_line_number='0', end_line_number='0', renamed_to='None', "
+                         "flow_style='', is_block_sequence='False', is_map_value='False', children=[]), "
+                         "SyntaxNode(name='ham', start_line_number='1', end_line_number='1', renamed_to='None', "
+                         "flow_style='', is_block_sequence='False', is_map_value='False', children=[])])", repr(node))
+
+
+if __name__ == '__main__':
+    unittest.main()
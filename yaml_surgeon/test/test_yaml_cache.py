@@ -0,0 +1,152 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from yaml_surgeon import yaml_cache, yaml_codec
+from yaml_surgeon.yaml_cache import ParseCache, DiskCache
+from yaml_surgeon.yaml_files import execute_all
+from yaml_surgeon.yaml_operation import YamlOperation
+
+
+class TestParseCache(unittest.TestCase):
+
+    yaml_content = """
+        - spam:
+            - egg: true
+            - ham: [egg, spam]
+        - bacon:
+            - spam"""
+
+    def test_operations_do_not_change_the_cache(self):
+        cache = ParseCache()
+        expected = render(YamlOperation(self.yaml_content))
+        renamed = cache.operation(self.yaml_content).named('spam').rename('beans').then()
+        renamed.named('egg').delete().then()
+        cache.operation(self.yaml_content).named('ham').insert_sibling('toast').execute()
+        cache.operation(self.yaml_content).named('spam').duplicate_as('beans').then()
+        self.assertEqual(expected, render(cache.operation(self.yaml_content)))
+        self.assertEqual(YamlOperation(self.yaml_content).nodes, cache.operation(self.yaml_content).nodes)
+        self.assertEqual({'hits': 4, 'misses': 1, 'evictions': 0, 'entries': 1, 'size': len(self.yaml_content)},
+                         cache.stats())
+
+    def test_eviction(self):
+        cache = ParseCache(max_entries=2)
+        for document in ["- spam", "- egg", "- spam", "- ham", "- egg"]:
+            cache.operation(document)
+        self.assertEqual((1, 4, 2), (cache.hits, cache.misses, cache.evictions))
+
+        cache = ParseCache(max_size=12)
+        for document in ["- spam", "- egg", "- ham", "- a very long document"]:
+            cache.operation(document)
+        self.assertEqual({'hits': 0, 'misses': 4, 'evictions': 1, 'entries': 2, 'size': 10}, cache.stats())
+
+    def test_operation_for_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'spam.yaml')
+            with open(path, 'w') as file:
+                file.write(self.yaml_content)
+            cache = ParseCache()
+            self.assertEqual(render(YamlOperation(self.yaml_content)), render(cache.operation_for_file(path)))
+            cache.operation_for_file(path)
+            with open(path, 'w') as file:
+                file.write("- toast\n")
+            os.utime(path, ns=(0, 0))
+            self.assertEqual(['- toast'], render(cache.operation_for_file(path)))
+            self.assertEqual((1, 2), (cache.hits, cache.misses))
+
+    def test_execute_all_with_cache(self):
+        documents = [f"- spam{index % 3}:\n    - egg: [ham, spam]" for index in range(30)]
+
+        def build(operation):
+            return operation.named('egg').duplicate_as('yolk')
+
+        cache = ParseCache()
+        expected = [build(YamlOperation(document)).execute() for document in documents]
+        self.assertEqual(expected, execute_all(documents, build, jobs=4, cache=cache))
+        self.assertEqual(30, cache.hits + cache.misses)
+        self.assertEqual(3, cache.stats()['entries'])
+
+
+class TestDiskCache(unittest.TestCase):
+
+    yaml_content = b"- spam:\n    - egg: true\n    - ham: [egg, spam]\n"
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def execute(self, cache, buffer):
+        output = io.BytesIO()
+        cache.operation_for_buffer(buffer).named('egg').rename('yolk').execute_to(output)
+        return output.getvalue()
+
+    def test_operation_for_buffer(self):
+        cache = DiskCache(self.directory.name)
+        expected = b"- spam:\n    - yolk: true\n    - ham: [yolk, spam]\n"
+        self.assertEqual(expected, self.execute(cache, self.yaml_content))
+        self.assertEqual(expected, self.execute(DiskCache(self.directory.name), self.yaml_content))
+        self.assertEqual(b"- yolk\n", self.execute(cache, b"- egg\n"))
+        self.assertEqual((0, 2), (cache.hits, cache.misses))
+        self.assertEqual(expected, self.execute(cache, self.yaml_content))
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+        self.assertEqual(2, cache.stats()['files'])
+
+    def test_invalid_files_are_replaced(self):
+        cache = DiskCache(self.directory.name)
+        self.execute(cache, self.yaml_content)
+        for name in os.listdir(self.directory.name):
+            with open(os.path.join(self.directory.name, name), 'wb') as file:
+                file.write(b'spam')
+        self.assertEqual(b"- spam:\n    - yolk: true\n    - ham: [yolk, spam]\n", self.execute(cache, self.yaml_content))
+        self.assertEqual((0, 2), (cache.hits, cache.misses))
+
+    def test_files_from_other_parse_versions_are_not_used(self):
+        cache = DiskCache(self.directory.name)
+        self.execute(cache, self.yaml_content)
+        next_version = yaml_codec.parse_version + 1
+        with mock.patch.object(yaml_cache, 'parse_version', next_version), \
+                mock.patch.object(yaml_codec, 'parse_version', next_version):
+            self.execute(cache, self.yaml_content)
+            self.execute(cache, self.yaml_content)
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+        self.assertEqual(2, cache.stats()['files'])
+
+    def test_truncated_files_are_replaced(self):
+        expected = b"- spam:\n    - yolk: true\n    - ham: [yolk, spam]\n"
+        cache = DiskCache(self.directory.name)
+        self.execute(cache, self.yaml_content)
+        (name,) = os.listdir(self.directory.name)
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'rb') as file:
+            data = file.read()
+        for length in [10, len(data) // 2, len(data) - 1]:
+            with open(path, 'wb') as file:
+                file.write(data[:length])
+            self.assertEqual(expected, self.execute(DiskCache(self.directory.name), self.yaml_content))
+        with open(path, 'rb') as file:
+            self.assertEqual(data, file.read())
+
+    def test_prune(self):
+        cache = DiskCache(self.directory.name)
+        for age, document in enumerate([b"- egg\n", b"- ham\n", b"- spam\n"]):
+            existing = set(os.listdir(self.directory.name))
+            self.execute(cache, document)
+            (name,) = set(os.listdir(self.directory.name)) - existing
+            os.utime(os.path.join(self.directory.name, name), (age, age))
+        self.assertEqual(1, cache.prune(cache.stats()['size'] - 1))
+        self.assertEqual(2, cache.stats()['files'])
+        self.execute(cache, b"- ham\n")
+        self.execute(cache, b"- egg\n")
+        self.assertEqual((1, 4), (cache.hits, cache.misses))
+        self.assertEqual(3, cache.prune(0))
+        self.assertEqual({'directory': self.directory.name, 'files': 0, 'size': 0}, cache.stats())
+
+
+def render(operation):
+    # An operation which changes nothing, to get the lines of the document
+    return operation.named('').rename('').execute()
+
+
+if __name__ == '__main__':
+    unittest.main()
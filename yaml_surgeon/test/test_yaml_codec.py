@@ -0,0 +1,53 @@
+import unittest
+from unittest import mock
+from yaml_surgeon import yaml_codec
+from yaml_surgeon.yaml_codec import encode_parsed, decode_parsed
+from yaml_surgeon.yaml_lexer import scan_text, scan_buffer
+from yaml_surgeon.yaml_parser import parse_line_tokens
+
+
+class TestYamlCodec(unittest.TestCase):
+
+    @staticmethod
+    def load_yaml_sample(file_name):
+        with open("../samples/" + file_name, 'r') as file:
+            text = file.read()
+        return text
+
+    def assert_round_trip(self, lexed_lines):
+        nodes = parse_line_tokens(lexed_lines)
+        decoded_lines, decoded_nodes = decode_parsed(encode_parsed(lexed_lines, nodes))
+        self.assertEqual(lexed_lines, decoded_lines)
+        self.assertEqual([(line.start, line.end) for line in lexed_lines],
+                         [(line.start, line.end) for line in decoded_lines])
+        self.assertEqual(nodes, decoded_nodes)
+        self.assertEqual([node.is_map_value for node in nodes], [node.is_map_value for node in decoded_nodes])
+        return decoded_lines
+
+    def test_round_trip(self):
+        for file_name in ["valid1.yaml", "valid2.yaml", "valid3.yaml"]:
+            yaml_content = self.load_yaml_sample(file_name)
+            self.assert_round_trip(scan_text(yaml_content))
+            self.assert_round_trip(scan_buffer(yaml_content.encode('utf-8')))
+
+    def test_round_trip_shares_tokens(self):
+        decoded_lines = self.assert_round_trip(scan_text("- spam: [egg, ham] # Lovely\n- spam: [egg, ham] # Lovely\n- ü"))
+        self.assertIs(decoded_lines[0].tokens[1], decoded_lines[1].tokens[1])
+        self.assertEqual("- ü", ''.join(token.value for token in decoded_lines[2].tokens))
+        self.assert_round_trip([])
+
+    def test_decode_rejects_other_versions(self):
+        lexed_lines = scan_text("- spam")
+        data = encode_parsed(lexed_lines, parse_line_tokens(lexed_lines))
+        with mock.patch.object(yaml_codec, '__version__', '0.0.0'):
+            with self.assertRaises(ValueError):
+                decode_parsed(data)
+        with mock.patch.object(yaml_codec, 'parse_version', yaml_codec.parse_version + 1):
+            with self.assertRaises(ValueError):
+                decode_parsed(data)
+        with self.assertRaises(ValueError):
+            decode_parsed(b'- spam\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
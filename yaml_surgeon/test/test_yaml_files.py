@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from yaml_surgeon import yaml_files
+from yaml_surgeon.yaml_files import find_yaml_files, process_files, format_summary, execute_all
+from yaml_surgeon.yaml_operation import YamlOperation
+
+
+class TestYamlFiles(unittest.TestCase):
+
+    yaml_content = """- spam:
+    - egg: true
+    - ham: [egg, spam]
+"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.root = self.directory.name
+        for path in ['a.yaml', 'nested/b.yml', 'nested/deeper/c.yaml']:
+            self.write(path, self.yaml_content)
+        self.write('nested/other.txt', self.yaml_content)
+        self.write('unmatched.yaml', "- bacon\n")
+
+    def write(self, path, text):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(text)
+
+    def read(self, path):
+        with open(os.path.join(self.root, path), 'r') as file:
+            return file.read()
+
+    def test_find_yaml_files(self):
+        files = find_yaml_files([os.path.join(self.root, 'nested'), os.path.join(self.root, '*.yaml')])
+        expected = ['a.yaml', 'nested/b.yml', 'nested/deeper/c.yaml', 'unmatched.yaml']
+        self.assertEqual(sorted(os.path.join(self.root, path) for path in expected), files)
+
+    def test_process_files_in_place(self):
+        files = find_yaml_files([self.root])
+        # Give each file a task of its own so that they are spread over the processes
+        with mock.patch.object(yaml_files, 'task_size', 1):
+            results = process_files(files, [('named', 'egg')], ('rename', 'yolk'), jobs=2)
+        self.assertEqual(files, [result.path for result in results])
+        self.assertEqual([True, True, True, False], [result.changed for result in results])
+        self.assertEqual([2, 2, 2, 0], [result.nodes_matched for result in results])
+        self.assertEqual([False, False, False, True], [result.skipped for result in results])
+        self.assertEqual("- spam:\n    - yolk: true\n    - ham: [yolk, spam]\n", self.read('nested/deeper/c.yaml'))
+        self.assertEqual("- bacon\n", self.read('unmatched.yaml'))
+        self.assertIn("4 files, 3 changed, 0 failed, 6 nodes matched", format_summary(results)[-1])
+        self.assertTrue(format_summary(results)[-1].endswith(", 1 skipped without lexing"))
+
+    def test_process_files_to_output_dir(self):
+        files = find_yaml_files([os.path.join(self.root, 'nested')])
+        process_files(files, [('named', 'ham')], ('delete', None), output_dir=os.path.join(self.root, 'out'))
+        self.assertEqual("- spam:\n    - egg: true\n", self.read('out/deeper/c.yaml'))
+        self.assertEqual(self.yaml_content, self.read('nested/deeper/c.yaml'))
+
+    def test_process_files_reports_errors(self):
+        self.write('invalid.yaml', "    - spam\n- egg\n")
+        results = process_files([os.path.join(self.root, 'invalid.yaml'), os.path.join(self.root, 'a.yaml')],
+                                [('named', 'egg')], ('rename', 'yolk'))
+        self.assertIn('SyntaxError', results[0].error)
+        self.assertTrue(results[1].changed)
+
+    def test_execute_all(self):
+        documents = [f"- spam{index}:\n    - egg: [ham, spam{index}]" for index in range(20)]
+
+        def build(operation):
+            return operation.named('egg').duplicate_as('yolk')
+
+        expected = [build(YamlOperation(document)).execute() for document in documents]
+        self.assertEqual(expected, execute_all(documents, build, jobs=4))
+
+
+if __name__ == '__main__':
+    unittest.main()
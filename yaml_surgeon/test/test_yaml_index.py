@@ -0,0 +1,72 @@
+import random
+import unittest
+from yaml_surgeon.yaml_lexer import scan_text
+from yaml_surgeon.yaml_parser import parse_line_tokens
+from yaml_surgeon.yaml_index import DocumentIndex
+from yaml_surgeon.yaml_operation import find_nodes_called, find_nodes_containing, find_children_of_node_called
+from yaml_surgeon.test.reference import random_tree
+
+
+class TestDocumentIndex(unittest.TestCase):
+
+    names = ['spam', 'egg', '"egg"', 'ham', 'bacon', '"spam"']
+
+    @staticmethod
+    def load_yaml_sample(file_name):
+        with open("../samples/" + file_name, 'r') as file:
+            text = file.read()
+        return text
+
+    def assert_same_nodes(self, expected, actual):
+        self.assertEqual([id(node) for node in expected], [id(node) for node in actual])
+
+    def assert_queries_match(self, nodes, roots):
+        index = DocumentIndex(nodes)
+        for names in [('spam',), ('egg',), ('spam', 'egg'), ('missing',)]:
+            self.assert_same_nodes(find_nodes_called(roots, *names), index.find_nodes_called(roots, *names))
+            self.assert_same_nodes(find_children_of_node_called(roots, *names),
+                                   index.find_children_of_node_called(roots, *names))
+            for level in range(4):
+                self.assert_same_nodes(find_nodes_called(roots, *names, at_level=level),
+                                       index.find_nodes_called(roots, *names, at_level=level))
+                self.assert_same_nodes(find_children_of_node_called(roots, *names, level=level),
+                                       index.find_children_of_node_called(roots, *names, level=level))
+        for substrings in [('am',), ('g', 'ba'), ('"',)]:
+            self.assert_same_nodes(find_nodes_containing(roots, *substrings),
+                                   index.find_nodes_containing(roots, *substrings))
+
+    def test_samples(self):
+        for file_name in ["valid1.yaml", "valid2.yaml", "valid3.yaml"]:
+            nodes = parse_line_tokens(scan_text(self.load_yaml_sample(file_name)))
+            self.assert_queries_match(nodes, nodes)
+
+    def test_random_trees(self):
+        generator = random.Random(7)
+        for _ in range(50):
+            nodes = [random_tree(generator, self.names) for _ in range(generator.randint(1, 4))]
+            self.assert_queries_match(nodes, nodes)
+            # Queries can also start from any nodes in the document, which may overlap
+            all_nodes = find_nodes_containing(nodes, '')
+            roots = [generator.choice(all_nodes) for _ in range(3)]
+            self.assert_queries_match(nodes, roots)
+
+    def test_parent_of(self):
+        nodes = parse_line_tokens(scan_text(self.load_yaml_sample("valid1.yaml")))
+        index = DocumentIndex(nodes)
+        settings = index.find_nodes_called(nodes, 'settings')[0]
+        self.assertEqual('srv-100', index.parent_of(settings).name)
+        self.assertIsNone(index.parent_of(nodes[0]))
+
+    def test_rename(self):
+        nodes = parse_line_tokens(scan_text(self.load_yaml_sample("valid1.yaml")))
+        index = DocumentIndex(nodes)
+        settings = index.find_nodes_called(nodes, 'settings')[1]
+        settings.name = 'options'
+        index.rename(settings, 'settings')
+        self.assertEqual(1, len(index.find_nodes_called(nodes, 'settings')))
+        self.assert_same_nodes([settings], index.find_nodes_called(nodes, 'options'))
+        self.assert_same_nodes([settings], index.find_nodes_called(nodes, 'options', at_level=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,8 @@
+import io
+import sys
+import threading
 import unittest
-from yaml_surgeon.yaml_lexer import scan_text, AlphaSpansStateMachine
+from yaml_surgeon.yaml_lexer import scan_text, iter_scan_lines, iter_buffer_lines, AlphaSpansStateMachine
 from yaml_surgeon.structures import Line, Token
 
 
@@ -260,5 +263,63 @@ class TestLexYaml(unittest.TestCase):
         self.assertEqual(yaml_content.strip(), reconstructed.strip())
 
 
+class TestStreamingLex(unittest.TestCase):
+
+    @staticmethod
+    def load_yaml_sample(file_name):
+        with open("../samples/" + file_name, 'r') as file:
+            text = file.read()
+        return text
+
+    def test_iter_scan_lines_from_file(self):
+        yaml_content = self.load_yaml_sample("valid2.yaml")
+        self.assertEqual(scan_text(yaml_content), list(iter_scan_lines(io.StringIO(yaml_content))))
+
+    def test_iter_scan_lines_from_buffer(self):
+        yaml_content = self.load_yaml_sample("valid3.yaml")
+        buffer = yaml_content.replace('\n', '\r\n').encode('utf-8')
+        self.assertEqual(scan_text(yaml_content), list(iter_scan_lines(iter_buffer_lines(buffer))))
+
+    def test_iter_scan_lines_is_lazy(self):
+        def lines():
+            yield "- spam: egg"
+            raise AssertionError("Only the first line should be read")
+        first_line = next(iter_scan_lines(lines()))
+        self.assertEqual('spam', first_line.tokens[1].value)
+
+
+class TestConcurrentLex(unittest.TestCase):
+
+    def test_threads_lex_distinct_documents(self):
+        # Every thread lexes its own documents with each engine at the same time, and must see the same lines as when
+        # they are lexed one at a time
+        documents = ["\n".join(f"- item{thread}_{line}: [a{line}, 'b {thread}', c]  # note {line}\n"
+                               f"    - \"key {line}\": {{x: y{thread}}}" for line in range(200)) for thread in range(8)]
+        expected = {engine: [scan_text(document, engine) for document in documents]
+                    for engine in ('state_machine', 'regex')}
+        failures = []
+        barrier = threading.Barrier(len(documents))
+
+        def lex(thread):
+            barrier.wait()
+            for _ in range(3):
+                for engine, expected_lines in expected.items():
+                    if scan_text(documents[thread], engine) != expected_lines[thread]:
+                        failures.append((thread, engine))
+
+        switch_interval = sys.getswitchinterval()
+        # Switch threads as often as possible so that any shared state would be interleaved
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=lex, args=(thread,)) for thread in range(len(documents))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+        self.assertEqual([], failures)
+
+
 if __name__ == '__main__':
     unittest.main()
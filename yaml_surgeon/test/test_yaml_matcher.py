@@ -0,0 +1,46 @@
+import random
+import unittest
+from unittest import mock
+from yaml_surgeon.yaml_matcher import NameMatcher, name_matcher
+
+
+def random_string(rng, alphabet, min_length, max_length):
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(min_length, max_length)))
+
+
+class TestYamlMatcher(unittest.TestCase):
+
+    def test_exact_names(self):
+        matcher = NameMatcher(['spam', 'egg'])
+        self.assertTrue(matcher.matches('spam'))
+        self.assertTrue(matcher.matches('"egg"'))
+        self.assertFalse(matcher.matches('spams'))
+        self.assertTrue(matcher.search("- ham: [eggs]"))
+        self.assertFalse(matcher.search("- ham: [eggs]", 0, 10))
+
+    def test_substrings_match_searching_for_each(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            substrings = [random_string(rng, 'abc', 1, 5) for _ in range(rng.randint(1, 50))]
+            texts = [random_string(rng, 'abcd', 0, 12) for _ in range(100)]
+            expected = [any(substring in text for substring in substrings) for text in texts]
+            # Use the automaton however few substrings there are
+            with mock.patch.object(NameMatcher, 'names_threshold', 0), \
+                    mock.patch.object(NameMatcher, 'text_threshold', 0):
+                matcher = NameMatcher(substrings, substrings=True)
+                self.assertEqual(expected, [matcher.matches(text) for text in texts])
+                self.assertEqual(expected, [matcher.search(text) for text in texts])
+                encoded = NameMatcher([substring.encode('utf-8') for substring in substrings])
+                self.assertEqual(expected, [encoded.search(text.encode('utf-8')) for text in texts])
+
+    def test_empty_substring(self):
+        with mock.patch.object(NameMatcher, 'names_threshold', 0):
+            self.assertTrue(NameMatcher(['', 'spam'], substrings=True).matches('egg'))
+
+    def test_matchers_are_reused(self):
+        self.assertIs(name_matcher(('spam', 'egg'), True), name_matcher(('spam', 'egg'), True))
+        self.assertIsNot(name_matcher(('spam', 'egg')), name_matcher(('spam', 'egg'), True))
+
+
+if __name__ == '__main__':
+    unittest.main()
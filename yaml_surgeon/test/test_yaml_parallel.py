@@ -0,0 +1,63 @@
+import unittest
+from unittest import mock
+from yaml_surgeon import yaml_parallel
+from yaml_surgeon.yaml_lexer import scan_text, scan_buffer
+from yaml_surgeon.yaml_operation import YamlOperation
+from yaml_surgeon.yaml_parallel import scan_and_parse, chunk_spans
+from yaml_surgeon.yaml_parser import parse_line_tokens
+
+
+class TestYamlParallel(unittest.TestCase):
+
+    @staticmethod
+    def load_yaml_sample(file_name):
+        with open("../samples/" + file_name, 'r') as file:
+            text = file.read()
+        return text
+
+    def assert_same_as_serial(self, source):
+        expected_lines = scan_text(source) if isinstance(source, str) else scan_buffer(source)
+        expected_nodes = parse_line_tokens(expected_lines)
+        # Every document is split, however small
+        with mock.patch.object(yaml_parallel, 'parallel_threshold', 0):
+            lexed_lines, nodes = scan_and_parse(source, 2)
+        self.assertEqual(expected_lines, lexed_lines)
+        self.assertEqual([(line.start, line.end) for line in expected_lines],
+                         [(line.start, line.end) for line in lexed_lines])
+        self.assertEqual(expected_nodes, nodes)
+
+    def test_same_as_serial(self):
+        for file_name in ["valid1.yaml", "valid2.yaml", "valid3.yaml"]:
+            yaml_content = self.load_yaml_sample(file_name)
+            self.assert_same_as_serial(yaml_content)
+            self.assert_same_as_serial(yaml_content.encode('utf-8'))
+
+    def test_orphans_are_parsed_again(self):
+        # The last line is indented without a parent line in its chunk, so is a child of b from the chunk before
+        yaml_content = "a:\n  b:\n    c\nx:\n  # Lovely\n    d\n"
+        self.assertEqual([(0, 14), (14, 34)], chunk_spans(yaml_content, 4))
+        self.assert_same_as_serial(yaml_content)
+        self.assert_same_as_serial(yaml_content.encode('utf-8'))
+
+    def test_indentation_errors(self):
+        # The line before x unindents past the start of its block, so x is an error only when lexed after it
+        with mock.patch.object(yaml_parallel, 'parallel_threshold', 0):
+            with self.assertRaises(SyntaxError):
+                scan_and_parse("a:\n    b\n  c\nx: 1\n", 2)
+
+    def test_chunk_spans(self):
+        yaml_content = "- spam:\n    - egg\n- ham\n# Lovely\n- bacon\n"
+        # Chunks end at the first top level node after each share of the text, so the comment stays with ham
+        self.assertEqual([(0, 18), (18, 33), (33, 41)], chunk_spans(yaml_content, 3))
+        self.assertEqual([(0, 41)], chunk_spans(yaml_content, 1))
+        self.assertEqual([(0, 18)], chunk_spans("- spam:\n    - egg\n", 4))
+
+    def test_operation(self):
+        yaml_content = self.load_yaml_sample("valid1.yaml")
+        with mock.patch.object(yaml_parallel, 'parallel_threshold', 0):
+            output = YamlOperation(yaml_content, jobs=2).named('settings').rename('options').execute()
+        self.assertEqual(YamlOperation(yaml_content).named('settings').rename('options').execute(), output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
+import io
 import unittest
-from yaml_surgeon.yaml_lexer import scan_text
-from yaml_surgeon.yaml_parser import parse_line_tokens
+from yaml_surgeon.yaml_lexer import scan_text, iter_scan_lines
+from yaml_surgeon.yaml_parser import parse_line_tokens, iter_parse_line_tokens
 from yaml_surgeon.structures import SyntaxNode
 
 
@@ -94,6 +95,45 @@ class TestParseYaml(unittest.TestCase):
         expected = [kind, metadata]
         self.assertEqual(expected, parsed_yaml)
 
+    def test_iter_parse_matches_parse(self):
+        for file_name in ["valid1.yaml", "valid2.yaml", "valid3.yaml"]:
+            yaml_content = self.load_yaml_sample(file_name)
+            expected = parse_line_tokens(scan_text(yaml_content))
+            self.assertEqual(expected, list(iter_parse_line_tokens(iter_scan_lines(io.StringIO(yaml_content)))))
+
+    def test_iter_parse_yields_completed_top_level_nodes(self):
+        read_lines = []
+
+        def lines():
+            for line in ["- spam:", "    - egg", "- ham:", "    - bacon"]:
+                read_lines.append(line)
+                yield line
+
+        nodes = iter_parse_line_tokens(iter_scan_lines(lines()))
+        spam = next(nodes)
+        self.assertEqual('spam', spam.name)
+        self.assertEqual(['egg'], [child.name for child in spam.children])
+        self.assertEqual(3, len(read_lines), "The first node should be complete once the third line starts a new one")
+        self.assertEqual(['ham'], [node.name for node in nodes])
+
+    def test_parse_deeply_nested_end_lines(self):
+        depth = 2000
+        lines = [" " * i + f"n{i}:" for i in range(depth)] + [" " * (depth // 2) + "sibling: [egg, spam]", "# Done"]
+        node = parse_line_tokens(scan_text("\n".join(lines)))[0]
+        for i in range(depth):
+            expected_end = depth if i < depth // 2 else depth - 1
+            self.assertEqual((f"n{i}", i, expected_end), (node.name, node.start_line_number, node.end_line_number))
+            if i + 1 < depth:
+                node = node.children[0]
+
+    def test_parse_irregular_indentation_end_lines(self):
+        # The second spam is at level 2 without a parent at level 1, so it is a top level node. The third spam is at
+        # level 2 under the spam at level 1, and every node at the levels below it ends on its line, as egg does
+        egg, spam = parse_line_tokens(scan_text("egg\n # c\n    spam\n spam\n  spam"))
+        self.assertEqual([('egg', 0, 4), ('spam', 3, 4), ('spam', 4, 4), ('spam', 2, 2)],
+                         [(node.name, node.start_line_number, node.end_line_number)
+                          for node in [egg, egg.children[0], egg.children[0].children[0], spam]])
+
 
 if __name__ == '__main__':
     unittest.main()
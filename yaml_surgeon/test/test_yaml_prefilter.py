@@ -0,0 +1,112 @@
+import io
+import unittest
+from yaml_surgeon.yaml_operation import YamlOperation
+from yaml_surgeon.yaml_lexer import scan_text
+from yaml_surgeon.yaml_parser import parse_line_tokens
+from yaml_surgeon.yaml_prefilter import Prefilter, iter_block_spans, may_have_orphans
+from yaml_surgeon.yaml_profile import Profile
+
+
+def lexed_operation(text):
+    lexed_lines = scan_text(text)
+    return YamlOperation(parse_line_tokens(lexed_lines), lexed_lines)
+
+
+class TestYamlPrefilter(unittest.TestCase):
+
+    yaml_content = """- spam:
+    - egg: true
+    - ham: [egg, spam]
+# Between the blocks
+
+- sausage:
+    - bacon: [egg, spam]
+-
+  beans: {spam: spam}
+"quoted": "spam"
+- toast"""
+
+    def test_may_match(self):
+        prefilter = Prefilter([('parent', 'sausage', 'beans'), ('named', 'bacon')])
+        self.assertTrue(prefilter.may_match(self.yaml_content))
+        self.assertFalse(prefilter.may_match(self.yaml_content, 0, self.yaml_content.index('- sausage')))
+        self.assertTrue(prefilter.may_match(self.yaml_content.encode('utf-8'), encoding='utf-8'))
+        prefilter = Prefilter([('name_contains', 'ausa'), ('named_level', 'yolk', 1)])
+        self.assertFalse(prefilter.may_match(self.yaml_content))
+        self.assertTrue(Prefilter([]).may_match(self.yaml_content))
+        # Every name of a single path must be in the text, and the last name of at least one of several paths
+        self.assertTrue(Prefilter([('path', 'sausage.*.bacon')]).may_match(self.yaml_content))
+        self.assertFalse(Prefilter([('path', 'sausage.yolk.bacon')]).may_match(self.yaml_content))
+        self.assertTrue(Prefilter([('path', 'yolk', 'spam.egg')]).may_match(self.yaml_content))
+        self.assertTrue(Prefilter([('path', 'yolk', '*')]).may_match(self.yaml_content))
+
+    def test_block_spans(self):
+        blocks = [self.yaml_content[start:end] for start, end in iter_block_spans(self.yaml_content)]
+        # Lines which only might start a top level node, such as a sequence entry with nothing after it, stay in the
+        # block before them
+        self.assertEqual(["- spam:\n    - egg: true\n    - ham: [egg, spam]\n# Between the blocks\n\n",
+                          "- sausage:\n    - bacon: [egg, spam]\n-\n  beans: {spam: spam}\n",
+                          '"quoted": "spam"\n', "- toast"], blocks)
+        self.assertEqual([(0, 14)], list(iter_block_spans("  - spam\n- egg")))
+        self.assertEqual([(0, 0)], list(iter_block_spans("")))
+
+    def test_skips_lexing(self):
+        profile = Profile()
+        operation = YamlOperation(self.yaml_content, profile=profile).named('yolk').rename('white')
+        self.assertEqual(self.yaml_content.splitlines(), operation.execute())
+        self.assertTrue(operation.skipped_lexing)
+        self.assertEqual([], operation.get_selected_nodes())
+        self.assertEqual(['prefilter'], list(profile.phases))
+        self.assertEqual({'documents': 1, 'documents skipped': 1}, profile.phases['prefilter'].counts)
+        operation = YamlOperation(self.yaml_content).named('toast').insert_sibling('jam')
+        self.assertEqual(lexed_operation(self.yaml_content).named('toast').insert_sibling('jam').execute(),
+                         operation.execute())
+        self.assertFalse(operation.skipped_lexing)
+
+    def test_lexes_only_matching_blocks(self):
+        for build in [lambda operation: operation.named('bacon').rename('ham'),
+                      lambda operation: operation.with_parents('ham').named('egg').delete(),
+                      lambda operation: operation.named('beans').duplicate_as('eggs'),
+                      lambda operation: operation.named('quoted').rename('unquoted'),
+                      lambda operation: operation.named('sausage').delete().then().named('toast').rename('jam')]:
+            profile = Profile()
+            operation = build(YamlOperation(self.yaml_content, profile=profile))
+            self.assertEqual(build(lexed_operation(self.yaml_content)).execute(), operation.execute())
+            self.assertGreater(profile.phases['prefilter'].counts['blocks skipped'], 0)
+
+    def test_orphans_are_parsed_with_the_whole_document(self):
+        # The comment is indented less than d, which has no parent in its block so is a child of x in the block before
+        yaml_content = "a:\n  x: 1\nc:\n  # note\n    d: 2\ne: 3"
+        self.assertTrue(may_have_orphans(yaml_content, yaml_content.index('c:'), yaml_content.index('e:')))
+        self.assertFalse(may_have_orphans(yaml_content, 0, yaml_content.index('c:')))
+        self.assertFalse(may_have_orphans("c:\n  # note\n  d: 2\n\n  - e\n"))
+        for build in [lambda operation: operation.named('x').delete(),
+                      lambda operation: operation.with_parents('x').rename('Q'),
+                      lambda operation: operation.named('d').rename('Q')]:
+            expected = build(lexed_operation(yaml_content)).execute()
+            self.assertEqual(expected, build(YamlOperation(yaml_content)).execute())
+            self.assertEqual(expected, build(YamlOperation.from_buffer(yaml_content.encode('utf-8'))).execute())
+        self.assertEqual(['a:', 'e: 3'], YamlOperation(yaml_content).named('x').delete().execute())
+
+    def test_selected_nodes_of_matching_blocks(self):
+        yaml_content = "a: 1\nb:\n  x: 1\nc:\n  y: 2\n"
+        operation = YamlOperation(yaml_content).named('y').rename('z')
+        operation.execute()
+        expected = lexed_operation(yaml_content).named('y').rename('z')
+        expected.execute()
+        self.assertEqual(expected.get_selected_nodes(), operation.get_selected_nodes())
+        self.assertEqual(4, operation.get_selected_nodes()[0].start_line_number)
+
+    def test_buffer(self):
+        buffer = self.yaml_content.replace("\n", "\r\n").encode('utf-8')
+        operation = YamlOperation.from_buffer(buffer).named('yolk').delete()
+        output = io.BytesIO()
+        operation.execute_to(output)
+        self.assertTrue(operation.skipped_lexing)
+        self.assertEqual(buffer + b"\n", output.getvalue())
+        operation = YamlOperation.from_buffer(buffer).named('yolk').rename('white')
+        self.assertEqual(self.yaml_content.splitlines(), operation.execute())
+
+
+if __name__ == '__main__':
+    unittest.main()
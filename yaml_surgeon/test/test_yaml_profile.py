@@ -0,0 +1,83 @@
+import io
+import tracemalloc
+import unittest
+from yaml_surgeon.yaml_operation import YamlOperation
+from yaml_surgeon.yaml_profile import Profile, phase
+
+
+class TestYamlProfile(unittest.TestCase):
+
+    yaml_content = """
+        - spam:
+            - egg: true
+            - ham: [egg, spam]
+        - bacon:
+            - spam"""
+
+    def test_phases(self):
+        profile = Profile()
+        YamlOperation(self.yaml_content, profile=profile).with_parents('spam').named('egg', 'ham').rename('toast') \
+            .then().named('spam').delete().execute()
+        self.assertEqual(['prefilter', 'scan_text', 'parse_line_tokens', 'index', 'select', 'execute.rename', 'to_lines',
+                          'then.patch_changed_lines', 'execute.delete'], list(profile.phases))
+        self.assertEqual({'calls': 1, 'seconds': profile.phases['scan_text'].seconds, 'allocated': 0, 'lines': 6,
+                          'tokens': 20}, profile.as_dict()['scan_text'])
+        select = profile.phases['select']
+        self.assertEqual(2, select.calls)
+        self.assertEqual({"parent('spam') matches": 3, "named('egg', 'ham') matches": 3, "named('spam') matches": 3,
+                          'selected': 6}, select.counts)
+        self.assertEqual(2, profile.phases['to_lines'].calls)
+        self.assertEqual({'renamed nodes': 3}, profile.phases['then.patch_changed_lines'].counts)
+        self.assertEqual(len(profile.phases), len(profile.format()))
+
+    def test_then_parses_again_when_lines_change(self):
+        profile = Profile()
+        # The egg in the flow sequence is deleted along with the egg mapping, so only the line of the flow is lexed
+        YamlOperation(self.yaml_content, profile=profile).named('egg').delete().then()
+        self.assertEqual({'lines lexed': 1}, profile.phases['then.rescan_lines'].counts)
+        self.assertEqual(2, profile.phases['parse_line_tokens'].calls)
+
+    def test_streaming(self):
+        profile = Profile()
+        operation = YamlOperation.from_stream(io.StringIO("spam: egg\nham:\n  - spam\nbacon: spam\n"), profile=profile)
+        operation.named('spam').rename('beans').execute_to(io.StringIO())
+        # Reading past the last block is also timed
+        self.assertEqual(4, profile.phases['read_block'].calls)
+        self.assertEqual(4, profile.phases['read_block'].counts['lines'])
+        self.assertEqual(3, profile.phases['execute.rename'].calls)
+
+    def test_hook(self):
+        calls = []
+        profile = Profile(lambda name, seconds, counts, allocated: calls.append((name, counts, allocated)))
+        operation = YamlOperation.from_buffer(self.yaml_content.encode('utf-8'), profile=profile)
+        operation.named('bacon').duplicate_as('beans').execute_to(io.BytesIO())
+        self.assertEqual([('prefilter', {'documents': 1, 'documents skipped': 0}, 0),
+                          ('scan_buffer', {'lines': 6, 'tokens': 20}, 0),
+                          ('parse_line_tokens', {'top level nodes': 2}, 0), ('index', {'nodes': 8}, 0),
+                          ('select', {"named('bacon') matches": 1, 'selected': 1}, 0),
+                          ('execute.duplicate', {'selected nodes': 1, 'lines deleted': 0, 'copies inserted': 1}, 0),
+                          ('write', {'lines': 6}, 0)], calls)
+
+    def test_allocations(self):
+        with Profile(trace_allocations=True) as profile:
+            with profile.phase('allocate'):
+                data = [[] for _ in range(1000)]
+            self.assertTrue(tracemalloc.is_tracing())
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertGreater(profile.phases['allocate'].allocated, 0)
+        self.assertEqual(1000, len(data))
+        # Tracing which was already started is left running
+        tracemalloc.start()
+        try:
+            Profile(trace_allocations=True).close()
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+
+    def test_no_profile(self):
+        with phase(None, 'nothing') as counts:
+            self.assertIsNone(counts)
+
+
+if __name__ == '__main__':
+    unittest.main()
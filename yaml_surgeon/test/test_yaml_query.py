@@ -0,0 +1,85 @@
+import random
+import unittest
+from yaml_surgeon.yaml_lexer import scan_text
+from yaml_surgeon.yaml_parser import parse_line_tokens
+from yaml_surgeon.yaml_index import DocumentIndex
+from yaml_surgeon.yaml_query import SelectionPlan, parse_path
+from yaml_surgeon.structures import SyntaxNode
+from yaml_surgeon.test.reference import select_in_loops, random_tree
+
+
+class TestSelectionPlan(unittest.TestCase):
+
+    names = ['spam', 'egg', '"egg"', 'ham', 'bacon']
+
+    @staticmethod
+    def load_yaml_sample(file_name):
+        with open("../samples/" + file_name, 'r') as file:
+            text = file.read()
+        return text
+
+    def random_path(self, generator):
+        segments = [generator.choice(self.names + ['*', '**']) for _ in range(generator.randint(1, 4))]
+        if segments[-1] == '**':
+            segments[-1] = '*'
+        return '.'.join(segments)
+
+    def random_selection(self, generator):
+        op = generator.choice(SelectionPlan.stage_order + ('path',))
+        if op == 'path':
+            return (op, *[self.random_path(generator) for _ in range(generator.randint(1, 2))])
+        if op in ('parent_level', 'named_level'):
+            return op, generator.choice(self.names), generator.randint(0, 3)
+        if op == 'name_contains':
+            return op, generator.choice(['am', 'g', 'x'])
+        return (op, *generator.sample(self.names, generator.randint(1, 2)))
+
+    def assert_plan_matches_loops(self, nodes, selections):
+        index = DocumentIndex(nodes)
+        # The loops can select a node more than once when the subtrees they search overlap
+        expected = {id(node) for node in select_in_loops(nodes, selections)}
+        expected = [node for node in index.nodes if id(node) in expected]
+        actual = SelectionPlan(selections, index).select(nodes)
+        self.assertEqual([id(node) for node in expected], [id(node) for node in actual], selections)
+
+    def test_samples(self):
+        nodes = parse_line_tokens(scan_text(self.load_yaml_sample("valid1.yaml")))
+        self.assert_plan_matches_loops(nodes, [('named', 'settings')])
+        self.assert_plan_matches_loops(nodes, [('name_contains', 'srv'), ('parent', 'serverConfig')])
+        self.assert_plan_matches_loops(nodes, [('named', 'settings'), ('parent_level', 'srv-200', 1)])
+        self.assert_plan_matches_loops(nodes, [('named_level', 'settings', 2), ('named', 'fast', 'reliable')])
+        self.assert_plan_matches_loops(nodes, [('named', 'missing')])
+        self.assert_plan_matches_loops(nodes, [('path', 'serverConfig.*.settings')])
+        self.assert_plan_matches_loops(nodes, [('path', '**.settings'), ('named', 'fast')])
+
+    def test_random_chains(self):
+        generator = random.Random(11)
+        for _ in range(300):
+            nodes = [random_tree(generator, self.names) for _ in range(generator.randint(1, 4))]
+            selections = [self.random_selection(generator) for _ in range(generator.randint(1, 4))]
+            self.assert_plan_matches_loops(nodes, selections)
+
+    def test_no_selections(self):
+        nodes = parse_line_tokens(scan_text(self.load_yaml_sample("valid2.yaml")))
+        self.assertIs(nodes, SelectionPlan([], DocumentIndex(nodes)).select(nodes))
+
+    def test_path_through_many_siblings(self):
+        nodes = [SyntaxNode('spam', 0)]
+        for number in range(1000):
+            child = SyntaxNode(f"egg{number}", 0)
+            child.add_child(SyntaxNode('ham', 0))
+            nodes[0].add_child(child)
+        plan = SelectionPlan([('path', 'spam.egg7.ham')], DocumentIndex(nodes))
+        self.assertEqual(['ham'], [node.name for node in plan.select(nodes)])
+        self.assertEqual([1], plan.path_match_counts)
+
+    def test_parse_path(self):
+        self.assertEqual((('named', 'spec'), ('any', None), ('descend', None), ('named', 'a.b')),
+                         parse_path('spec.*.**."a.b"'))
+        for path in ['', 'spec..image', 'spec.', '"spec"s', 'spec.**']:
+            with self.assertRaises(ValueError, msg=path):
+                parse_path(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import multiprocessing
+import unittest
+from yaml_surgeon.yaml_operation import YamlOperation
+from yaml_surgeon.yaml_shared import SharedDocument, open_shared_document, execute_shared
+
+
+class TestYamlShared(unittest.TestCase):
+
+    @staticmethod
+    def load_yaml_sample(file_name):
+        with open("../samples/" + file_name, 'r') as file:
+            text = file.read()
+        return text
+
+    def test_open(self):
+        operation = YamlOperation(self.load_yaml_sample("valid1.yaml"))
+        with SharedDocument.from_operation(operation) as document:
+            for lexed_lines, nodes in [document.open(), open_shared_document(document.name, document.size)]:
+                self.assertEqual(operation.lexed_lines, lexed_lines)
+                self.assertEqual(operation.nodes, nodes)
+        with SharedDocument([], []) as document:
+            self.assertEqual(([], []), document.open())
+
+    def test_execute_shared(self):
+        yaml_content = self.load_yaml_sample("valid1.yaml")
+        tasks = []
+        for build in [lambda operation: operation.named('settings').rename('options'),
+                      lambda operation: operation.at_path('serverConfig.*').delete(),
+                      lambda operation: operation.named('webApp').duplicate_as('api')]:
+            template = build(YamlOperation([], []))
+            tasks.append((template.selections, template.operation))
+        expected = []
+        for selections, operation in tasks:
+            yaml_operation = YamlOperation(yaml_content)
+            yaml_operation.selections = list(selections)
+            yaml_operation.operation = operation
+            expected.append(yaml_operation.execute())
+        # Forked workers are given the document directly, and spawned workers open it from shared memory
+        for start_method in set(multiprocessing.get_all_start_methods()) & {'fork', 'spawn'}:
+            mp_context = multiprocessing.get_context(start_method)
+            self.assertEqual(expected, execute_shared(YamlOperation(yaml_content), tasks, 2, mp_context), start_method)
+        self.assertEqual([], execute_shared(YamlOperation(yaml_content), [], 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,227 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from yaml_surgeon import __version__
+from yaml_surgeon.yaml_codec import encode_parsed, decode_parsed, parse_version
+from yaml_surgeon.yaml_lexer import scan_text, default_engine
+from yaml_surgeon.yaml_parser import parse_line_tokens
+
+cache_file_extension = '.parsed'
+
+
+class ParseCache:
+    """
+    An opt-in cache of lexed and parsed documents, for when the same documents are edited over and over, for example by
+    a service which is sent the same base manifests with different edits. Documents are keyed on a hash of their text,
+    or for files on their path, modification time and size so that a cached file is not even read.
+
+    The least recently used documents are evicted once there are more than max_entries of them, or once the total length
+    of their text is more than max_size characters. A cached document is never handed out itself: each operation gets its
+    own list of the lines and its own copy of the nodes, which operations change, while the lines and tokens are shared
+    as operations replace them rather than changing them. It is safe to use one cache from many threads
+    """
+
+    def __init__(self, max_entries=128, max_size=64 << 20, engine=default_engine):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.engine = engine
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        # Keys to (lexed lines, nodes, size), with the most recently used last
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def operation(self, text):
+        """
+        Returns a new YamlOperation on the text, which is only lexed and parsed if it is not already cached
+        """
+        from yaml_surgeon.yaml_operation import YamlOperation
+        key = ('text', hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=20).digest())
+        return YamlOperation(*self._get(key, lambda: text))
+
+    def operation_for_file(self, path):
+        """
+        Returns a new YamlOperation on the file, which is only read, lexed and parsed if it has changed since it was cached
+        """
+        from yaml_surgeon.yaml_operation import YamlOperation
+        stat = os.stat(path)
+        key = ('file', os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+        def read():
+            with open(path, 'r') as file:
+                return file.read()
+
+        return YamlOperation(*self._get(key, read))
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'size': self.size}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _get(self, key, read):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is None:
+            # Documents are parsed outside the lock, so threads parsing different documents do not wait for each other
+            text = read()
+            lexed_lines = scan_text(text, self.engine)
+            entry = (lexed_lines, parse_line_tokens(lexed_lines), len(text))
+            self._add(key, entry)
+        lexed_lines, nodes, _ = entry
+        return [node.copy_tree() for node in nodes], list(lexed_lines)
+
+    def _add(self, key, entry):
+        size = entry[2]
+        if size > self.max_size:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[2]
+            self._entries[key] = entry
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted[2]
+                self.evictions += 1
+
+
+class DiskCache:
+    """
+    A cache of lexed and parsed documents on disk, so that running many operations over the same large files, for example
+    from pre-commit hooks, only lexes and parses each version of a file once. Each document is stored with encode_parsed
+    in a file named after a hash of its contents and the library version, which is mapped into memory to load it.
+
+    Files are not removed automatically; prune removes the least recently used files until the cache fits in a size
+    """
+
+    def __init__(self, directory=None, engine=default_engine):
+        self.directory = directory or default_cache_directory()
+        self.engine = engine
+        self.hits = 0
+        self.misses = 0
+
+    def operation_for_buffer(self, buffer, encoding='utf-8', profile=None, jobs=1):
+        """
+        Returns a YamlOperation on a bytes-like buffer such as an mmap of a file, the same as YamlOperation.from_buffer,
+        but loading the lines and nodes from the cache if the buffer has been seen before
+        """
+        # The operation engine is imported here rather than with the module, so that the cache command, which only
+        # looks at the files in the cache, starts without it
+        from yaml_surgeon.yaml_operation import YamlOperation
+        from yaml_surgeon.yaml_profile import phase
+        digest = hashlib.blake2b(buffer, digest_size=20)
+        digest.update(f"{__version__} {parse_version} {self.engine} {encoding}".encode('utf-8'))
+        path = os.path.join(self.directory, digest.hexdigest() + cache_file_extension)
+        with phase(profile, 'cache.load'):
+            parsed = self._load(path)
+        if parsed is None:
+            self.misses += 1
+            operation = YamlOperation.from_buffer(buffer, self.engine, encoding, profile, jobs)
+            with phase(profile, 'cache.save'):
+                self._save(path, encode_parsed(operation.lexed_lines, operation.nodes))
+            return operation
+        self.hits += 1
+        operation = YamlOperation(parsed[1], parsed[0], profile=profile)
+        operation.source = buffer
+        operation.encoding = encoding
+        return operation
+
+    def stats(self):
+        files = self._files()
+        return {'directory': self.directory, 'files': len(files), 'size': sum(size for _, _, size in files)}
+
+    def prune(self, max_size):
+        """
+        Removes the least recently used files until the files left add up to at most max_size bytes, and returns how
+        many were removed
+        """
+        files = self._files()
+        size = sum(file_size for _, _, file_size in files)
+        removed = 0
+        for path, _, file_size in sorted(files, key=lambda file: file[1]):
+            if size <= max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= file_size
+            removed += 1
+        return removed
+
+    def _load(self, path):
+        try:
+            with open(path, 'rb') as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    parsed = decode_parsed(buffer)
+        except (OSError, ValueError, struct.error, TypeError, KeyError, IndexError, AttributeError):
+            # Missing, empty, truncated, corrupted or written by another version, in which case it is replaced
+            return None
+        try:
+            # Loading counts as using the file, so that prune keeps it
+            os.utime(path)
+        except OSError:
+            pass
+        return parsed
+
+    def _save(self, path, data):
+        # Written to a temporary file first, so that other processes never load a partly written file
+        temporary_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=self.directory, suffix='.tmp', delete=False) as file:
+                temporary_path = file.name
+                file.write(data)
+            os.replace(temporary_path, path)
+        except OSError:
+            # The cache is only an optimization, so an unwritable cache is the same as no cache
+            if temporary_path is not None:
+                try:
+                    os.remove(temporary_path)
+                except OSError:
+                    pass
+
+    def _files(self):
+        files = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return files
+        for name in names:
+            if name.endswith(cache_file_extension):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((path, stat.st_mtime, stat.st_size))
+        return files
+
+
+def default_cache_directory():
+    """
+    The directory of the on disk cache, which is $YAML_SURGEON_CACHE_DIR if it is set, otherwise yaml_surgeon under
+    $XDG_CACHE_HOME or ~/.cache
+    """
+    directory = os.environ.get('YAML_SURGEON_CACHE_DIR')
+    if directory:
+        return directory
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'yaml_surgeon')
@@ -0,0 +1,191 @@
+import json
+import struct
+import sys
+from array import array
+from yaml_surgeon import __version__
+from yaml_surgeon.structures import Line, SyntaxNode, Token, token_types
+
+# Identifies the layout below, which changes whenever the layout does
+format_magic = b'YSPARSE1'
+# The version of the lines and nodes which the lexer and parser produce. Bump this whenever a change to the lexer or
+# parser changes their output for any document, such as the tokens, levels or end lines, so that lines and nodes encoded
+# by an earlier version, such as in the on disk cache, are not used
+parse_version = 2
+_header_length = struct.Struct('<I')
+
+# The arrays in the order they are written, each with the count in the header giving its length and its type. Offsets
+# into the document come first, as they are the only 64 bit ints, so that every array starts aligned to its type
+_sections = (
+    ('line_ends', 'line_ends', 'q'),
+    ('string_offsets', 'string_offsets', 'i'),
+    ('token_values', 'tokens', 'i'),
+    ('token_types', 'tokens', 'i'),
+    ('sequence_ends', 'sequences', 'i'),
+    ('sequence_tokens', 'sequence_tokens', 'i'),
+    ('line_levels', 'lines', 'i'),
+    ('line_sequences', 'lines', 'i'),
+    ('node_names', 'nodes', 'i'),
+    ('node_starts', 'nodes', 'i'),
+    ('node_ends', 'nodes', 'i'),
+    ('node_flow_styles', 'nodes', 'i'),
+    ('node_parents', 'nodes', 'i'),
+    ('node_flags', 'nodes', 'i'),
+)
+
+# Bits of node_flags
+_block_sequence = 1
+_map_value = 2
+_has_children = 4
+
+
+def encode_parsed(lexed_lines, nodes):
+    """
+    Serializes lexed lines and the nodes parsed from them into a compact binary form, where each field is stored as an
+    array across all the lines, tokens or nodes rather than object by object. Strings, tokens and the sequences of tokens
+    on lines are stored once however many times they appear, and nodes are stored in document order along with the
+    position of their parent. The text of the lines is not stored, as it is the same as joining the token values
+    """
+    strings = {}
+    type_sequences = {}
+    tokens = {}
+    sequences = {}
+    arrays = {name: array(typecode) for name, _, typecode in _sections}
+
+    def string_index(string):
+        index = strings.get(string)
+        if index is None:
+            index = strings[string] = len(strings)
+        return index
+
+    def token_index(token):
+        key = (token.value, token.type_code)
+        index = tokens.get(key)
+        if index is None:
+            index = tokens[key] = len(tokens)
+            arrays['token_values'].append(string_index(token.value))
+            types = token_types[token.type_code]
+            arrays['token_types'].append(type_sequences.setdefault(types, len(type_sequences)))
+        return index
+
+    # Lines scanned from a buffer follow on from each other, so only their ends are needed
+    spans = all(line.start is not None for line in lexed_lines)
+    for line in lexed_lines:
+        key = tuple(map(token_index, line.tokens))
+        sequence = sequences.get(key)
+        if sequence is None:
+            sequence = sequences[key] = len(sequences)
+            arrays['sequence_tokens'].extend(key)
+            arrays['sequence_ends'].append(len(arrays['sequence_tokens']))
+        arrays['line_sequences'].append(sequence)
+        arrays['line_levels'].append(line.level)
+        if spans:
+            arrays['line_ends'].append(line.end)
+
+    stack = [(node, -1) for node in reversed(nodes)]
+    while stack:
+        node, parent = stack.pop()
+        position = len(arrays['node_names'])
+        arrays['node_names'].append(string_index(node.name))
+        arrays['node_starts'].append(node.start_line_number)
+        arrays['node_ends'].append(node.end_line_number)
+        arrays['node_flow_styles'].append(string_index(node.flow_style))
+        arrays['node_parents'].append(parent)
+        arrays['node_flags'].append((_block_sequence if node.is_block_sequence else 0) |
+                                    (_map_value if node.is_map_value else 0) |
+                                    (_has_children if node.children else 0))
+        stack.extend((child, position) for child in reversed(node.children))
+
+    string_bytes = [string.encode('utf-8', 'surrogatepass') for string in strings]
+    offset = 0
+    arrays['string_offsets'].append(0)
+    for encoded in string_bytes:
+        offset += len(encoded)
+        arrays['string_offsets'].append(offset)
+
+    header = json.dumps({
+        'version': __version__,
+        'parse_version': parse_version,
+        'byteorder': sys.byteorder,
+        'types': [list(types) for types in type_sequences],
+        'counts': {name: len(arrays[name]) for name in ('line_ends', 'string_offsets', 'sequence_tokens')} |
+                  {'tokens': len(tokens), 'sequences': len(sequences), 'lines': len(lexed_lines),
+                   'nodes': len(arrays['node_names'])},
+    }).encode('utf-8')
+    # The arrays start at a multiple of 8 bytes, so they can be read in place
+    padding = -(len(format_magic) + _header_length.size + len(header)) % 8
+    parts = [format_magic, _header_length.pack(len(header) + padding), header, b' ' * padding]
+    parts.extend(arrays[name].tobytes() for name, _, _ in _sections)
+    parts.extend(string_bytes)
+    return b''.join(parts)
+
+
+def decode_parsed(buffer, line_offset=0, buffer_offset=0):
+    """
+    Reads the lexed lines and nodes from a buffer written by encode_parsed, such as an mmap of a file. The arrays are read
+    in place from the buffer, and each distinct token is only created once and shared by every line it is on, as are the
+    lists of tokens on lines which are the same. Raises ValueError if the buffer was not written by encode_parsed with the
+    same layout, version and byte order, or if it is truncated.
+
+    The line numbers of the lines and nodes are moved on by line_offset, and where the lines are in the buffer they were
+    scanned from by buffer_offset, for parts of a document which were encoded separately
+    """
+    with memoryview(buffer) as view:
+        if bytes(view[:len(format_magic)]) != format_magic:
+            raise ValueError("Not a parsed yaml document")
+        offset = len(format_magic) + _header_length.size
+        (header_length,) = _header_length.unpack(view[len(format_magic):offset])
+        header = json.loads(bytes(view[offset:offset + header_length]))
+        if header['version'] != __version__ or header.get('parse_version') != parse_version or \
+                header['byteorder'] != sys.byteorder:
+            raise ValueError(f"Parsed yaml document is from version {header['version']} (parse version "
+                             f"{header.get('parse_version')}) on a {header['byteorder']} endian machine")
+        offset += header_length
+        counts = header['counts']
+        fields = {}
+        for name, count_name, typecode in _sections:
+            length = counts[count_name] * array(typecode).itemsize
+            if offset + length > len(view):
+                raise ValueError("Parsed yaml document is truncated")
+            with view[offset:offset + length] as section:
+                with section.cast(typecode) as ints:
+                    fields[name] = ints.tolist()
+            offset += length
+        string_offsets = fields['string_offsets']
+        if string_offsets and offset + string_offsets[-1] > len(view):
+            raise ValueError("Parsed yaml document is truncated")
+        strings = [str(view[offset + start:offset + end], 'utf-8', 'surrogatepass')
+                   for start, end in zip(string_offsets, string_offsets[1:])]
+
+    types = header['types']
+    tokens = [Token(strings[value], types[token_type])
+              for value, token_type in zip(fields['token_values'], fields['token_types'])]
+    sequence_tokens = fields['sequence_tokens']
+    sequences = [[tokens[index] for index in sequence_tokens[start:end]]
+                 for start, end in zip([0] + fields['sequence_ends'], fields['sequence_ends'])]
+    line_ends = fields['line_ends']
+    if line_ends:
+        if buffer_offset:
+            line_ends = [end + buffer_offset for end in line_ends]
+        lexed_lines = [Line(sequences[sequence], line_number, level, None, start, end)
+                       for line_number, (sequence, level, start, end)
+                       in enumerate(zip(fields['line_sequences'], fields['line_levels'], [buffer_offset] + line_ends,
+                                        line_ends), line_offset + 1)]
+    else:
+        lexed_lines = [Line(sequences[sequence], line_number, level)
+                       for line_number, (sequence, level)
+                       in enumerate(zip(fields['line_sequences'], fields['line_levels']), line_offset + 1)]
+
+    nodes = []
+    all_nodes = []
+    for name, start, end, flow_style, parent, flags in zip(fields['node_names'], fields['node_starts'],
+                                                           fields['node_ends'], fields['node_flow_styles'],
+                                                           fields['node_parents'], fields['node_flags']):
+        node = SyntaxNode(strings[name], start + line_offset, strings[flow_style], bool(flags & _block_sequence),
+                          bool(flags & _map_value))
+        node.end_line_number = end + line_offset
+        if parent < 0:
+            nodes.append(node)
+        else:
+            all_nodes[parent].children.append(node)
+        all_nodes.append(node)
+    return lexed_lines, nodes
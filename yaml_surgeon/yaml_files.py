@@ -0,0 +1,165 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from yaml_surgeon.yaml_operation import YamlOperation
+
+yaml_extensions = ('.yaml', '.yml')
+
+# Files are grouped into tasks of about this many bytes, so that many small files share the overhead of a task while a
+# large file is a task of its own
+task_size = 1 << 20
+
+
+class FileResult:
+    def __init__(self, path, output_path=None, changed=False, nodes_matched=0, seconds=0.0, error=None, skipped=False):
+        self.path = path
+        self.output_path = output_path
+        self.changed = changed
+        self.nodes_matched = nodes_matched
+        self.seconds = seconds
+        self.error = error
+        # Whether the file was not lexed, as the selections could not match anything in it
+        self.skipped = skipped
+
+    def __repr__(self):
+        return f"FileResult(path='{self.path}', " \
+               f"changed={self.changed}, " \
+               f"nodes_matched={self.nodes_matched}, " \
+               f"error={self.error})"
+
+
+def find_yaml_files(paths):
+    """
+    Expands paths which may be files, directories (searched recursively for yaml files) or glob patterns, into a sorted
+    list of files without duplicates
+    """
+    files = set()
+    for path in paths:
+        matches = glob.glob(path, recursive=True) if glob.has_magic(path) else [path]
+        for match in matches:
+            if os.path.isdir(match):
+                for directory, _, file_names in os.walk(match):
+                    files.update(os.path.join(directory, file_name) for file_name in file_names
+                                 if file_name.endswith(yaml_extensions))
+            else:
+                files.add(match)
+    return sorted(files)
+
+
+def process_file(path, selections, operation, output_path=None):
+    """
+    Applies the selections and operation (as recorded by a YamlOperation) to a file, writing the result to output_path,
+    or back to the file if output_path is None and the output is different
+    """
+    start = time.perf_counter()
+    result = FileResult(path, output_path or path)
+    try:
+        with open(path, 'r') as file:
+            text = file.read()
+        yaml_operation = YamlOperation(text)
+        yaml_operation.selections = list(selections)
+        yaml_operation.operation = operation
+        # Executing first means that only the parts of the file which the selections could match in are lexed
+        output = "\n".join(yaml_operation.execute())
+        result.nodes_matched = len(yaml_operation.get_selected_nodes())
+        result.skipped = yaml_operation.skipped_lexing
+        if text.endswith("\n"):
+            output += "\n"
+        result.changed = output != text
+        if output_path is not None:
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        if output_path is not None or result.changed:
+            with open(result.output_path, 'w') as file:
+                file.write(output)
+    except (OSError, UnicodeDecodeError, SyntaxError, ValueError) as error:
+        result.error = f"{type(error).__name__}: {error}"
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def _process_task(task, selections, operation):
+    return [process_file(path, selections, operation, output_path) for path, output_path in task]
+
+
+def process_files(paths, selections, operation, jobs=1, output_dir=None):
+    """
+    Applies the selections and operation to every file, in place or written under output_dir with the same layout as
+    the input files, and returns a FileResult for each file in the order of paths. With more than one job the files are
+    spread over a pool of processes, largest first so that a large file started last does not hold up the whole run
+    """
+    output_paths = _output_paths(paths, output_dir)
+    sizes = {path: _file_size(path) for path in paths}
+    tasks = []
+    current_task = []
+    current_size = 0
+    for path in sorted(paths, key=sizes.get, reverse=True):
+        current_task.append((path, output_paths[path]))
+        current_size += sizes[path]
+        if current_size >= task_size:
+            tasks.append(current_task)
+            current_task = []
+            current_size = 0
+    if current_task:
+        tasks.append(current_task)
+
+    results = {}
+    if jobs <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            results.update((result.path, result) for result in _process_task(task, selections, operation))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(_process_task, task, selections, operation) for task in tasks]
+            for future in as_completed(futures):
+                results.update((result.path, result) for result in future.result())
+    return [results[path] for path in paths]
+
+
+def execute_all(documents, build, jobs=4, cache=None):
+    """
+    Applies an operation to many yaml documents using a pool of threads, for example in a threaded service, and returns
+    the output lines of each document in the same order. build is passed a YamlOperation for each document and sets up
+    its selections and operation, for example lambda operation: operation.named('spam').delete(). Documents which repeat
+    are only lexed and parsed once if a ParseCache is given
+    """
+    def execute(document):
+        operation = YamlOperation(document) if cache is None else cache.operation(document)
+        return build(operation).execute()
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(execute, documents))
+
+
+def format_summary(results):
+    lines = []
+    for result in results:
+        if result.error:
+            lines.append(f"{result.path}: failed, {result.error}")
+        else:
+            status = 'changed' if result.changed else 'unchanged'
+            lines.append(f"{result.path}: {status}, {result.nodes_matched} nodes matched in {result.seconds:.3f}s")
+    changed = sum(1 for result in results if result.changed)
+    failed = sum(1 for result in results if result.error)
+    matched = sum(result.nodes_matched for result in results)
+    seconds = sum(result.seconds for result in results)
+    skipped = sum(1 for result in results if result.skipped)
+    lines.append(f"{len(results)} files, {changed} changed, {failed} failed, {matched} nodes matched in "
+                 f"{seconds:.3f}s, {skipped} skipped without lexing")
+    return lines
+
+
+def _output_paths(paths, output_dir):
+    if output_dir is None:
+        return {path: None for path in paths}
+    # Keep the layout of the files relative to the directory they have in common
+    absolute_paths = [os.path.abspath(path) for path in paths]
+    base_dir = os.path.commonpath([os.path.dirname(path) for path in absolute_paths]) if paths else ''
+    return {path: os.path.join(output_dir, os.path.relpath(absolute_path, base_dir))
+            for path, absolute_path in zip(paths, absolute_paths)}
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
@@ -0,0 +1,145 @@
+from bisect import bisect_left, bisect_right, insort
+from yaml_surgeon.yaml_matcher import name_matcher
+
+
+class DocumentIndex:
+    """
+    Lookup tables over the nodes of a parsed document, built with one walk of the tree, which answer the same queries as
+    the find_* functions in yaml_operation in time proportional to the number of matches rather than the document size.
+
+    Nodes are numbered by their position in document order, so the subtree of a node is the range of positions from the
+    node to its end position. The lookup tables map names, and names at a depth, to sorted positions, which means the
+    matches within a subtree can be found with a binary search
+    """
+
+    def __init__(self, nodes):
+        # The top level nodes, which queries can search in one go rather than one subtree at a time
+        self.roots = nodes
+        # These are indexed by position
+        self.nodes = []
+        self.depths = []
+        self.parents = []
+        self.ends = []
+        # Node identity to position, as SyntaxNode equality compares whole subtrees
+        self.positions = {}
+        # Names to sorted positions. Names with double quotes are also stored without them, as named() matches either
+        self.by_name = {}
+        self.by_unquoted_name = {}
+        self.by_name_at_depth = {}
+        self.by_unquoted_name_at_depth = {}
+
+        stack = [(node, 0, -1) for node in reversed(nodes)]
+        while stack:
+            node, depth, parent = stack.pop()
+            position = len(self.nodes)
+            self.nodes.append(node)
+            self.depths.append(depth)
+            self.parents.append(parent)
+            self.positions[id(node)] = position
+            # Positions are visited in order, so can be appended rather than inserted
+            for table, key in self._name_keys(node.name, depth):
+                positions = table.get(key)
+                if positions is None:
+                    table[key] = [position]
+                else:
+                    positions.append(position)
+            stack.extend((child, depth + 1, position) for child in reversed(node.children))
+        # Children always come after their parent, so subtree sizes can be summed in reverse
+        sizes = [1] * len(self.nodes)
+        for position in range(len(self.nodes) - 1, -1, -1):
+            parent = self.parents[position]
+            if parent >= 0:
+                sizes[parent] += sizes[position]
+        self.ends = [position + size - 1 for position, size in enumerate(sizes)]
+
+    def __contains__(self, node):
+        return id(node) in self.positions
+
+    def parent_of(self, node):
+        parent = self.parents[self.positions[id(node)]]
+        return None if parent < 0 else self.nodes[parent]
+
+    def rename(self, node, old_name):
+        """
+        Updates the lookup tables after the name of an indexed node has changed from old_name
+        """
+        position = self.positions[id(node)]
+        depth = self.depths[position]
+        for table, key in self._name_keys(old_name, depth):
+            positions = table[key]
+            del positions[bisect_left(positions, position)]
+            if not positions:
+                del table[key]
+        self._add_name(node.name, position, depth)
+
+    def find_nodes_called(self, roots, *names, at_level=None):
+        result = []
+        for start, end, depth in self._subtree_ranges(roots):
+            if at_level is None:
+                tables = [(self.by_name, name) for name in names] + \
+                         [(self.by_unquoted_name, name) for name in names]
+            else:
+                tables = [(self.by_name_at_depth, (name, depth + at_level)) for name in names] + \
+                         [(self.by_unquoted_name_at_depth, (name, depth + at_level)) for name in names]
+            result.extend(self.nodes[position] for position in self._in_range(start, end, tables))
+        return result
+
+    def find_nodes_containing(self, roots, *names):
+        matcher = name_matcher(names, substrings=True)
+        matching_names = [node_name for node_name in self.by_name if matcher.matches(node_name)]
+        tables = [(self.by_name, node_name) for node_name in matching_names]
+        result = []
+        for start, end, _ in self._subtree_ranges(roots):
+            result.extend(self.nodes[position] for position in self._in_range(start, end, tables))
+        return result
+
+    def find_children_of_node_called(self, roots, *names, level=None):
+        result = []
+        for start, end, depth in self._subtree_ranges(roots):
+            if level is None:
+                tables = [(self.by_name, name) for name in names]
+            else:
+                tables = [(self.by_name_at_depth, (name, depth + level)) for name in names]
+            # Without a level, the search does not look inside a matching node for further matches
+            skip_until = -1
+            for position in self._in_range(start, end, tables):
+                if position > skip_until:
+                    result.extend(self.nodes[position].children)
+                    if level is None:
+                        skip_until = self.ends[position]
+        return result
+
+    def _subtree_ranges(self, roots):
+        # The range of positions and the depth of each root, where the top level nodes are searched as a single range
+        if roots is self.roots:
+            if self.nodes:
+                yield 0, len(self.nodes) - 1, 0
+            return
+        for root in roots:
+            position = self.positions[id(root)]
+            yield position, self.ends[position], self.depths[position]
+
+    def _in_range(self, start, end, tables):
+        # The sorted, distinct positions from the tables which are between start and end
+        ranges = []
+        for table, key in tables:
+            positions = table.get(key)
+            if positions:
+                start_index = bisect_left(positions, start)
+                stop = bisect_right(positions, end, start_index)
+                if start_index < stop:
+                    ranges.append(positions[start_index:stop])
+        if len(ranges) == 1:
+            return ranges[0]
+        return sorted(set().union(*ranges))
+
+    def _add_name(self, name, position, depth):
+        for table, key in self._name_keys(name, depth):
+            insort(table.setdefault(key, []), position)
+
+    def _name_keys(self, name, depth):
+        keys = [(self.by_name, name), (self.by_name_at_depth, (name, depth))]
+        unquoted_name = name.strip('"')
+        if unquoted_name != name:
+            keys += [(self.by_unquoted_name, unquoted_name), (self.by_unquoted_name_at_depth, (unquoted_name, depth))]
+        return keys
@@ -1,3 +1,5 @@
+import re
+from functools import lru_cache
 from yaml_surgeon.structures import Line, Token
 
 
@@ -108,6 +110,7 @@ class AlphaSpansStateMachine:
         # If there was any lookahead span, that means it is a special span not connected to the previous alpha span
         if self.lookahead_span:
             self.current_span += self.lookahead_span
+            self.lookahead_span = ''
         self._end_span()
         # Clear state for next time
         spans_text = self.spans
@@ -116,10 +119,78 @@ class AlphaSpansStateMachine:
         return spans_text
 
 
-sm = AlphaSpansStateMachine()
+@lru_cache(maxsize=4096)
+def _special_span_types(span):
+    # The types the state machine records for each character it accumulates while in its Special state
+    return tuple('Sequence' if char in '-[' else 'Mapping' for char in span if char in '-[:{')
 
 
-def scan_text(text):
+class RegexSpansLexer:
+    """
+    Produces exactly the same spans as AlphaSpansStateMachine, but matches whole spans at a time with a single compiled
+    regular expression instead of stepping the state machine once per character. Lines repeat a lot in real documents,
+    so the spans of recently seen lines are cached, meaning the returned Tokens may be shared and must not be modified
+    """
+
+    # Character classes used by the state machine: alphanumerics, characters which join alphanumerics into a single span
+    # (only the first character after an alphanumeric may be a quote), and characters accumulated in the Special state
+    _alpha = r'[^\W_]'
+    _join_first = r'''(?:_|[^\w:\]},#])'''
+    _join = r'''(?:_|[^\w:\]},#'"])'''
+    _special = r'''(?:_|[^\w'"#])'''
+    _quoted = r'''(?:'[^']*'?|"[^"]*"?)'''
+    _lookahead = _join_first + _join + '*'
+    # An alpha span, along with what its trailing lookahead turns into: part of a comment, a span of its own before an
+    # untyped quoted span, the untyped start of the next special span, or a span of its own at the end of the line.
+    # Otherwise a special span, a comment, or a quoted span
+    span_pattern = re.compile(
+        rf'''({_alpha}+(?:{_lookahead}{_alpha}+)*)'''
+        rf'''(?:({_lookahead}\#.*)|({_lookahead})({_quoted})|({_lookahead})([:\]}},]{_special}*)|({_lookahead})\Z)?'''
+        rf'''|({_special}+)|(\#.*)|({_quoted})''', re.DOTALL)
+
+    def parse(self, text):
+        if not text:
+            return [Token('', [])]
+        return list(_regex_spans(text))
+
+
+@lru_cache(maxsize=65536)
+def _regex_spans(text):
+    spans = []
+    for alpha, alpha_comment, lookahead, untyped_quoted, carried, carried_special, trailing, special, comment, quoted \
+            in RegexSpansLexer.span_pattern.findall(text):
+        if alpha:
+            spans.append(Token(alpha, ['Scalar']))
+            if carried_special:
+                # The lookahead does not contribute any types to the special span it starts
+                spans.append(Token(carried + carried_special, list(_special_span_types(carried_special))))
+            elif alpha_comment:
+                spans.append(Token(alpha_comment, ['Comment']))
+            elif untyped_quoted:
+                spans.append(Token(lookahead, []))
+                spans.append(Token(untyped_quoted, []))
+            elif trailing:
+                spans.append(Token(trailing, []))
+        elif special:
+            spans.append(Token(special, list(_special_span_types(special))))
+        elif comment:
+            spans.append(Token(comment, ['Comment']))
+        else:
+            spans.append(Token(quoted, ['Scalar']))
+    return tuple(spans)
+
+
+# The lexers which can be chosen when scanning, which all produce identical output. The state machine is kept as the
+# reference implementation, and the regex lexer is the default as it is considerably faster. A new lexer is created for
+# each scan, as the state machine keeps its state between characters, so scans in different threads never share one
+engines = {
+    'regex': RegexSpansLexer,
+    'state_machine': AlphaSpansStateMachine,
+}
+default_engine = 'regex'
+
+
+def scan_text(text, engine=default_engine):
     """
     Build an ordered list of Line objects from the specified text, including calculating the nesting level
     of each line. We preserve all data including spaces as we don't want to make any unnecessary modifications
@@ -127,16 +198,70 @@ def scan_text(text):
     lines = text.splitlines()
     if not lines:
         return []
-    return scan_lines(lines)
+    return scan_lines(lines, engine)
+
+
+def scan_lines(lines, engine=default_engine):
+    return list(iter_scan_lines(lines, engine))
 
 
-def scan_lines(lines):
-    yaml_lines = []
+def iter_scan_lines(lines, engine=default_engine):
+    """
+    Lazily lex any iterable of lines, such as an open file, sys.stdin or iter_buffer_lines over an mmap, yielding each
+    Line as soon as it has been scanned so that the whole document never needs to be held in memory
+    """
+    lexer = get_lexer(engine)
+    return (Line(lexer.parse(line), line_number + 1, nesting_level, line)
+            for line_number, (line, nesting_level) in enumerate(iter_nesting_levels(lines)))
+
+
+def scan_buffer(buffer, engine=default_engine, encoding='utf-8'):
+    """
+    Build an ordered list of Line objects from a bytes-like buffer such as bytes or an mmap of a file. Each Line records
+    the span of the buffer it was scanned from rather than keeping its text, so unchanged lines can be copied from the
+    buffer when writing the output
+    """
+    lexer = get_lexer(engine)
+    spans = list(iter_buffer_line_spans(buffer))
+    lines = (buffer[start:end].decode(encoding) for start, end in spans)
+    return [Line(lexer.parse(line), line_number + 1, level, None, start, end)
+            for line_number, ((line, level), (start, end)) in enumerate(zip(iter_nesting_levels(lines), spans))]
+
+
+def rescan_lines(lines, unchanged_lines, engine=default_engine):
+    """
+    Lex lines of text which were rendered from previously lexed lines. For each line, unchanged_lines has either the
+    previous Line if the text is known to be the same, in which case its tokens (and where it is in a buffer) are
+    reused, or None to lex the line. The token lists are shared rather than copied, for example between a duplicated
+    block and its copy, as they are copied before being modified
+    """
+    lexer = get_lexer(engine)
+    return [Line(lexer.parse(line), line_number + 1, level, line) if unchanged_line is None else
+            Line(unchanged_line.tokens, line_number + 1, level, line, unchanged_line.start, unchanged_line.end)
+            for line_number, ((line, level), unchanged_line) in enumerate(zip(iter_nesting_levels(lines), unchanged_lines))]
+
+
+def get_lexer(engine):
+    if engine not in engines:
+        raise ValueError(f"Unknown lexer engine {engine}, expected one of {', '.join(engines)}")
+    return engines[engine]()
+
+
+def iter_nesting_levels(lines):
+    """
+    Yields each line with any line ending removed along with its nesting level, which only depends on indentation and
+    so is much cheaper to find than lexing the line. Lines of bytes are decoded as utf-8
+    """
     nesting_level = 0
-    previous_indent = len(lines[0]) - len(lines[0].lstrip())
+    previous_indent = None
     block_indent_amounts = []
     for line_number, line in enumerate(lines):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.rstrip('\r\n')
         current_indent = len(line) - len(line.lstrip())
+        if previous_indent is None:
+            previous_indent = current_indent
         if current_indent > previous_indent:
             block_indent_amounts.append(current_indent - previous_indent)
             nesting_level += 1
@@ -148,7 +273,28 @@ def scan_lines(lines):
                     raise SyntaxError(f"Indent to the left of the start on line {line_number}: {line}")
                 indent_decrease -= block_indent_amounts.pop()
                 nesting_level -= 1
-        line_elements = sm.parse(line)
-        yaml_lines.append(Line(line_elements, line_number + 1, nesting_level))
+        yield line, nesting_level
         previous_indent = current_indent
-    return yaml_lines
+
+
+def iter_buffer_lines(buffer, encoding='utf-8'):
+    """
+    Lazily split a bytes-like buffer which supports find, such as bytes or an mmap of a file, into decoded lines
+    """
+    for start, end in iter_buffer_line_spans(buffer):
+        line = buffer[start:end].decode(encoding)
+        yield line[:-1] if line.endswith('\n') else line
+
+
+def iter_buffer_line_spans(buffer):
+    """
+    Yields the start and end offset of each line in a bytes-like buffer which supports find, where the end includes
+    the line ending
+    """
+    start = 0
+    end = len(buffer)
+    while start < end:
+        line_end = buffer.find(b'\n', start)
+        line_end = end if line_end == -1 else line_end + 1
+        yield start, line_end
+        start = line_end
@@ -0,0 +1,110 @@
+from collections import deque
+from functools import lru_cache
+
+
+class NameMatcher:
+    """
+    Matches names against many names at once, either exactly or as substrings, so that selecting with thousands of names
+    costs about the same for each node as selecting with one. Exact names are a hash set, where a name also matches with
+    any double quotes around it removed, as in named(). Substrings are searched for with an Aho-Corasick automaton,
+    which finds all of them in one pass over a name or text, once there are enough of them that this is faster than
+    searching for each in turn.
+
+    Matchers are built once for each set of names by name_matcher, and reused by every selection and document with the
+    same names
+    """
+
+    # The number of substrings above which the automaton is used, for short strings such as node names and for text
+    names_threshold = 32
+    text_threshold = 256
+
+    def __init__(self, names, substrings=False):
+        self.names = tuple(dict.fromkeys(names))
+        self.substrings = substrings
+        self._exact = frozenset(self.names)
+        # Built when it is first needed, as exact names only need it to search text
+        self._automaton = None
+
+    def matches(self, name):
+        if not self.substrings:
+            return name in self._exact or name.strip('"') in self._exact
+        if len(self.names) <= self.names_threshold:
+            return any(substring in name for substring in self.names)
+        return self._get_automaton().search(name)
+
+    def search(self, text, start=0, end=None):
+        """
+        Returns whether any of the names is in text[start:end], whether or not they were to be matched exactly, where
+        text is a str, or bytes-like with a find method such as an mmap if the names are bytes
+        """
+        end = len(text) if end is None else end
+        if len(self.names) <= self.text_threshold:
+            return any(text.find(name, start, end) >= 0 for name in self.names)
+        return self._get_automaton().search(text[start:end])
+
+    def _get_automaton(self):
+        if self._automaton is None:
+            self._automaton = _Automaton(self.names)
+        return self._automaton
+
+
+class _Automaton:
+    # An Aho-Corasick automaton over the characters of str patterns, or the byte values of bytes patterns. Each state is
+    # a node of the trie of the patterns, with a dict of the characters which lead from it, and a link to the state for
+    # the longest suffix of it which is also in the trie, which is followed when there is no such character
+
+    def __init__(self, patterns):
+        transitions = [{}]
+        accepting = [False]
+        for pattern in patterns:
+            state = 0
+            for char in pattern:
+                next_state = transitions[state].get(char)
+                if next_state is None:
+                    next_state = transitions[state][char] = len(transitions)
+                    transitions.append({})
+                    accepting.append(False)
+                state = next_state
+            accepting[state] = True
+        # The suffix links are found breadth first, as each is shorter than the state it is from. A state also accepts
+        # if its suffix does, as the pattern ending there ends here too
+        suffixes = [0] * len(transitions)
+        queue = deque(transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in transitions[state].items():
+                suffix = suffixes[state]
+                while suffix and char not in transitions[suffix]:
+                    suffix = suffixes[suffix]
+                suffix = transitions[suffix].get(char, 0)
+                suffixes[next_state] = 0 if suffix == next_state else suffix
+                accepting[next_state] = accepting[next_state] or accepting[suffixes[next_state]]
+                queue.append(next_state)
+        self.transitions = transitions
+        self.suffixes = suffixes
+        self.accepting = accepting
+        # The empty pattern is in everything
+        self.matches_empty = accepting[0]
+
+    def search(self, text):
+        if self.matches_empty:
+            return True
+        transitions = self.transitions
+        suffixes = self.suffixes
+        accepting = self.accepting
+        state = 0
+        for char in text:
+            while state and char not in transitions[state]:
+                state = suffixes[state]
+            state = transitions[state].get(char, 0)
+            if accepting[state]:
+                return True
+        return False
+
+
+@lru_cache(maxsize=64)
+def name_matcher(names, substrings=False):
+    """
+    Returns a NameMatcher for a tuple of names, which is only built the first time it is asked for
+    """
+    return NameMatcher(names, substrings)
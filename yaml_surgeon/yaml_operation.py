@@ -1,21 +1,94 @@
+import io
 from collections import defaultdict
-from yaml_surgeon.yaml_lexer import scan_text, scan_lines
-from yaml_surgeon.yaml_parser import parse_line_tokens
-from yaml_surgeon.structures import SyntaxNode, Token
+from yaml_surgeon.yaml_lexer import scan_text, scan_lines, scan_buffer, rescan_lines, iter_scan_lines, \
+    iter_buffer_line_spans, default_engine
+from yaml_surgeon.yaml_parser import iter_parse_line_tokens, iter_top_level_blocks, patch_changed_lines
+from yaml_surgeon.yaml_index import DocumentIndex
+from yaml_surgeon.yaml_matcher import name_matcher
+from yaml_surgeon.yaml_prefilter import Prefilter, may_have_orphans
+from yaml_surgeon.yaml_profile import phase
+from yaml_surgeon.yaml_query import SelectionPlan, parse_path
+from yaml_surgeon.structures import Line, SyntaxNode, Token, MAPPING, SCALAR
 
 
 class YamlOperation:
 
-    def __init__(self, nodes_or_yaml, lexed_lines=None):
+    # Operations whose effects stay within the top level block of each selected node, so can be applied block by block
+    streamable_operations = ('rename', 'delete', 'duplicate')
+
+    def __init__(self, nodes_or_yaml, lexed_lines=None, index=None, profile=None, jobs=1):
+        # A Profile which records the time taken by each phase, or None
+        self.profile = profile
+        # The number of processes to lex and parse a large document with
+        self.jobs = jobs
+        # The text or buffer of the document until it is lexed, which is put off until the lines or nodes are needed,
+        # as the selections may show that it does not need to be lexed at all, or only some of its top level blocks do
+        self._unlexed = None
         if isinstance(nodes_or_yaml, str):
-            self.lexed_lines = scan_text(nodes_or_yaml)
-            self.nodes = parse_line_tokens(self.lexed_lines)
+            self._unlexed = nodes_or_yaml
+            self._nodes = self._lexed_lines = None
         else:
-            self.nodes = nodes_or_yaml
-            self.lexed_lines = lexed_lines
+            self._nodes = nodes_or_yaml
+            self._lexed_lines = lexed_lines
+        # Whether the selections of the last operation could not match anything in the document, so it was output
+        # without being lexed, and whether the prefilter has been run on them
+        self.skipped_lexing = False
+        self._prefiltered = False
+        # A DocumentIndex of the nodes, which can be shared by operations querying the same document
+        self.index = index
         self.selections = []
         self.operation = None
         self.selected_nodes = None
+        self.line_stream = None
+        # The buffer the lines were scanned from, if they were scanned by from_buffer, and its encoding
+        self.source = None
+        self.encoding = 'utf-8'
+        self.engine = default_engine
+        # Lines whose tokens were changed by the operation, rather than just rendered differently
+        self.modified_lines = []
+
+    @classmethod
+    def from_stream(cls, lines, engine=default_engine, profile=None):
+        """
+        Creates an operation over any iterable of lines, such as an open file, which is not read until the operation is
+        written out by execute_to. Only one top level block of the document is held in memory at a time
+        """
+        operation = cls([], [], profile=profile)
+        operation.line_stream = iter_scan_lines(lines, engine)
+        return operation
+
+    @classmethod
+    def from_buffer(cls, buffer, engine=default_engine, encoding='utf-8', profile=None, jobs=1):
+        """
+        Creates an operation over a bytes-like buffer such as an mmap of a file. The lines remember where they are in
+        the buffer rather than keeping their text, and execute_to copies unchanged lines straight from the buffer
+        """
+        operation = cls([], [], profile=profile, jobs=jobs)
+        operation._unlexed = buffer
+        operation.source = buffer
+        operation.encoding = encoding
+        operation.engine = engine
+        return operation
+
+    @property
+    def nodes(self):
+        if self._unlexed is not None:
+            self._lex()
+        return self._nodes
+
+    @nodes.setter
+    def nodes(self, nodes):
+        self._nodes = nodes
+
+    @property
+    def lexed_lines(self):
+        if self._unlexed is not None:
+            self._lex()
+        return self._lexed_lines
+
+    @lexed_lines.setter
+    def lexed_lines(self, lexed_lines):
+        self._lexed_lines = lexed_lines
 
     def named(self, *names):
         self.selections.append(('named', *names))
@@ -34,6 +107,13 @@ class YamlOperation:
         self.selections.append(('parent', *parent_names))
         return self
 
+    def at_path(self, *paths):
+        # Raise any error in the paths now rather than when the selections are applied
+        for path in paths:
+            parse_path(path)
+        self.selections.append(('path', *paths))
+        return self
+
     # Note that level starts at 0
     def with_parent_at_level(self, parent_name, level):
         self.selections.append(('parent_level', parent_name, level))
@@ -55,15 +135,167 @@ class YamlOperation:
         self.operation = ('insert_sibling', name)
         return self
 
+    def get_index(self):
+        if self.index is None:
+            with phase(self.profile, 'index') as counts:
+                self.index = DocumentIndex(self.nodes)
+                if counts is not None:
+                    counts['nodes'] = len(self.index.nodes)
+        return self.index
+
     def get_selected_nodes(self):
         if self.selected_nodes is None:
-            self._apply_selections()
+            if self._prefilter_skips():
+                self.selected_nodes = []
+            else:
+                self._apply_selections()
         return self.selected_nodes
 
     def execute(self):
+        return self._execute()
+
+    def _execute(self, line_sources=None):
+        if self._unlexed is not None:
+            lines = self._execute_unlexed()
+            if lines is not None:
+                return lines
+        applied = self._apply_operation()
+        with phase(self.profile, 'to_lines') as counts:
+            lines = to_lines(*applied, line_sources=line_sources)
+            if counts is not None:
+                counts['lines'] = len(lines)
+        return lines
+
+    def _lex(self):
+        unlexed = self._unlexed
+        self._unlexed = None
+        if self.jobs > 1:
+            # The process pool is slow to import, so it is only imported when it is used
+            from yaml_surgeon.yaml_parallel import scan_and_parse
+            with phase(self.profile, 'scan_parallel') as counts:
+                self._lexed_lines, self._nodes = scan_and_parse(unlexed, self.jobs, self.engine, self.encoding)
+                _count_lines(counts, self._lexed_lines)
+            return
+        if isinstance(unlexed, str):
+            with phase(self.profile, 'scan_text') as counts:
+                self._lexed_lines = scan_text(unlexed, self.engine)
+                _count_lines(counts, self._lexed_lines)
+        else:
+            with phase(self.profile, 'scan_buffer') as counts:
+                self._lexed_lines = scan_buffer(unlexed, self.engine, self.encoding)
+                _count_lines(counts, self._lexed_lines)
+        self._nodes = self._parse(self._lexed_lines)
+
+    def _prefilter_skips(self):
+        # Whether the document has not been lexed yet, and the selections cannot match anything in it
+        if self._unlexed is None or not self.selections:
+            return False
+        if self._prefiltered:
+            return self.skipped_lexing
+        self._prefiltered = True
+        encoding = None if isinstance(self._unlexed, str) else self.encoding
+        with phase(self.profile, 'prefilter') as counts:
+            skips = not Prefilter(self.selections).may_match(self._unlexed, encoding=encoding)
+            if counts is not None:
+                counts['documents'] = 1
+                counts['documents skipped'] = int(skips)
+        self.skipped_lexing = skips
+        return skips
+
+    def _selects_nothing_unlexed(self):
+        # Whether the prefilter has shown that nothing can be selected without lexing the document
+        if self._unlexed is None:
+            return False
+        if self.selected_nodes is None and self._prefilter_skips():
+            self.selected_nodes = []
+        return self.skipped_lexing
+
+    def _execute_unlexed(self):
+        # Returns the output lines without lexing the document if the selections cannot match anything in it, or for
+        # text and operations which stay within top level blocks, lexing only the blocks they could match in. Returns
+        # None if the whole document needs to be lexed
+        if self.operation is None:
+            return None
+        if self._selects_nothing_unlexed():
+            if isinstance(self._unlexed, str):
+                return self._unlexed.splitlines()
+            return [self._unlexed[start:end].decode(self.encoding).rstrip('\r\n')
+                    for start, end in iter_buffer_line_spans(self._unlexed)]
+        if not isinstance(self._unlexed, str) or not self.selections or \
+                self.operation[0] not in self.streamable_operations:
+            return None
+        text = self._unlexed
+        with phase(self.profile, 'prefilter') as counts:
+            spans = Prefilter(self.selections).block_spans(text)
+            if counts is not None:
+                counts['blocks'] = len(spans)
+                counts['blocks skipped'] = sum(not may_match for _, _, may_match in spans)
+        if all(may_match for _, _, may_match in spans):
+            return None
+        # Each block which could match is lexed and parsed before any are executed, as an orphan in any block after the
+        # first would be attached to a node of an earlier block when the whole document is parsed
+        blocks = []
+        for block_number, (start, end, may_match) in enumerate(spans):
+            block_lines = text[start:end].splitlines()
+            if not may_match:
+                if block_number and may_have_orphans(text, start, end):
+                    return None
+                blocks.append((block_lines, None))
+                continue
+            with phase(self.profile, 'scan_text') as counts:
+                lexed_lines = scan_lines(block_lines, self.engine)
+                _count_lines(counts, lexed_lines)
+            orphans = []
+            nodes = self._parse(lexed_lines, orphans)
+            if block_number and orphans:
+                return None
+            blocks.append((lexed_lines, nodes))
+        lines = []
+        self.selected_nodes = []
+        line_offset = 0
+        for block_lines, nodes in blocks:
+            line_offset += len(block_lines)
+            if nodes is None:
+                lines.extend(block_lines)
+                continue
+            block_operation = YamlOperation(nodes, block_lines, profile=self.profile)
+            block_operation.selections = self.selections
+            block_operation.operation = self.operation
+            lines.extend(block_operation.execute())
+            # The line numbers of the nodes are relative to their block, and selected nodes can be inside each other, so
+            # the whole block is moved to where it is in the document
+            for node in nodes:
+                node.shift(line_offset - len(block_lines))
+            self.selected_nodes.extend(block_operation.selected_nodes)
+        return lines
+
+    def _parse(self, lexed_lines, orphans=None):
+        with phase(self.profile, 'parse_line_tokens') as counts:
+            nodes = list(iter_parse_line_tokens(lexed_lines, orphans))
+            if counts is not None:
+                counts['top level nodes'] = len(nodes)
+        return nodes
+
+    def _apply_operation(self):
+        # Records the changes on the selected nodes and lines, returning what to_lines needs to render them
+        if self.line_stream is not None:
+            raise ValueError("Operations created from a stream can only be written out with execute_to")
         self.get_selected_nodes()
-        lines_to_delete = []
-        flow_entries_to_delete = []
+        with phase(self.profile, f"execute.{self.operation[0]}") as counts:
+            applied = self._apply_operation_to_selected()
+            if counts is not None:
+                counts['selected nodes'] = len(self.selected_nodes)
+                counts['lines deleted'] = len(applied[2])
+                counts['copies inserted'] = sum(len(pieces) for pieces in applied[4].values())
+        return applied
+
+    def _apply_operation_to_selected(self):
+        lines_to_delete = set()
+        flow_entries_to_delete = set()
+        # Copies of lines to insert after a line, where each piece is a range of the lines along with any nodes on them
+        # which are different in the copy. The document itself is never shifted, so inserts cost the same however large
+        # the document is
+        inserted_pieces = defaultdict(list)
         (op, arg) = self.operation
         if op == 'rename':
             for node in self.selected_nodes:
@@ -72,21 +304,19 @@ class YamlOperation:
             for node in self.selected_nodes:
                 if node.flow_style:
                     node.rename("")
-                    flow_entries_to_delete.append(node.name)
+                    flow_entries_to_delete.add(node.name)
                 else:
-                    for line_number in range(node.start_line_number, node.end_line_number + 1, 1):
-                        lines_to_delete.append(line_number)
+                    lines_to_delete.update(range(node.start_line_number, node.end_line_number + 1))
         elif op == 'duplicate':
-            num_inserted = 0
-            for index, node in enumerate(list(self.selected_nodes)):
+            for node in self.selected_nodes:
                 if node.flow_style == "Sequence":
                     node.rename(node.name + ", " + arg)
                 elif node.flow_style == "Mapping":
                     # Insert the new key after the mapping completes for any tokens matching the selected name
-                    tokens = self.lexed_lines[node.end_line_number].tokens
+                    tokens = self._tokens_to_modify(node.end_line_number)
                     matching_mapping = False
                     for i, token in enumerate(tokens):
-                        if matching_mapping and 'Mapping' not in token.types and 'Scalar' not in token.types:
+                        if matching_mapping and not token.flags & (MAPPING | SCALAR):
                             token_val = ", " + arg + ":"
                             if node.children:
                                 token_val += " " + node.children[0].name
@@ -95,24 +325,18 @@ class YamlOperation:
                         elif token.value == node.name:
                             matching_mapping = True
                 else:
-                    shift_length = node.end_line_number - node.start_line_number + 1
-                    # In this case we also duplicate the name so that copy matches on the duplicated line
-                    copied_node = node.deep_copy(node.end_line_number + 1).rename(arg)
-                    insert_pos = index + 1 + num_inserted
-                    self.selected_nodes.insert(insert_pos, copied_node)
-                    num_inserted += 1
-                    # Move all the other selections down by the shift
-                    for i in range(insert_pos + 1, len(self.selected_nodes)):
-                        self.selected_nodes[i].shift(shift_length)
-                    # Copy everything else about the lines verbatim
-                    for i in range(node.start_line_number, node.end_line_number + 1):
-                        self.lexed_lines.insert(i + shift_length, self.lexed_lines[i])
-        elif op == 'insert_sibling':
+                    # The copy is rendered from the same lines and shares the nodes on them, so only its renamed root
+                    # is created. In this case we also duplicate the name so that copy matches on the duplicated line
+                    copied_node = SyntaxNode(node.name, node.start_line_number, node.flow_style, node.is_block_sequence,
+                                             node.is_map_value).rename(arg)
+                    inserted_pieces[node.end_line_number].append(
+                        (node.start_line_number, node.end_line_number, {node.start_line_number: [copied_node]}))
+        elif op == 'insert_sibling' and self.selected_nodes:
             last_selected_node = self.selected_nodes[-1]
             if last_selected_node.flow_style == "Sequence":
                 last_selected_node.rename(last_selected_node.name + ", " + arg)
             elif last_selected_node.is_map_value:
-                tokens = self.lexed_lines[last_selected_node.end_line_number].tokens
+                tokens = self._tokens_to_modify(last_selected_node.end_line_number)
                 for i, token in enumerate(tokens):
                     if token.value == last_selected_node.name:
                         tokens.insert(i, Token("[", "Sequence"))
@@ -120,10 +344,10 @@ class YamlOperation:
                         break
             elif last_selected_node.flow_style == "Mapping":
                 # Insert the new key after the mapping completes for any tokens matching the selected name
-                tokens = self.lexed_lines[last_selected_node.end_line_number].tokens
+                tokens = self._tokens_to_modify(last_selected_node.end_line_number)
                 matching_mapping = False
                 for i, token in enumerate(tokens):
-                    if matching_mapping and 'Mapping' not in token.types and 'Scalar' not in token.types:
+                    if matching_mapping and not token.flags & (MAPPING | SCALAR):
                         tokens.insert(i, Token(", " + arg + ":", "Mapping"))
                         matching_mapping = False
                     elif token.value == last_selected_node.name:
@@ -131,46 +355,197 @@ class YamlOperation:
             else:
                 # Insert a new selection at the line after the last selection.
                 # Use the contents from the first line of the selection as a basis, and rename to flag it as changed
-                new_line_number = last_selected_node.end_line_number + 1
-                new_node = SyntaxNode(self.selected_nodes[0].name, new_line_number)
+                copied_line_number = self.selected_nodes[0].start_line_number
+                new_node = SyntaxNode(self.selected_nodes[0].name, copied_line_number)
                 # If we are inserting a block style mapping it needs a semicolon, otherwise a block sequence doesn't
                 rename_to = arg if last_selected_node.is_block_sequence else arg + ":"
                 new_node.rename(rename_to)
-                self.selected_nodes.append(new_node)
-                self.lexed_lines.insert(new_line_number, self.lexed_lines[self.selected_nodes[0].start_line_number])
+                inserted_pieces[last_selected_node.end_line_number].append(
+                    (copied_line_number, copied_line_number, create_line_number_map([new_node])))
                 # This removes any connectors from the line we copied
-                flow_entries_to_delete.append(new_node.name)
+                flow_entries_to_delete.add(new_node.name)
         line_node_map = create_line_number_map(self.selected_nodes)
-        return to_lines(line_node_map, self.lexed_lines, lines_to_delete, flow_entries_to_delete)
+        return line_node_map, self.lexed_lines, lines_to_delete, flow_entries_to_delete, inserted_pieces
+
+    def _tokens_to_modify(self, line_number):
+        # Lines can be shared (for example by duplicated blocks), so copy the line before its tokens are changed
+        line = self.lexed_lines[line_number]
+        line = Line(list(line.tokens), line.line_number, line.level)
+        self.lexed_lines[line_number] = line
+        self.modified_lines.append(line)
+        return line.tokens
+
+    def execute_to(self, output):
+        """
+        Writes the output lines to a file object. For operations created from a stream, each top level block is lexed,
+        parsed, edited and written before the next block is read
+        """
+        if self.source is not None:
+            self._write_from_source(output)
+            return
+        if self.line_stream is None:
+            output.writelines(line + '\n' for line in self.execute())
+            return
+        (op, arg) = self.operation
+        if op not in self.streamable_operations:
+            raise ValueError(f"Cannot stream {op}, only {', '.join(self.streamable_operations)} can be streamed")
+        blocks = iter_top_level_blocks(self.line_stream)
+        while True:
+            # Each block is read, lexed and parsed as it is needed
+            with phase(self.profile, 'read_block') as counts:
+                block = next(blocks, None)
+                if block is not None:
+                    _count_lines(counts, block[0])
+            if block is None:
+                break
+            block_lines, block_nodes = block
+            block_operation = YamlOperation(block_nodes, block_lines, profile=self.profile)
+            block_operation.selections = self.selections
+            block_operation.operation = self.operation
+            output.writelines(line + '\n' for line in block_operation.execute())
+
+    def _write_from_source(self, output):
+        # Runs of unchanged lines which are next to each other in the source are written as a single slice of it. These
+        # keep their original line endings, and rewritten lines end with the line ending of the line they were rendered
+        # from. Text outputs are written decoded
+        binary = not isinstance(output, io.TextIOBase)
+        skipped = self._selects_nothing_unlexed()
+
+        def write(data):
+            if binary:
+                output.write(data.encode(self.encoding) if isinstance(data, str) else data)
+            else:
+                output.write(data if isinstance(data, str) else str(data, self.encoding))
+
+        def write_run(source, run_start, run_end):
+            write(source[run_start:run_end])
+            if source[run_end - 1:run_end] != b'\n':
+                # Only the last line of the source can be missing a newline, but every output line needs one
+                write('\n')
+
+        applied = None if skipped else self._apply_operation()
+        with memoryview(self.source) as source, phase(self.profile, 'write') as counts:
+            if skipped:
+                # The whole buffer is unchanged
+                if len(source):
+                    write_run(source, 0, len(source))
+                return
+            run_start = run_end = None
+            for lexed_line, line in _render_lines(*applied):
+                if line is None and lexed_line.start is not None:
+                    if lexed_line.start != run_end:
+                        if run_start is not None:
+                            write_run(source, run_start, run_end)
+                        run_start = lexed_line.start
+                    run_end = lexed_line.end
+                    continue
+                if run_start is not None:
+                    write_run(source, run_start, run_end)
+                    run_start = run_end = None
+                if line is None:
+                    line = _line_text(lexed_line)
+                if lexed_line.end is not None and source[lexed_line.end - 2:lexed_line.end] == b'\r\n':
+                    write(line + '\r\n')
+                else:
+                    write(line + '\n')
+            if run_start is not None:
+                write_run(source, run_start, run_end)
+            if counts is not None:
+                counts['lines'] = len(self.lexed_lines)
 
     def then(self):
-        # Update the state with the current operations, and reset selectors for another set of operations
-        self.lexed_lines = scan_lines(self.execute())
-        self.nodes = parse_line_tokens(self.lexed_lines)
+        # Update the state with the current operations, and reset selectors for another set of operations. Only the
+        # lines which the operation changed are lexed again, and if it did not add or remove any lines then the nodes
+        # on the changed lines are patched in place instead of parsing the whole document again
+        if self._unlexed is not None:
+            lines = self._execute_unlexed()
+            if lines is not None:
+                # The output is still text which has not been lexed as a whole, so the next operation can skip it too
+                if not self.skipped_lexing:
+                    self._unlexed = ''.join(line + '\n' for line in lines)
+                self.selected_nodes = None
+                self.selections = []
+                self.operation = None
+                self._prefiltered = False
+                return self
+        line_count = len(self.lexed_lines)
+        line_sources = []
+        lines = self._execute(line_sources)
+        modified_lines = {id(line) for line in self.modified_lines}
+        unchanged_lines = [None if line is None or id(line) in modified_lines else line for line in line_sources]
+        renamed_nodes = None
+        if len(lines) == line_count == len(self.lexed_lines):
+            with phase(self.profile, 'then.patch_changed_lines') as counts:
+                renamed_nodes = patch_changed_lines(self.nodes, self.lexed_lines, lines, unchanged_lines)
+                if counts is not None:
+                    counts['renamed nodes'] = len(renamed_nodes or ())
+        if renamed_nodes is not None:
+            for node in self.selected_nodes:
+                node.renamed_to = None
+            if self.index is not None:
+                for node, old_name in renamed_nodes:
+                    self.index.rename(node, old_name)
+        else:
+            with phase(self.profile, 'then.rescan_lines') as counts:
+                self.lexed_lines = rescan_lines(lines, unchanged_lines)
+                if counts is not None:
+                    counts['lines lexed'] = sum(line is None for line in unchanged_lines)
+            self.nodes = self._parse(self.lexed_lines)
+            self.index = None
+        self.modified_lines = []
         self.selected_nodes = None
         self.selections = []
         self.operation = None
+        self._prefiltered = False
         return self
 
+    def batch(self, rules):
+        """
+        Applies many independent operations to the document and returns the output lines, with the document lexed and
+        parsed once and rendered once. Each rule is a function which is passed a new operation on the document, and
+        adds selections and an operation to it, for example lambda operation: operation.named('spam').delete()
+
+        All the selections are made on the original document, so the rules do not see each other's changes. The lines
+        each rule changes (or copies) must not overlap the lines changed by any other rule, otherwise a ValueError is
+        raised, as the result would depend on the order of the rules
+        """
+        index = self.get_index()
+        windows = []
+        for rule_number, rule in enumerate(rules):
+            operation = rule(YamlOperation(self.nodes, self.lexed_lines, index, self.profile))
+            if operation.operation is None:
+                raise ValueError(f"Rule {rule_number} does not have an operation")
+            for window_start, window_end, window_nodes in _operation_windows(operation):
+                windows.append((window_start, window_end, rule_number, operation.operation, window_nodes))
+        windows.sort(key=lambda window: window[:2])
+        for previous, window in zip(windows, windows[1:]):
+            if window[0] <= previous[1]:
+                raise ValueError(f"Rules {previous[2]} and {window[2]} both change lines {window[0]} to "
+                                 f"{min(previous[1], window[1])}")
+
+        # Each window is rendered on its own, with its nodes copied so their line numbers start at the window
+        lines = []
+        next_line_number = 0
+        for window_start, window_end, _, window_operation, window_nodes in windows:
+            lines.extend(_render_unchanged(self.lexed_lines[next_line_number:window_start]))
+            operation = YamlOperation([], self.lexed_lines[window_start:window_end + 1], profile=self.profile)
+            operation.operation = window_operation
+            operation.selected_nodes = [_copy_to_window(node, window_start) for node in window_nodes]
+            lines.extend(operation.execute())
+            next_line_number = window_end + 1
+        lines.extend(_render_unchanged(self.lexed_lines[next_line_number:]))
+        return lines
+
     def _apply_selections(self):
-        self.selected_nodes = self.nodes
-        # TODO these are order dependent. Refactor so we can put them in one big loop
-        for op, *args in self.selections:
-            if op == 'parent':
-                self.selected_nodes = find_children_of_node_called(self.selected_nodes, *args, level=None)
-        for op, *args in self.selections:
-            if op == 'parent_level':
-                self.selected_nodes = find_children_of_node_called(self.selected_nodes, args[0], level=args[1])
-        for op, *args in self.selections:
-            if op == 'named_level':
-                level = None if len(args) == 1 else args[1]
-                self.selected_nodes = find_nodes_called(self.selected_nodes, args[0], at_level=level)
-        for op, *args in self.selections:
-            if op == 'named':
-                self.selected_nodes = find_nodes_called(self.selected_nodes, *args, at_level=None)
-        for op, *args in self.selections:
-            if op == 'name_contains':
-                self.selected_nodes = find_nodes_containing(self.selected_nodes, *args)
+        index = self.get_index()
+        with phase(self.profile, 'select') as counts:
+            plan = SelectionPlan(self.selections, index)
+            self.selected_nodes = plan.select(self.nodes)
+            if counts is not None:
+                for (op, *args), match_count in zip(plan.path_selections + plan.stage_selections,
+                                                    plan.path_match_counts + plan.stage_match_counts):
+                    counts[f"{op}({', '.join(map(repr, args))}) matches"] = match_count
+                counts['selected'] = len(self.selected_nodes)
 
     def _duplicate_node(self, name):
         for i, node in enumerate(self.nodes):
@@ -180,81 +555,250 @@ class YamlOperation:
 
 
 def find_nodes_called(nodes, *names, at_level=None, start_level=0):
-    result = []
-    for node in nodes:
-        if (at_level is None or start_level == at_level) and \
-                any(node.name == name or node.name.strip('\"') == name for name in names):
-            result.append(node)
-        result.extend(find_nodes_called(node.children, *names, at_level=at_level, start_level=start_level + 1))
-    return result
+    return list(iter_nodes_called(nodes, *names, at_level=at_level, start_level=start_level))
+
+
+def iter_nodes_called(nodes, *names, at_level=None, start_level=0):
+    """
+    Yields the nodes under (and including) nodes which have one of the names, in document order, optionally only at a
+    level relative to nodes
+    """
+    names = frozenset(names)
+    # The stack holds an iterator over the remaining siblings at each level, so that deeply nested documents neither hit
+    # the recursion limit nor build a list at every level
+    stack = [iter(nodes)]
+    while stack:
+        level = start_level + len(stack) - 1
+        for node in stack[-1]:
+            if (at_level is None or level == at_level) and (node.name in names or node.name.strip('\"') in names):
+                yield node
+            if node.children and (at_level is None or level < at_level):
+                stack.append(iter(node.children))
+                break
+        else:
+            stack.pop()
 
 
 def find_nodes_containing(nodes, *names):
-    result = []
-    for node in nodes:
-        if any(name in node.name for name in names):
-            result.append(node)
-        result.extend(find_nodes_containing(node.children, *names))
-    return result
+    return list(iter_nodes_containing(nodes, *names))
 
 
-def find_children_of_node_called(nodes, *names, level=None):
-    result = []
+def iter_nodes_containing(nodes, *names):
+    matcher = name_matcher(names, substrings=True)
+    for node in iter_subtree_nodes(nodes):
+        if matcher.matches(node.name):
+            yield node
+
+
+def find_nodes_at_path(nodes, *paths):
+    return list(iter_nodes_at_path(nodes, *paths))
 
-    def search(node, current_level):
-        if (level is None or current_level == level) and any(node.name == name for name in names):
-            result.extend(node.children)
-        elif level is None or current_level < level:
-            for child in node.children:
-                search(child, current_level + 1)
 
-    for node in nodes:
-        search(node, 0)
-    return result
+def iter_nodes_at_path(nodes, *paths):
+    """
+    Yields the nodes under (and including) nodes which match any of the paths, starting from nodes, with each matching
+    node yielded once for each path it matches
+    """
+    for path in paths:
+        current = list(nodes)
+        segments = parse_path(path)
+        for segment_index, (kind, name) in enumerate(segments):
+            if kind == 'descend':
+                current = list({id(node): node for node in iter_subtree_nodes(current)}.values())
+                continue
+            current = [node for node in current if kind == 'any' or node.name == name or node.name.strip('"') == name]
+            if segment_index + 1 < len(segments):
+                current = [child for node in current for child in node.children]
+        yield from current
+
+
+def find_children_of_node_called(nodes, *names, level=None):
+    return list(iter_children_of_node_called(nodes, *names, level=level))
+
+
+def iter_children_of_node_called(nodes, *names, level=None):
+    """
+    Yields the children of the nodes which have one of the names, optionally only at a level relative to nodes. The
+    subtrees of matching nodes are not searched any further
+    """
+    names = frozenset(names)
+    stack = [iter(nodes)]
+    while stack:
+        current_level = len(stack) - 1
+        for node in stack[-1]:
+            if (level is None or current_level == level) and node.name in names:
+                yield from node.children
+            elif node.children and (level is None or current_level < level):
+                stack.append(iter(node.children))
+                break
+        else:
+            stack.pop()
+
+
+def iter_subtree_nodes(nodes):
+    """
+    Yields the nodes and all of their descendants in document order
+    """
+    stack = [iter(nodes)]
+    while stack:
+        for node in stack[-1]:
+            yield node
+            if node.children:
+                stack.append(iter(node.children))
+                break
+        else:
+            stack.pop()
 
 
 def create_line_number_map(syntax_nodes):
     line_map = defaultdict(list)
-
-    def add_to_map(node):
+    for node in iter_subtree_nodes(syntax_nodes):
         line_map[node.start_line_number].append(node)
-        for child in node.children:
-            add_to_map(child)
+    return dict(sorted(line_map.items()))
 
-    for node in syntax_nodes:
-        add_to_map(node)
 
-    return dict(sorted(line_map.items()))
+def _operation_windows(operation):
+    # The ranges of lines which an operation changes, each with the selected nodes in it, where overlapping ranges are
+    # merged so that each range can be rendered on its own
+    selected_nodes = operation.get_selected_nodes()
+    if not selected_nodes:
+        return []
+    (op, _) = operation.operation
+    if op == 'insert_sibling':
+        last_selected_node = selected_nodes[-1]
+        if last_selected_node.flow_style or last_selected_node.is_map_value:
+            return [(last_selected_node.start_line_number, last_selected_node.end_line_number, [last_selected_node])]
+        # A new line is copied from the first selected node and inserted after the last
+        return [(selected_nodes[0].start_line_number, last_selected_node.end_line_number, list(selected_nodes))]
+    ranges = []
+    for node in selected_nodes:
+        if op == 'rename' or node.flow_style == 'Sequence' or (op == 'delete' and node.flow_style):
+            ranges.append((node.start_line_number, node.start_line_number, node))
+        else:
+            ranges.append((node.start_line_number, node.end_line_number, node))
+    ranges.sort(key=lambda line_range: line_range[0])
+    windows = []
+    for start, end, node in ranges:
+        if windows and start <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], end)
+            windows[-1][2].append(node)
+        else:
+            windows.append([start, end, [node]])
+    return [tuple(window) for window in windows]
+
+
+def _copy_to_window(node, window_start):
+    # The children are copied too, as some operations read them, such as duplicating an entry of a flow mapping
+    copied_node = node.copy_tree()
+    copied_node.shift(-window_start)
+    return copied_node
+
+
+def _render_unchanged(lexed_lines):
+    return [_line_text(lexed_line) for lexed_line in lexed_lines]
+
+
+def _line_text(lexed_line):
+    if lexed_line.text is not None:
+        return lexed_line.text
+    return ''.join(token.value for token in lexed_line.tokens)
 
 
-def to_lines(line_node_map, lexed_lines, lines_to_delete, flow_entries_to_delete):
+def to_lines(line_node_map, lexed_lines, lines_to_delete, flow_entries_to_delete, inserted_pieces=None,
+             line_sources=None):
+    """
+    Renders the lexed lines with the changes recorded on the nodes. If line_sources is given, for each output line it is
+    appended with the Line which was rendered unchanged, or None if the line was rewritten
+    """
     lines = []
+    for segment in render_segments(line_node_map, lexed_lines, lines_to_delete, flow_entries_to_delete,
+                                   inserted_pieces):
+        if isinstance(segment, str):
+            lines.append(segment)
+            if line_sources is not None:
+                line_sources.append(None)
+        else:
+            # Lines without any changes are output as they were read
+            lines.append(_line_text(segment))
+            if line_sources is not None:
+                line_sources.append(segment)
+    return lines
+
+
+def render_segments(line_node_map, lexed_lines, lines_to_delete, flow_entries_to_delete, inserted_pieces=None):
+    """
+    Yields each output line, as the rendered text if the line was rewritten, or as the lexed Line if it is unchanged so
+    that it can be copied from wherever it was read. After each line, any pieces inserted after it are rendered from
+    the lines they copy, using the piece's own nodes in place of any nodes of the document with the same name
+    """
+    for lexed_line, line in _render_lines(line_node_map, lexed_lines, lines_to_delete, flow_entries_to_delete,
+                                          inserted_pieces):
+        yield lexed_line if line is None else line
+
+
+def _render_lines(line_node_map, lexed_lines, lines_to_delete, flow_entries_to_delete, inserted_pieces):
+    # Yields each output line as the lexed Line it was rendered from, along with its rewritten text or None if unchanged
+    rewrite_plans = _rewrite_plans(line_node_map, flow_entries_to_delete)
+    if not isinstance(lines_to_delete, (set, frozenset)):
+        lines_to_delete = set(lines_to_delete)
     for line_number, lexed_line in enumerate(lexed_lines):
-        line = ''
-        delete_next_connector = False
-        delete_next_symbol = False
-        for lexed_token in lexed_line.tokens:
-            if delete_next_connector and lexed_token.value.strip() == ",":
-                lexed_value = ''
-                delete_next_connector = False
-            elif delete_next_connector and lexed_token.value.strip() == ":":
-                lexed_value = ''
-                delete_next_symbol = True
-            elif delete_next_symbol:
-                lexed_value = ''
-                delete_next_symbol = False
-                delete_next_connector = False
-            else:
-                delete_next_connector = False
-                lexed_value = lexed_token.value
-                for node in line_node_map.get(line_number, []):
-                    # If this value has been modified
-                    if node.name == lexed_value and node.renamed_to is not None:
-                        lexed_value = node.renamed_to
-                        if node.name in flow_entries_to_delete:
-                            delete_next_connector = True
-                        break
-            line += lexed_value
         if line_number not in lines_to_delete:
-            lines.append(line)
-    return lines
+            yield lexed_line, _render_line(lexed_line, rewrite_plans.get(line_number))
+        if inserted_pieces and line_number in inserted_pieces:
+            for start, end, piece_node_map in inserted_pieces[line_number]:
+                piece_rewrite_plans = _rewrite_plans(piece_node_map, flow_entries_to_delete)
+                for piece_line_number in range(start, end + 1):
+                    rewrite_plan = rewrite_plans.get(piece_line_number)
+                    piece_rewrite_plan = piece_rewrite_plans.get(piece_line_number)
+                    if piece_rewrite_plan is not None:
+                        rewrite_plan = piece_rewrite_plan if rewrite_plan is None else {**rewrite_plan,
+                                                                                        **piece_rewrite_plan}
+                    yield lexed_lines[piece_line_number], _render_line(lexed_lines[piece_line_number], rewrite_plan)
+
+
+def _render_line(lexed_line, rewrite_plan):
+    # Returns the rewritten line, or None if it is unchanged
+    return None if rewrite_plan is None else _rewrite_line(lexed_line.tokens, rewrite_plan)
+
+
+def _rewrite_plans(line_node_map, flow_entries_to_delete):
+    # For each line with renamed nodes, maps token values to the value to render instead and whether the connector
+    # after it should be deleted. Where several nodes on a line have the same name, the first one is used
+    rewrite_plans = {}
+    for line_number, nodes in line_node_map.items():
+        for node in nodes:
+            if node.renamed_to is not None:
+                rewrite_plan = rewrite_plans.setdefault(line_number, {})
+                if node.name not in rewrite_plan:
+                    rewrite_plan[node.name] = (node.renamed_to, node.name in flow_entries_to_delete)
+    return rewrite_plans
+
+
+def _rewrite_line(tokens, rewrite_plan):
+    # Returns the rendered line, or None if none of its tokens were changed
+    values = []
+    line_changed = False
+    delete_next_connector = False
+    delete_next_symbol = False
+    for lexed_token in tokens:
+        if delete_next_connector and lexed_token.value.strip() == ",":
+            lexed_value = ''
+            delete_next_connector = False
+        elif delete_next_connector and lexed_token.value.strip() == ":":
+            lexed_value = ''
+            delete_next_symbol = True
+        elif delete_next_symbol:
+            lexed_value = ''
+            delete_next_symbol = False
+            delete_next_connector = False
+        else:
+            lexed_value, delete_next_connector = rewrite_plan.get(lexed_token.value, (lexed_token.value, False))
+        line_changed = line_changed or lexed_value != lexed_token.value
+        values.append(lexed_value)
+    return ''.join(values) if line_changed else None
+
+
+def _count_lines(counts, lexed_lines):
+    if counts is not None:
+        counts['lines'] = len(lexed_lines)
+        counts['tokens'] = sum(len(line.tokens) for line in lexed_lines)
@@ -0,0 +1,97 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from yaml_surgeon.yaml_codec import encode_parsed, decode_parsed
+from yaml_surgeon.yaml_lexer import scan_text, scan_lines, scan_buffer, default_engine
+from yaml_surgeon.yaml_parser import parse_line_tokens, iter_parse_line_tokens
+from yaml_surgeon.yaml_prefilter import next_block_start
+
+# Documents smaller than this are lexed in one process, as starting the workers would take longer than lexing them
+parallel_threshold = 1 << 20
+
+# Each worker is given this many chunks in turn, so that the first chunks are being decoded while the rest are lexed
+chunks_per_job = 4
+
+
+def scan_and_parse(source, jobs, engine=default_engine, encoding='utf-8'):
+    """
+    Lexes and parses a document in a pool of jobs processes, returning the same lexed lines and nodes as scan_text (or
+    scan_buffer if the source is a bytes-like buffer such as an mmap) followed by parse_line_tokens. The document is
+    split into chunks at lines which certainly start a top level node, where the nesting level of lines goes back to 0
+    and nothing after can be a child of a node before. Each worker lexes and parses a chunk, and sends it back encoded
+    with encode_parsed as that is much faster than pickling the lines and nodes. The chunks are then decoded with their
+    line numbers (and offsets in the buffer) moved on to follow the chunks before them.
+
+    A chunk could still depend on the chunks before it if the document is not valid, which the workers check for. If
+    the indentation at the end of a chunk means that the next top level line would be an error, the whole document is
+    lexed in this process to raise the same error. If a line in a chunk is indented without a parent line, which could
+    make it a child of a node in an earlier chunk, the lines are parsed again in this process
+    """
+    spans = chunk_spans(source, jobs * chunks_per_job) if jobs > 1 and len(source) >= parallel_threshold else []
+    if len(spans) < 2:
+        return _scan_serial(source, engine, encoding)
+    lexed_lines = []
+    nodes = []
+    reparse = False
+    with ProcessPoolExecutor(jobs) as executor:
+        # Only a few chunks are copied out of the source at a time, so that a large buffer is not copied all at once
+        pending = deque()
+        chunk_index = 0
+        while pending or chunk_index < len(spans):
+            while chunk_index < len(spans) and len(pending) < jobs * 2:
+                start, end = spans[chunk_index]
+                is_last = chunk_index == len(spans) - 1
+                pending.append((start, chunk_index > 0, executor.submit(_scan_chunk, source[start:end], engine,
+                                                                        encoding, is_last)))
+                chunk_index += 1
+            start, after_first, future = pending.popleft()
+            result = future.result()
+            if result is None:
+                executor.shutdown(cancel_futures=True)
+                return _scan_serial(source, engine, encoding)
+            encoded, has_orphans = result
+            chunk_lines, chunk_nodes = decode_parsed(encoded, len(lexed_lines), 0 if isinstance(source, str) else start)
+            lexed_lines.extend(chunk_lines)
+            nodes.extend(chunk_nodes)
+            reparse = reparse or (has_orphans and after_first)
+    if reparse:
+        nodes = parse_line_tokens(lexed_lines)
+    return lexed_lines, nodes
+
+
+def chunk_spans(source, chunks):
+    """
+    Returns the start and end offsets of up to chunks parts of about the same size which the source can be split into,
+    each starting at a line which certainly starts a top level node
+    """
+    starts = [0]
+    for chunk in range(1, chunks):
+        start = next_block_start(source, max(len(source) * chunk // chunks, starts[-1] + 1))
+        if start is None:
+            break
+        if start > starts[-1]:
+            starts.append(start)
+    return list(zip(starts, starts[1:] + [len(source)]))
+
+
+def _scan_serial(source, engine, encoding):
+    lexed_lines = scan_text(source, engine) if isinstance(source, str) else scan_buffer(source, engine, encoding)
+    return lexed_lines, parse_line_tokens(lexed_lines)
+
+
+def _scan_chunk(chunk, engine, encoding, is_last):
+    # Returns the encoded lines and nodes of the chunk, along with whether any of its nodes are orphans, or None if the
+    # chunk has an indentation error or would make the line after it one. Except for the last chunk, an empty line is
+    # lexed after the chunk as it has the same indentation as the top level line starting the next chunk
+    try:
+        if isinstance(chunk, str):
+            lines = chunk.splitlines()
+            lexed_lines = scan_lines(lines if is_last else lines + [''], engine)
+        else:
+            lexed_lines = scan_buffer(chunk if is_last else chunk + b'\n', engine, encoding)
+    except SyntaxError:
+        return None
+    if not is_last:
+        lexed_lines.pop()
+    orphans = []
+    nodes = list(iter_parse_line_tokens(lexed_lines, orphans))
+    return encode_parsed(lexed_lines, nodes), bool(orphans)
@@ -1,4 +1,6 @@
-from yaml_surgeon.structures import SyntaxNode
+from bisect import bisect_left, bisect_right
+from yaml_surgeon.structures import Line, SyntaxNode, token_types, COMMENT, SCALAR
+from yaml_surgeon.yaml_lexer import get_lexer, default_engine
 
 
 def parse_line_tokens(lines):
@@ -6,8 +8,20 @@ def parse_line_tokens(lines):
     Takes an ordered list of Line objects as obtained from the lexer, and parses their contents to produce an abstract
     syntax map of line numbers to SyntaxNodes on the line, representing the type and relationships of the yaml elements
     """
+    return list(iter_parse_line_tokens(lines))
+
+
+def iter_parse_line_tokens(lines, orphans=None):
+    """
+    Incremental version of parse_line_tokens which accepts any iterable of Line objects, such as iter_scan_lines, and
+    yields each top level SyntaxNode as soon as it is complete, which is when the next top level node starts.
+
+    Nodes which are not at level 0 but have no parent at the level above, so are made top level nodes, are appended to
+    orphans if it is given. When the lines are part of a document these could have had a parent in an earlier part
+    """
     level_parents = {}
-    nodes = []
+    ancestor_ends = _AncestorEnds(level_parents)
+    pending_node = None
     for line_number, line in enumerate(lines):
         level = line.level
         # Keep track of what we have already seen on this line
@@ -18,7 +32,7 @@ def parse_line_tokens(lines):
         for i, token in enumerate(line.tokens):
             if line_has_comment:
                 break
-            for token_type in token.types:
+            for token_type in token_types[token.type_code]:
                 if token_type == 'Comment':
                     # We are done with this line, there is nothing in the remaining tokens we need
                     line_has_comment = True
@@ -31,16 +45,19 @@ def parse_line_tokens(lines):
                     if line_has_scalar and level == line.level:
                         level_parents[level].add_child(node)
                     else:
-                        level_parents[level] = node
+                        ancestor_ends.replace(level, node)
                         prev_level = level - 1
                         if level == 0 or prev_level not in level_parents:
-                            nodes.append(node)
+                            if pending_node is not None:
+                                ancestor_ends.write()
+                                yield pending_node
+                            pending_node = node
+                            if level > 0 and orphans is not None:
+                                orphans.append(node)
                         else:
-                            level_parents[prev_level].add_child(level_parents[level])
+                            level_parents[prev_level].add_child(node)
                             # Make sure all ancestors have their end line extended to the current line
-                            while prev_level in level_parents:
-                                level_parents[prev_level].extend_end(level_parents[level].end_line_number)
-                                prev_level = prev_level - 1
+                            ancestor_ends.extend(prev_level, line_number)
                     line_has_scalar = True
                 elif token_type == 'Mapping':
                     if line_has_dict:
@@ -52,4 +69,158 @@ def parse_line_tokens(lines):
                 elif token_type == 'Sequence' and line_has_dict:
                     line_flow_style = "Sequence"
                     level += 1
-    return nodes
+    ancestor_ends.write()
+    if pending_node is not None:
+        yield pending_node
+
+
+class _AncestorEnds:
+    """
+    Extends the end lines of the nodes in level_parents, where each new node extends the nodes at its parent's level and
+    every level below it, down to the first level which has never had a node. Writing the end of each of these for every
+    line takes quadratic time in deeply nested documents, so instead the ranges of levels are recorded along with the
+    line they were extended to, and only written to a node when it is replaced at its level, or when a top level node is
+    complete
+    """
+
+    def __init__(self, level_parents):
+        self.level_parents = level_parents
+        # The levels below the deepest level seen which have never had a node, in order
+        self.missing_levels = []
+        self.deepest_level = -1
+        # Ranges of levels which do not overlap, in order, along with the line each was last extended to
+        self.range_starts = []
+        self.range_ends = []
+        self.range_lines = []
+
+    def replace(self, level, node):
+        replaced_node = self.level_parents.get(level)
+        if replaced_node is not None:
+            self._write_node(level, replaced_node)
+        elif level > self.deepest_level:
+            self.missing_levels.extend(range(self.deepest_level + 1, level))
+            self.deepest_level = level
+        else:
+            del self.missing_levels[bisect_left(self.missing_levels, level)]
+        self.level_parents[level] = node
+
+    def extend(self, level, line_number):
+        missing_index = bisect_left(self.missing_levels, level)
+        start = self.missing_levels[missing_index - 1] + 1 if missing_index else 0
+        # Ranges never span a missing level, so none start before this one and end inside it
+        first = bisect_left(self.range_starts, start)
+        last = bisect_right(self.range_starts, level)
+        if last > first and self.range_ends[last - 1] > level:
+            # The last range overlapped continues above the level, so only its start is moved
+            self.range_starts[last - 1] = level + 1
+            last -= 1
+        self.range_starts[first:last] = [start]
+        self.range_ends[first:last] = [level]
+        self.range_lines[first:last] = [line_number]
+
+    def write(self):
+        for start, end, line_number in zip(self.range_starts, self.range_ends, self.range_lines):
+            for level in range(start, end + 1):
+                self.level_parents[level].extend_end(line_number)
+        self.range_starts.clear()
+        self.range_ends.clear()
+        self.range_lines.clear()
+
+    def _write_node(self, level, node):
+        index = bisect_right(self.range_starts, level) - 1
+        if index >= 0 and self.range_ends[index] >= level:
+            node.extend_end(self.range_lines[index])
+
+
+def iter_top_level_blocks(lines):
+    """
+    Groups an iterable of Line objects into blocks which each start with a new top level node, yielding the lines of each
+    block along with the nodes parsed from them, where the line numbers of the nodes are relative to the block. Lines
+    which do not start a node, such as comments, stay in the current block
+    """
+    block = []
+    for line in lines:
+        if block and line.level == 0 and _starts_node(line):
+            yield block, parse_line_tokens(block)
+            block = []
+        block.append(line)
+    if block:
+        yield block, parse_line_tokens(block)
+
+
+def _starts_node(line):
+    for token in line.tokens:
+        if token.flags & COMMENT:
+            return False
+        elif token.flags & SCALAR:
+            return True
+    return False
+
+
+def patch_changed_lines(nodes, lines, rendered_lines, unchanged_lines, engine=default_engine):
+    """
+    Updates nodes parsed from lines to match rendered_lines, which are the same lines with only scalar values changed,
+    for example by renames. Only the lines which are not in unchanged_lines are lexed, and only nodes on those lines are
+    visited. Returns a list of the renamed nodes along with their previous names, or if a changed line no longer has the
+    same structure then nothing is modified and None is returned, in which case the rendered lines need a full parse
+    """
+    lexer = get_lexer(engine)
+    relexed_lines = {}
+    for line_number, unchanged_line in enumerate(unchanged_lines):
+        if unchanged_line is None:
+            line = lines[line_number]
+            rendered_line = rendered_lines[line_number]
+            relexed = Line(lexer.parse(rendered_line), line.line_number, line.level, rendered_line)
+            if not _same_structure(line.tokens, relexed.tokens):
+                return None
+            relexed_lines[line_number] = relexed
+    line_nodes = find_nodes_on_lines(nodes, sorted(relexed_lines))
+    renamed_nodes = []
+    for line_number, relexed in relexed_lines.items():
+        tokens = relexed.tokens
+        scalar_indexes = [i for i, token in enumerate(_tokens_before_comment(tokens)) if token.flags & SCALAR]
+        for i, node in zip(scalar_indexes, line_nodes.get(line_number, [])):
+            # These mirror how parse_line_tokens sets up each node
+            if node.name != tokens[i].value:
+                renamed_nodes.append((node, node.name))
+                node.name = tokens[i].value
+            node.is_block_sequence = '-' in tokens[i - 1].value
+            node.is_map_value = ':' in tokens[i - 1].value and '{' not in tokens[i - 1].value
+        lines[line_number] = relexed
+    return renamed_nodes
+
+
+def find_nodes_on_lines(nodes, line_numbers):
+    """
+    Maps each of the sorted line numbers to the nodes which start on it in document order, only descending into nodes
+    whose lines include one of the line numbers
+    """
+    line_nodes = {}
+    stack = list(reversed(nodes))
+    while stack:
+        node = stack.pop()
+        i = bisect_left(line_numbers, node.start_line_number)
+        if i == len(line_numbers) or line_numbers[i] > node.end_line_number:
+            continue
+        if line_numbers[i] == node.start_line_number:
+            line_nodes.setdefault(node.start_line_number, []).append(node)
+        stack.extend(reversed(node.children))
+    return line_nodes
+
+
+def _same_structure(tokens, relexed_tokens):
+    # The parser only looks at token types and at the values of the tokens which are not scalars
+    if len(tokens) != len(relexed_tokens):
+        return False
+    for token, relexed_token in zip(tokens, relexed_tokens):
+        if token.type_code != relexed_token.type_code or \
+                (not token.flags & SCALAR and token.value != relexed_token.value):
+            return False
+    return True
+
+
+def _tokens_before_comment(tokens):
+    for token in tokens:
+        if token.flags & COMMENT:
+            break
+        yield token
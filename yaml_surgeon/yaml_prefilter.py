@@ -0,0 +1,127 @@
+import re
+from yaml_surgeon.yaml_lexer import iter_nesting_levels
+from yaml_surgeon.yaml_matcher import name_matcher
+from yaml_surgeon.yaml_query import parse_path
+
+# Lines which start a new top level node. Only lines which certainly do are matched, as splitting the document anywhere
+# else could change how it is parsed, while missing a start only means that a larger block is lexed
+_block_start = re.compile(r'^(?:-[ \t]+)*[\w"\']', re.MULTILINE)
+_block_start_bytes = re.compile(_block_start.pattern.encode('ascii'), re.MULTILINE)
+# Lines which certainly have a node at their own level, which are the same as block starts but after any indentation,
+# lines which certainly do not, and lines which are not certain to have a node, followed by another line
+_node_line = re.compile(r'[ \t]*(?:-[ \t]+)*[\w"\']')
+_empty_line = re.compile(r'[ \t]*(?:#|$)')
+_other_line = re.compile(r'^(?![ \t]*(?:-[ \t]+)*[\w"\'])[^\n]*\n', re.MULTILINE)
+
+
+class Prefilter:
+    """
+    Decides from the raw text of a document, before it is lexed, whether the selections of a YamlOperation could select
+    anything in it. Every selection needs a node with one of its names (or for name_contains, a name containing one of
+    its substrings), and the names of nodes are part of the text, so if the text contains none of the names of any one
+    selection then nothing can be selected.
+
+    A selected node is in the same top level block as the nodes it was selected through, unless the block has an orphan,
+    which is a node without a node at the level above it earlier in its block, such as after a comment which is indented
+    less than it. The parser attaches an orphan to a node of an earlier block. So when no block after the first has an
+    orphan, the same applies to each top level block, and only the blocks which contain a name of every selection need
+    to be lexed
+    """
+
+    def __init__(self, selections):
+        # For each selection, the strings at least one of which must be in the text for it to match anything
+        self.groups = [group for op, *args in selections for group in _selection_groups(op, args)]
+        self._matchers = {}
+
+    def may_match(self, text, start=0, end=None, encoding=None):
+        """
+        Returns False if the selections cannot match anything in text[start:end], which can be a str, or with an
+        encoding a bytes-like object with a find method such as an mmap
+        """
+        end = len(text) if end is None else end
+        return all(matcher.search(text, start, end) for matcher in self._get_matchers(encoding))
+
+    def block_spans(self, text):
+        """
+        Returns the start and end offsets of each top level block in the text, along with whether the selections could
+        match anything in it
+        """
+        return [(start, end, self.may_match(text, start, end)) for start, end in iter_block_spans(text)]
+
+    def _get_matchers(self, encoding):
+        # The matchers for the groups, with the names encoded if the text is bytes
+        matchers = self._matchers.get(encoding)
+        if matchers is None:
+            matchers = self._matchers[encoding] = [
+                name_matcher(group if encoding is None else tuple(name.encode(encoding) for name in group))
+                for group in self.groups]
+        return matchers
+
+
+def _selection_groups(op, args):
+    if op in ('parent_level', 'named_level'):
+        return [tuple(args[:1])]
+    if op != 'path':
+        return [tuple(args)]
+    paths = [[name for kind, name in parse_path(path) if kind == 'named'] for path in args]
+    if len(paths) == 1:
+        # Every name in a single path must be in the text
+        return [(name,) for name in paths[0]]
+    if all(paths):
+        # One of the paths must match, so the text must contain the last name of at least one of them
+        return [tuple(names[-1] for names in paths)]
+    # A path of only wildcards could match anything
+    return []
+
+
+def may_have_orphans(text, start=0, end=None):
+    """
+    Returns False if no node in the top level block text[start:end] can be an orphan, which is a node without a node at
+    the level above it earlier in the block. Only the indentation of the lines is looked at rather than lexing them, so
+    a line which is not certain to have a node is assumed not to have one, and one which could be an orphan is assumed
+    to be
+    """
+    end = len(text) if end is None else end
+    if not _other_line.search(text, start, end):
+        # Each line is at most one level deeper than the line before, so when every line has a node none are orphans
+        return False
+    levels_with_nodes = set()
+    try:
+        for line, level in iter_nesting_levels(text[start:end].splitlines()):
+            if _empty_line.match(line):
+                continue
+            if level and level - 1 not in levels_with_nodes:
+                return True
+            if _node_line.match(line):
+                levels_with_nodes.add(level)
+    except SyntaxError:
+        # Lexing the whole document reports the error
+        return True
+    return False
+
+
+def next_block_start(text, position):
+    """
+    Returns the offset of the first line at or after position which certainly starts a top level node, or None if there
+    is not one, where text is a str or a bytes-like object such as an mmap
+    """
+    match = (_block_start if isinstance(text, str) else _block_start_bytes).search(text, position)
+    return None if match is None else match.start()
+
+
+def iter_block_spans(text):
+    """
+    Yields the start and end offsets of the top level blocks of the text, which each start at the beginning of a line.
+    Lexing each block on its own gives the same lines as lexing the whole text, as long as the first line of the text is
+    not indented, otherwise the whole text is a single block
+    """
+    if text[:1].isspace() and text[:1].splitlines() != ['']:
+        # Lines starting further left than the first line are errors, so splitting at them would hide the error
+        yield 0, len(text)
+        return
+    start = 0
+    for match in _block_start.finditer(text, 1):
+        yield start, match.start()
+        start = match.start()
+    if start < len(text) or not text:
+        yield start, len(text)
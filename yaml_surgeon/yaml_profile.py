@@ -0,0 +1,111 @@
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class PhaseStats:
+    """
+    The totals for one phase of processing a document, such as lexing or rendering, over every time it ran. counts has
+    how much the phase processed, such as lines, tokens, nodes or the nodes matched by each selection
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.allocated = 0
+        self.counts = {}
+
+    def as_dict(self):
+        return {'calls': self.calls, 'seconds': self.seconds, 'allocated': self.allocated, **self.counts}
+
+    def __repr__(self):
+        return f"PhaseStats(name='{self.name}', " \
+               f"calls={self.calls}, " \
+               f"seconds={self.seconds}, " \
+               f"counts={self.counts})"
+
+
+class Profile:
+    """
+    Records the wall time of each phase of a YamlOperation, along with how much it processed, for example with
+    YamlOperation(text, profile=Profile()). Phases which run more than once, such as parsing in each then(), or for each
+    block when streaming, are added up. Phases can be nested, for example then() includes rendering the output.
+
+    hook is called with the name, seconds, counts and allocated bytes of each phase as it ends, for example to forward
+    them to a metrics pipeline. With trace_allocations the bytes still allocated at the end of each phase are recorded
+    using tracemalloc, which is started if it is not already and slows everything down considerably. close() stops it
+    again if it was started by the profile, which the with statement does
+    """
+
+    def __init__(self, hook=None, trace_allocations=False):
+        self.hook = hook
+        self.trace_allocations = trace_allocations
+        # Phase names to their PhaseStats, in the order they first ran
+        self.phases = {}
+        # tracemalloc is only imported when it is used, as importing it slows down starting the command line
+        self.tracemalloc = None
+        self.started_tracing = False
+        if trace_allocations:
+            import tracemalloc
+            self.tracemalloc = tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+
+    def close(self):
+        if self.started_tracing:
+            self.tracemalloc.stop()
+            self.started_tracing = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Times the body of a with statement as the named phase, which can add what it processed to the dict it is given
+        """
+        counts = {}
+        allocated_before = self.tracemalloc.get_traced_memory()[0] if self.trace_allocations else 0
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            seconds = time.perf_counter() - start
+            allocated = self.tracemalloc.get_traced_memory()[0] - allocated_before if self.trace_allocations else 0
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = PhaseStats(name)
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.allocated += allocated
+            for key, count in counts.items():
+                stats.counts[key] = stats.counts.get(key, 0) + count
+            if self.hook is not None:
+                self.hook(name, seconds, counts, allocated)
+
+    def as_dict(self):
+        return {name: stats.as_dict() for name, stats in self.phases.items()}
+
+    def format(self):
+        """
+        Returns a line for each phase with its time and counts, for printing
+        """
+        lines = []
+        for stats in self.phases.values():
+            details = [f"{stats.calls} calls"] if stats.calls > 1 else []
+            details += [f"{count} {key}" for key, count in stats.counts.items()]
+            if self.trace_allocations:
+                details.append(f"{stats.allocated / 1e6:.1f}MB allocated")
+            lines.append(f"{stats.name:>24}: {stats.seconds * 1000:10.2f}ms  {', '.join(details)}")
+        return lines
+
+
+def phase(profile, name):
+    """
+    Returns profile.phase(name), or if profile is None a context which does nothing and gives None instead of counts
+    """
+    return nullcontext() if profile is None else profile.phase(name)
@@ -0,0 +1,263 @@
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from yaml_surgeon.yaml_matcher import name_matcher
+
+# A segment of a path, which is either a name in double quotes, which can contain dots, or anything up to the next dot
+_path_segment = re.compile(r'"([^"]*)"|([^."]*)')
+
+
+class SelectionPlan:
+    """
+    Compiles the selections of a YamlOperation into stages which are all evaluated in a single pass over the document.
+
+    The selections of each kind are applied in a fixed order, which is what makes them commutative: children of parents,
+    then children of parents at a level, then names at a level, then names, then names containing substrings. Each stage
+    searches the subtrees of the nodes selected by the stage before it, so every node is searched by a set of stages,
+    along with the depth each search started at so that levels can be checked. These sets only change at nodes matching
+    a stage, so the pass visits the matching nodes in document order using the index rather than walking the tree.
+
+    The index is also used to compile substrings into the exact names which contain them, and to count the matches of
+    each stage. Every selected node is under (or is) a match of every stage, so matches which have no matches of the most
+    selective stage above or below them are skipped along with their subtrees.
+
+    Paths are anchored at the top level nodes, so they are resolved before the stages, one segment at a time from the
+    children of the nodes matching the segment before, so only the matching branches are visited. After a ** segment
+    the next name is looked up in the index within the subtrees instead. Only nodes matching every path are kept, and
+    the stages then search the subtrees of those nodes
+    """
+
+    # The kinds of selection in the order they are applied
+    stage_order = ('parent', 'parent_level', 'named_level', 'named', 'name_contains')
+
+    def __init__(self, selections, index):
+        self.index = index
+        # The path selections, and the parsed paths of each
+        self.path_selections = [selection for selection in selections if selection[0] == 'path']
+        self.paths = [[parse_path(path) for path in selection[1:]] for selection in self.path_selections]
+        # How many nodes in the document match each path selection, which is known once the paths have been resolved
+        self.path_match_counts = []
+        self.stages = []
+        # The selection each stage was compiled from
+        self.stage_selections = []
+        for kind in self.stage_order:
+            for selection in selections:
+                if selection[0] == kind:
+                    self.stages.append(self._compile(selection[0], selection[1:]))
+                    self.stage_selections.append(selection)
+        # The sorted positions of the matches of the most selective stage, which all selected nodes must be under
+        self.candidates = None
+        stage_candidates = [self._candidates(stage) for stage in self.stages]
+        # How many nodes in the document match each stage on its own
+        self.stage_match_counts = [len(candidates) for candidates in stage_candidates]
+        for candidates in stage_candidates:
+            if self.candidates is None or len(candidates) < len(self.candidates):
+                self.candidates = candidates
+        # The sorted positions of the nodes matching any stage, which are the only nodes where the searches can change
+        self.matches = sorted(set().union(*stage_candidates))
+
+    def _compile(self, op, args):
+        # Each stage is the kind of selection, the exact names it matches, and the level relative to where its search
+        # started or None if it matches at any level
+        if op == 'parent':
+            return op, frozenset(args), None
+        if op == 'parent_level':
+            return op, frozenset(args[:1]), args[1]
+        if op == 'named_level':
+            return op, frozenset(args[:1]), None if len(args) == 1 else args[1]
+        if op == 'named':
+            return op, frozenset(args), None
+        matcher = name_matcher(tuple(args), substrings=True)
+        return op, frozenset(node_name for node_name in self.index.by_name if matcher.matches(node_name)), None
+
+    def _candidates(self, stage):
+        op, names, _ = stage
+        tables = [self.index.by_name]
+        if op in ('named', 'named_level'):
+            tables.append(self.index.by_unquoted_name)
+        position_lists = [table[name] for table in tables for name in names if name in table]
+        if len(position_lists) == 1:
+            return position_lists[0]
+        return sorted(set().union(*position_lists))
+
+    def _matches(self, op, names, name):
+        if op in ('named', 'named_level'):
+            return name in names or name.strip('"') in names
+        return name in names
+
+    def select(self, roots):
+        """
+        Returns the nodes under the roots which are selected by every stage, in document order and without duplicates
+        """
+        if not self.stages and not self.paths:
+            return roots
+        index = self.index
+        if self.paths:
+            path_positions = self._resolve_paths(roots)
+            if not self.stages:
+                return [index.nodes[position] for position in path_positions]
+            roots = [index.nodes[position] for position in path_positions]
+        if not self.candidates:
+            return []
+        selected = set()
+        if roots is index.roots:
+            # Every top level node starts the first stage at depth 0, so the whole document can be searched at once
+            if index.nodes:
+                self._select_in_range(0, len(index.nodes) - 1, ((0, 0),), selected)
+        else:
+            for root in roots:
+                position = index.positions[id(root)]
+                self._select_in_range(position, index.ends[position], ((0, index.depths[position]),), selected)
+        return [index.nodes[position] for position in sorted(selected)]
+
+    def _select_in_range(self, start, end, states, selected):
+        # The stages searching a node only change at nodes which match one of them, so only those nodes are visited.
+        # The stack holds the stages searching the subtrees of the matched ancestors of the current node, along with
+        # whether the subtree is under a candidate
+        index = self.index
+        ends = index.ends
+        depths = index.depths
+        candidates = self.candidates
+        final_stage = len(self.stages)
+        matches = self.matches
+        stack = [(end, states, False)]
+        match_index = bisect_left(matches, start)
+        match_end = bisect_right(matches, end, match_index)
+        while match_index < match_end:
+            position = matches[match_index]
+            match_index += 1
+            while stack[-1][0] < position:
+                stack.pop()
+            _, states, under_candidate = stack[-1]
+            if not states:
+                continue
+            end = ends[position]
+            if not under_candidate:
+                candidate_index = bisect_left(candidates, position)
+                if candidate_index == len(candidates) or candidates[candidate_index] > end:
+                    # Nothing under this node can be selected
+                    match_index = bisect_right(matches, end, match_index, match_end)
+                    continue
+                under_candidate = candidates[candidate_index] == position
+            name = index.nodes[position].name
+            depth = depths[position]
+            child_states = set()
+            pending = list(states)
+            while pending:
+                stage_index, base_depth = pending.pop()
+                if stage_index == final_stage:
+                    selected.add(position)
+                    continue
+                op, names, level = self.stages[stage_index]
+                relative_depth = depth - base_depth
+                if level is not None and relative_depth > level:
+                    continue
+                matched = (level is None or relative_depth == level) and self._matches(op, names, name)
+                if op in ('parent', 'parent_level'):
+                    if matched:
+                        if stage_index + 1 == final_stage:
+                            selected.update(self._children(position))
+                        else:
+                            child_states.add((stage_index + 1, depth + 1))
+                    elif level is None or relative_depth < level:
+                        child_states.add((stage_index, base_depth))
+                else:
+                    if matched:
+                        pending.append((stage_index + 1, depth))
+                    if level is None or relative_depth < level:
+                        child_states.add((stage_index, base_depth))
+            if end > position:
+                stack.append((end, tuple(child_states), under_candidate))
+
+    def _resolve_paths(self, roots):
+        # The sorted positions of the nodes under the roots which match at least one path of every path selection
+        positions = None
+        self.path_match_counts = []
+        for paths in self.paths:
+            matches = set()
+            for segments in paths:
+                matches.update(self._resolve_path(roots, segments))
+            self.path_match_counts.append(len(matches))
+            positions = matches if positions is None else positions & matches
+        return sorted(positions)
+
+    def _resolve_path(self, roots, segments):
+        # The nodes the next segment is matched against, which are the roots for the first segment, and the children of
+        # the nodes matching the segment before for the rest. After a ** segment they are instead the subtrees of those
+        # nodes, in which the segment can match at any depth
+        index = self.index
+        positions = index.positions
+        candidates = roots
+        subtrees = None
+        for segment_index, (kind, name) in enumerate(segments):
+            if kind == 'descend':
+                if candidates is index.roots:
+                    # Every top level node is searched, so the whole document can be searched at once
+                    subtrees = [(0, len(index.nodes) - 1)] if index.nodes else []
+                elif subtrees is None:
+                    subtrees = _outermost_subtrees([positions[id(node)] for node in candidates], index.ends)
+                continue
+            if subtrees is None:
+                matches = [node for node in candidates
+                           if kind == 'any' or node.name == name or node.name.strip('"') == name]
+            else:
+                matches = []
+                for start, end in subtrees:
+                    if kind == 'named':
+                        tables = [(index.by_name, name), (index.by_unquoted_name, name)]
+                        matches.extend(index._in_range(start, end, tables))
+                    else:
+                        matches.extend(range(start, end + 1))
+                matches = [index.nodes[position] for position in matches]
+                subtrees = None
+            if segment_index + 1 < len(segments):
+                candidates = [child for node in matches for child in node.children]
+        return [positions[id(node)] for node in matches]
+
+    def _children(self, position):
+        ends = self.index.ends
+        child = position + 1
+        while child <= ends[position]:
+            yield child
+            child = ends[child] + 1
+
+
+def _outermost_subtrees(positions, ends):
+    # The ranges of positions of the subtrees of the nodes, without those inside another, which would only be searched
+    # again
+    result = []
+    for position in sorted(positions):
+        if not result or position > result[-1][1]:
+            result.append((position, ends[position]))
+    return result
+
+
+@lru_cache(maxsize=256)
+def parse_path(path):
+    """
+    Parses a path such as 'spec.containers.*.image' into a tuple of segments, each of which is a kind and a name. Names
+    are separated by dots, and a name in double quotes can contain dots. A * segment matches any single node and a **
+    segment matches any number of levels, including none. Raises ValueError if the path has an empty segment
+    """
+    segments = []
+    position = 0
+    while True:
+        match = _path_segment.match(path, position)
+        quoted_name, name = match.groups()
+        if quoted_name is not None:
+            segments.append(('named', quoted_name))
+        elif name.strip() in ('*', '**'):
+            segments.append(('any' if name.strip() == '*' else 'descend', None))
+        elif name.strip():
+            segments.append(('named', name.strip()))
+        else:
+            raise ValueError(f"Path {path!r} has an empty segment at {position}")
+        position = match.end()
+        if position == len(path):
+            break
+        if path[position] != '.':
+            raise ValueError(f"Path {path!r} has an unexpected {path[position]!r} at {position}")
+        position += 1
+    if segments[-1][0] == 'descend':
+        raise ValueError(f"Path {path!r} ends with **, which would match every node under it")
+    return tuple(segments)
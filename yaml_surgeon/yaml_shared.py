@@ -0,0 +1,109 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from yaml_surgeon.yaml_codec import encode_parsed, decode_parsed
+from yaml_surgeon.yaml_operation import YamlOperation
+
+# The lines and nodes of the document opened by this process when it was started as a worker of execute_shared
+_worker_document = None
+
+
+class SharedDocument:
+    """
+    A lexed and parsed document in shared memory, so that worker processes can open it by name rather than having it
+    pickled and sent to each of them, which takes longer than lexing and parsing it again. The document is stored with
+    encode_parsed, as arrays of the levels and tokens of the lines and of the names, lines and parents of the nodes in
+    document order, which workers read in place from the shared memory.
+
+    The process which creates the document owns the shared memory, and must close it when the workers are done with it,
+    which the with statement does
+    """
+
+    def __init__(self, lexed_lines, nodes):
+        encoded = encode_parsed(lexed_lines, nodes)
+        self.size = len(encoded)
+        # Shared memory cannot be empty, even for an empty document
+        self.shared_memory = SharedMemory(create=True, size=max(self.size, 1))
+        self.shared_memory.buf[:self.size] = encoded
+        self.name = self.shared_memory.name
+
+    @classmethod
+    def from_operation(cls, operation):
+        return cls(operation.lexed_lines, operation.nodes)
+
+    def open(self):
+        """
+        Returns the lines and nodes of the document, as open_shared_document does in other processes
+        """
+        with self.shared_memory.buf[:self.size] as view:
+            return decode_parsed(view)
+
+    def close(self):
+        self.shared_memory.close()
+        self.shared_memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_shared_document(name, size):
+    """
+    Returns the lines and nodes of a SharedDocument created by another process, given its name and size
+    """
+    try:
+        shared_memory = SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before python 3.13 opening shared memory always registers it with the resource tracker. Worker processes share
+        # the tracker of the process which created it, where it is already registered, so this changes nothing
+        shared_memory = SharedMemory(name=name)
+    try:
+        with shared_memory.buf[:size] as view:
+            return decode_parsed(view)
+    finally:
+        shared_memory.close()
+
+
+def execute_shared(operation, tasks, jobs=4, mp_context=None):
+    """
+    Applies many independent operations to the document of a YamlOperation using a pool of processes, and returns the
+    output lines of each in the same order. Each task is the selections and operation recorded by a YamlOperation, such
+    as (template.selections, template.operation). The document is put in a SharedDocument, and each worker opens it
+    once when it starts, then gives each of its tasks a copy of the nodes as operations change them. mp_context is
+    passed to the ProcessPoolExecutor, to choose how the workers are started.
+
+    Forked workers start with a copy of the memory of this process, so they are given the document directly, which is
+    faster than decoding it from shared memory
+    """
+    if (mp_context or multiprocessing.get_context()).get_start_method() == 'fork':
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context, initializer=_set_worker_document,
+                                 initargs=(operation.lexed_lines, operation.nodes)) as executor:
+            return _map_tasks(executor, tasks)
+    with SharedDocument.from_operation(operation) as document:
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context, initializer=_open_worker_document,
+                                 initargs=(document.name, document.size)) as executor:
+            return _map_tasks(executor, tasks)
+
+
+def _map_tasks(executor, tasks):
+    return list(executor.map(_execute_task, *zip(*tasks))) if tasks else []
+
+
+def _set_worker_document(lexed_lines, nodes):
+    global _worker_document
+    _worker_document = (lexed_lines, nodes)
+
+
+def _open_worker_document(name, size):
+    global _worker_document
+    _worker_document = open_shared_document(name, size)
+
+
+def _execute_task(selections, operation):
+    lexed_lines, nodes = _worker_document
+    yaml_operation = YamlOperation([node.copy_tree() for node in nodes], list(lexed_lines))
+    yaml_operation.selections = list(selections)
+    yaml_operation.operation = operation
+    return yaml_operation.execute()